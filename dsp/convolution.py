@@ -0,0 +1,82 @@
+import numpy as np
+
+
+class PartitionedConvolver:
+    """Uniformly partitioned overlap-save convolution for long impulse responses
+
+    The response is cut into partitions of one block each, transformed once at
+    construction. Every block then costs one forward FFT, a multiply-add
+    against all partition spectra from a frequency-domain delay line, and one
+    inverse FFT, independent of where the energy sits in the response.
+
+    Blocks of any length pass through with no added latency. Whole partitions
+    cost one transform each. A partition still being filled is convolved
+    zero-padded, which is exact for the samples it has since the response is
+    causal, and committed to the delay line once it is complete.
+    """
+
+    def __init__(self, ir, block_size, channels=1):
+        ir = np.atleast_2d(np.asarray(ir, dtype=np.float32))
+        self.block_size = block_size
+        self.channels = channels
+        self.partitions = max(1, -(-ir.shape[1] // block_size))
+
+        # (ir channels, partitions, bins), newest-block partition last to match the delay line order
+        parts = np.zeros((ir.shape[0], self.partitions * block_size), dtype=np.float32)
+        parts[:, :ir.shape[1]] = ir
+        padded = np.zeros((ir.shape[0], self.partitions, 2 * block_size), dtype=np.float32)
+        padded[:, :, :block_size] = parts.reshape(ir.shape[0], self.partitions, block_size)
+        self.spectra = np.ascontiguousarray(np.fft.rfft(padded, axis=2)[:, ::-1], dtype=np.complex64)
+
+        bins = block_size + 1
+        # Each spectrum is stored twice, so the last `partitions` entries are always one contiguous slice
+        self.delay_line = np.zeros((channels, 2 * self.partitions, bins), dtype=np.complex64)
+        self.position = 0
+        # Previous partition, then the current one: filled samples first, zeros after
+        self.input = np.zeros((channels, 2 * block_size), dtype=np.float32)
+        self.fill = 0
+
+    def reset(self):
+        self.delay_line[:] = 0
+        self.input[:] = 0
+        self.position = 0
+        self.fill = 0
+
+    def _convolve(self, commit):
+        """Output of the current partition; commit moves the delay line on once it is complete"""
+        size = self.block_size
+        spectrum = np.fft.rfft(self.input, axis=1)
+        p = self.position
+        # Slot p holds the spectrum about to drop out, so a partial one may overwrite it until the commit
+        self.delay_line[:, p] = spectrum
+        self.delay_line[:, p + self.partitions] = spectrum
+        if commit:
+            self.position = (p + 1) % self.partitions
+
+        recent = self.delay_line[:, p + 1:p + 1 + self.partitions]
+        accumulated = np.einsum("...pk,...pk->...k", recent, self.spectra)
+        return np.fft.irfft(accumulated, 2 * size, axis=1)[:, size:]
+
+    def process(self, x):
+        """Convolve (channels, frames) float samples, returns a new float32 array"""
+        x = x.astype(np.float32, copy=False)
+        size = self.block_size
+        frames = x.shape[1]
+        out = np.empty((self.channels, frames), dtype=np.float32)
+
+        done = 0
+        while done < frames:
+            start = self.fill
+            take = min(size - start, frames - done)
+            self.input[:, size + start:size + start + take] = x[:, done:done + take]
+            self.fill += take
+
+            complete = self.fill == size
+            out[:, done:done + take] = self._convolve(complete)[:, start:start + take]
+            done += take
+
+            if complete:
+                self.input[:, :size] = self.input[:, size:]
+                self.input[:, size:] = 0
+                self.fill = 0
+        return out
@@ -0,0 +1,215 @@
+import numpy as np
+
+# RBJ Audio EQ Cookbook responses
+filter_types = ["Lowpass", "Highpass", "Bandpass", "Notch", "Peak", "Low Shelf", "High Shelf"]
+
+
+def biquad(kind, freq, rate, q=0.7071, gain_db=0.0):
+    """One second-order section [b0, b1, b2, 1, a1, a2] of the named cookbook filter"""
+    w0 = 2 * np.pi * min(freq, 0.49 * rate) / rate
+    cos_w0, sin_w0 = np.cos(w0), np.sin(w0)
+    alpha = sin_w0 / (2 * q)
+    a = 10 ** (gain_db / 40)
+
+    if kind == "Lowpass":
+        b = [(1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2]
+        den = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    elif kind == "Highpass":
+        b = [(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2]
+        den = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    elif kind == "Bandpass":
+        b = [alpha, 0.0, -alpha]
+        den = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    elif kind == "Notch":
+        b = [1.0, -2 * cos_w0, 1.0]
+        den = [1 + alpha, -2 * cos_w0, 1 - alpha]
+    elif kind == "Peak":
+        b = [1 + alpha * a, -2 * cos_w0, 1 - alpha * a]
+        den = [1 + alpha / a, -2 * cos_w0, 1 - alpha / a]
+    elif kind in ("Low Shelf", "High Shelf"):
+        sign = 1 if kind == "Low Shelf" else -1
+        root = 2 * np.sqrt(a) * alpha
+        b = [a * ((a + 1) - sign * (a - 1) * cos_w0 + root),
+             sign * 2 * a * ((a - 1) - sign * (a + 1) * cos_w0),
+             a * ((a + 1) - sign * (a - 1) * cos_w0 - root)]
+        den = [(a + 1) + sign * (a - 1) * cos_w0 + root,
+               -sign * 2 * ((a - 1) + sign * (a + 1) * cos_w0),
+               (a + 1) + sign * (a - 1) * cos_w0 - root]
+    else:
+        raise ValueError(f"Unknown filter type: {kind}")
+
+    return np.array([b[0], b[1], b[2], den[0], den[1], den[2]]) / den[0]
+
+
+def k_weighting(rate):
+    """ITU-R BS.1770 K-weighting (head shelf, then RLB highpass) as two sections for any sample rate"""
+    # Analog prototypes of the 48 kHz reference coefficients, re-warped to this rate
+    k = np.tan(np.pi * 1681.974450955533 / rate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0,
+             1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    k = np.tan(np.pi * 38.13547087602444 / rate)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    highpass = [1.0, -2.0, 1.0, 1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]
+
+    return np.array([shelf, highpass])
+
+
+def _state_space(sos):
+    """(A, B, C, D) of a cascade of second-order sections, two states per section"""
+    a_mat = np.zeros((0, 0))
+    b_vec = np.zeros(0)
+    c_vec = np.zeros(0)
+    d = 1.0
+
+    for b0, b1, b2, _, a1, a2 in sos:
+        # Transposed direct form II of one section
+        a_s = np.array([[-a1, 1.0], [-a2, 0.0]])
+        b_s = np.array([b1 - a1 * b0, b2 - a2 * b0])
+        c_s = np.array([1.0, 0.0])
+
+        # Series connection: this section is fed by the cascade so far
+        n = len(b_vec)
+        a_new = np.zeros((n + 2, n + 2))
+        a_new[:n, :n] = a_mat
+        a_new[n:, :n] = np.outer(b_s, c_vec)
+        a_new[n:, n:] = a_s
+        a_mat = a_new
+        b_vec = np.concatenate((b_vec, b_s * d))
+        c_vec = np.concatenate((b0 * c_vec, c_s))
+        d = b0 * d
+
+    return a_mat, b_vec, c_vec, d
+
+
+class SOSFilter:
+    """IIR cascade run a sub-block at a time through precomputed state-space matrices
+
+    For a sub-block of L samples the output is a Toeplitz matrix (the impulse
+    response) times the input plus the free response of the carried state, so
+    the whole block becomes two matrix products over all channels at once. Only
+    the state hand-off between sub-blocks is sequential: frames / L small steps
+    instead of a loop over every sample.
+    """
+
+    def __init__(self, sos, channels=1, sub_block=64):
+        self.sub_block = sub_block
+        self.channels = channels
+        self.state = None
+        self.set_sos(sos)
+
+    def set_sos(self, sos):
+        """Change coefficients, keeping the state when the section count stays the same"""
+        sos = np.atleast_2d(np.asarray(sos, dtype=np.float64))
+        self.a, self.b, self.c, self.d = _state_space(sos)
+        order = len(self.b)
+        if self.state is None or self.state.shape[1] != order:
+            self.state = np.zeros((self.channels, order))
+        self._matrices = {}
+
+    def reset(self):
+        self.state[:] = 0
+
+    def _build(self, length):
+        """Toeplitz response, state observation, state update and A**length for one sub-block length"""
+        if length in self._matrices:
+            return self._matrices[length]
+
+        order = len(self.b)
+        powers = [np.eye(order)]
+        for _ in range(length):
+            powers.append(self.a @ powers[-1])
+
+        impulse = np.empty(length)
+        impulse[0] = self.d
+        for k in range(1, length):
+            impulse[k] = self.c @ powers[k - 1] @ self.b
+
+        k = np.arange(length)
+        toeplitz = np.where(k[:, None] >= k[None, :], impulse[np.abs(k[:, None] - k[None, :])], 0.0)
+        observe = np.array([self.c @ powers[i] for i in range(length)])
+        update = np.array([powers[length - 1 - j] @ self.b for j in range(length)])
+
+        matrices = (toeplitz.T.astype(np.float32), observe.T, update, powers[length].T)
+        self._matrices[length] = matrices
+        return matrices
+
+    def process(self, x):
+        """Filter (channels, frames) float samples, returns a new float32 array"""
+        channels, frames = x.shape
+        if channels != self.state.shape[0]:
+            self.channels = channels
+            self.state = np.zeros((channels, len(self.b)))
+
+        out = np.empty((channels, frames), dtype=np.float32)
+        split = frames - frames % self.sub_block
+        if split:
+            out[:, :split] = self._run(x[:, :split].reshape(channels, -1, self.sub_block)).reshape(channels, split)
+        if split < frames:
+            out[:, split:] = self._run(x[:, split:].reshape(channels, 1, frames - split))[:, 0]
+        return out
+
+    def _run(self, x):
+        toeplitz_t, observe_t, update, power_t = self._build(x.shape[2])
+
+        # Zero-state response and state contribution of every sub-block in one product each
+        out = x @ toeplitz_t
+        driven = x @ update
+
+        states = np.empty((x.shape[0], x.shape[1], len(self.b)))
+        state = self.state
+        for i in range(x.shape[1]):
+            states[:, i] = state
+            state = state @ power_t + driven[:, i]
+        self.state = state
+
+        out += states @ observe_t
+        return out
+
+
+def fir_lowpass(taps, cutoff, rate, window="hann"):
+    """Windowed-sinc lowpass with unity DC gain"""
+    n = np.arange(taps) - (taps - 1) / 2
+    fc = cutoff / rate
+    h = 2 * fc * np.sinc(2 * fc * n) * (np.hanning(taps) if window == "hann" else np.blackman(taps))
+    return (h / h.sum()).astype(np.float32)
+
+
+def fir_highpass(taps, cutoff, rate):
+    """Spectral inversion of the lowpass; taps should be odd"""
+    h = -fir_lowpass(taps, cutoff, rate)
+    h[(taps - 1) // 2] += 1.0
+    return h
+
+
+class FIRFilter:
+    """Direct-form FIR over all channels, one sliding-window product per block
+
+    Cost grows with the tap count per sample; long responses belong in a
+    PartitionedConvolver instead.
+    """
+
+    def __init__(self, taps, channels=1):
+        self.taps = np.asarray(taps, dtype=np.float32)
+        self.history = np.zeros((channels, len(self.taps) - 1), dtype=np.float32)
+        self.reversed = np.ascontiguousarray(self.taps[::-1])
+
+    def reset(self):
+        self.history[:] = 0
+
+    def process(self, x):
+        """Filter (channels, frames) float samples, returns a new float32 array"""
+        channels, frames = x.shape
+        if channels != self.history.shape[0]:
+            self.history = np.zeros((channels, len(self.taps) - 1), dtype=np.float32)
+
+        extended = np.concatenate((self.history, x), axis=1)
+        windows = np.lib.stride_tricks.sliding_window_view(extended, len(self.taps), axis=1)
+        out = windows @ self.reversed
+        self.history = extended[:, frames:].copy()
+        return out.astype(np.float32, copy=False)
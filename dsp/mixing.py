@@ -0,0 +1,85 @@
+import numpy as np
+
+# Channel order of the named layouts, by channel count
+LAYOUTS = {
+    1: ("C",),
+    2: ("L", "R"),
+    6: ("L", "R", "C", "LFE", "Ls", "Rs"),
+    8: ("L", "R", "C", "LFE", "Ls", "Rs", "Lb", "Rb"),
+}
+
+LAYOUT_NAMES = {1: "Mono", 2: "Stereo", 6: "5.1", 8: "7.1"}
+
+# Where a speaker folds to when the target layout lacks it (ITU-R BS.775 style -3 dB)
+FOLD = {
+    "C": (("L", 0.7071), ("R", 0.7071)),
+    "Ls": (("L", 0.7071),),
+    "Rs": (("R", 0.7071),),
+    "Lb": (("Ls", 0.7071),),
+    "Rb": (("Rs", 0.7071),),
+    "L": (("C", 0.7071),),
+    "R": (("C", 0.7071),),
+}
+
+# Mixing presets: Auto folds by speaker layout, Direct copies channel i to channel i
+mix_presets = ["Auto", "Direct"]
+
+
+def _fold(label, out_labels):
+    """Gains from one input speaker to the output layout, following FOLD until something matches"""
+    if label in out_labels:
+        return {label: 1.0}
+
+    gains = {}
+    for target, gain in FOLD.get(label, ()):
+        for out_label, g in _fold(target, out_labels).items():
+            gains[out_label] = gains.get(out_label, 0.0) + gain * g
+    return gains
+
+
+def direct_matrix(in_channels, out_channels):
+    """Channel i to channel i, extra inputs dropped and extra outputs silent"""
+    return np.eye(out_channels, in_channels, dtype=np.float32)
+
+
+def layout_matrix(in_channels, out_channels, normalize=True):
+    """(out, in) matrix mapping between two channel counts by speaker layout
+
+    Named layouts (mono, stereo, 5.1, 7.1) fold missing speakers onto their
+    neighbours and drop LFE on downmix. Mono upmixes to both fronts in stereo
+    and to the centre otherwise. Unnamed counts fall back to direct mapping,
+    or an average when going to mono. Downmixes are scaled so no output row
+    sums above unity gain.
+    """
+    if in_channels == out_channels:
+        return np.eye(out_channels, dtype=np.float32)
+
+    if in_channels == 1 and out_channels == 2:
+        return np.ones((2, 1), dtype=np.float32)
+
+    matrix = np.zeros((out_channels, in_channels), dtype=np.float32)
+    in_labels = LAYOUTS.get(in_channels)
+    out_labels = LAYOUTS.get(out_channels)
+
+    if in_labels is not None and out_labels is not None:
+        for i, label in enumerate(in_labels):
+            for out_label, gain in _fold(label, out_labels).items():
+                matrix[out_labels.index(out_label), i] = gain
+    elif out_channels == 1:
+        matrix[0, :] = 1.0 / in_channels
+    else:
+        matrix = direct_matrix(in_channels, out_channels)
+
+    if normalize and out_channels < in_channels:
+        peak = np.abs(matrix).sum(axis=1).max()
+        if peak > 1.0:
+            matrix /= peak
+
+    return matrix
+
+
+def preset_matrix(preset, in_channels, out_channels):
+    """Mixing matrix for one of mix_presets"""
+    if preset == "Direct":
+        return direct_matrix(in_channels, out_channels)
+    return layout_matrix(in_channels, out_channels)
@@ -0,0 +1,95 @@
+from functools import lru_cache
+from math import ceil, gcd
+
+import numpy as np
+
+
+@lru_cache(maxsize=16)
+def polyphase_filter(up, down, taps=16, beta=8.0, rolloff=0.9):
+    """Kaiser-windowed sinc lowpass for an up/down ratio, split into (up, taps) phases
+
+    Phase p holds the prototype coefficients p, p + up, p + 2 * up, ... so one
+    output sample is a taps-long dot product. Downsampling narrows the cutoff,
+    so the taps per phase grow with the decimation factor.
+    """
+    taps = int(ceil(taps * max(1.0, down / up)))
+    length = up * taps
+
+    # Cutoff in cycles per sample of the upsampled rate
+    cutoff = 0.5 * rolloff / max(up, down)
+    n = np.arange(length) - (length - 1) / 2
+    prototype = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta)
+    prototype *= up / prototype.sum()
+
+    return np.ascontiguousarray(prototype.reshape(taps, up).T, dtype=np.float32)
+
+
+class PolyphaseResampler:
+    """Rational-ratio resampler keeping its filter history between blocks
+
+    Output sample k sits at input position k * down / up. Each block computes
+    every output that position falls within the block in one gather and one
+    multiply-add over the phase table, so block lengths of the output vary by
+    a frame as the phase walks.
+    """
+
+    def __init__(self, in_rate, out_rate, channels=1):
+        divisor = gcd(int(in_rate), int(out_rate))
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.up = int(out_rate) // divisor
+        self.down = int(in_rate) // divisor
+        self.channels = channels
+
+        self.phases = polyphase_filter(self.up, self.down)
+        self.taps = self.phases.shape[1]
+        self.history = np.zeros((channels, self.taps - 1), dtype=np.float32)
+        # Position of the next output relative to the current block start, in units of 1 / up input samples
+        self.position = 0
+        self.tap_offsets = np.arange(self.taps - 1, -1, -1)
+
+    @property
+    def delay(self):
+        """Group delay in output samples"""
+        return (self.up * self.taps - 1) / 2 / self.down
+
+    def reset(self):
+        self.history[:] = 0
+        self.position = 0
+
+    def process(self, x):
+        """Resample (channels, frames); integer samples are scaled to the float [-1, 1] range"""
+        frames = x.shape[1]
+        if np.issubdtype(x.dtype, np.integer):
+            x = x / np.float32(-np.iinfo(x.dtype).min)
+
+        extended = np.concatenate((self.history, x.astype(np.float32, copy=False)), axis=1)
+
+        end = frames * self.up
+        count = max(0, -(-(end - self.position) // self.down))
+        positions = self.position + np.arange(count) * self.down
+        index, phase = np.divmod(positions, self.up)
+
+        # (channels, count, taps) input samples x[n], x[n - 1], ... behind each output
+        windows = extended[:, index[:, None] + self.tap_offsets]
+        out = np.einsum("ckt,kt->ck", windows, self.phases[phase])
+
+        self.position += count * self.down - end
+        self.history = extended[:, frames:].copy()
+        return out
+
+
+def resample_offline(x, in_rate, out_rate):
+    """Resample a whole (channels, frames) signal with the filter's group delay removed
+
+    Output k lines up with input position k * in_rate / out_rate, to within half
+    a sample at the upsampled rate (the filter centre of an even-length prototype
+    falls between samples), and the output runs on past the last input sample
+    until the filter has rung out.
+    """
+    resampler = PolyphaseResampler(in_rate, out_rate, len(x))
+    # Start at the filter's centre: the delay is skipped rather than output
+    resampler.position = (resampler.up * resampler.taps - 1) // 2
+
+    frames = -(-x.shape[1] * resampler.up // resampler.down) + int(ceil(resampler.delay))
+    return resampler.process(np.pad(x, ((0, 0), (0, resampler.taps))))[:, :frames]
@@ -0,0 +1,107 @@
+import os
+
+# No GUI in this process: node modules fall back to their headless base classes
+os.environ.setdefault("NODEDSP_HEADLESS", "1")
+
+from engine.metrics import node_metrics, startup
+
+import argparse
+import time
+
+from engine.graph import Engine, read_graph, validate_graph
+from engine.scheduler import LATENCY, THROUGHPUT, BlockScheduler
+from nodes import audioio, registry
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m engine", description="Run a saved NodeDSP graph without the editor")
+    parser.add_argument("graph", nargs="?", default="ne.json", help="graph file written by the editor")
+    parser.add_argument("--blocks", type=int, default=0, help="stop after N ticks (0 runs until interrupted)")
+    parser.add_argument("--threads", type=int, default=0, help="run independent branches on N threads")
+    parser.add_argument("--offline", action="store_true",
+                        help="render as fast as possible, stopping when file sources run out")
+    parser.add_argument("--mode", choices=["latency", "throughput"], default=None,
+                        help="one block per tick, or adaptive batching of several (default: the graph file's mode)")
+    parser.add_argument("--backend", choices=list(audioio.backends), default="PyAudio",
+                        help="audio backend: a sound card, silence, or a virtual loopback device")
+    parser.add_argument("--check", action="store_true",
+                        help="validate the graph file without creating any node, then exit")
+    parser.add_argument("--metrics", default="", help="periodically write per-node metrics to this file")
+    parser.add_argument("--metrics-format", choices=["jsonl", "prom"], default="jsonl",
+                        help="JSON lines appended, or Prometheus text rewritten each time")
+    parser.add_argument("--metrics-interval", type=float, default=5.0, help="seconds between metric exports")
+    args = parser.parse_args()
+
+    if args.check:
+        try:
+            problems = validate_graph(read_graph(args.graph), registry.factories())
+        except (OSError, ValueError) as e:
+            problems = [str(e)]
+        for problem in problems:
+            print(problem)
+        print(f"{args.graph}: {'invalid' if problems else 'ok'}")
+        raise SystemExit(1 if problems else 0)
+
+    audioio.audio_manager.set_backend(args.backend)
+    if os.path.exists("io.json"):
+        audioio.audio_manager.load(None, None)
+    audioio.audio_manager.realtime = not args.offline
+
+    startup.mark("imports")
+    engine = Engine(registry.factories(), args.threads, node_metrics if args.metrics else None)
+    engine.load_file(args.graph)
+    startup.mark("graph")
+    # Open every device the graph plays through before the first deadline rather than inside it
+    engine.activate()
+    startup.mark("devices")
+    print(startup.report())
+
+    def graph_mode():
+        if args.mode is not None:
+            return THROUGHPUT if args.mode == "throughput" else LATENCY
+        return engine.mode or LATENCY
+
+    def tick():
+        # Cheap stat check; the plan is only rebuilt when the file actually changed
+        if scheduler.ticks % 64 == 0 and engine.poll_file() and graph_mode() != scheduler.mode:
+            scheduler.set_mode(graph_mode())
+        engine.run_block()
+        if args.offline and engine.finished():
+            scheduler.is_running = False
+
+    scheduler = BlockScheduler(tick, audioio.audio_manager.block_period(), realtime=not args.offline,
+                               mode=graph_mode(), max_batch=audioio.audio_manager.max_batch(),
+                               on_batch=audioio.audio_manager.set_batch,
+                               device_wait=audioio.audio_manager.streams.wait_time)
+    if args.metrics:
+        node_metrics.scheduler = scheduler
+        node_metrics.start_export(args.metrics, args.metrics_interval, args.metrics_format)
+
+    started = time.perf_counter()
+    try:
+        scheduler.run(args.blocks)
+    except KeyboardInterrupt:
+        pass
+    elapsed = time.perf_counter() - started
+
+    stats = scheduler.stats()
+    print(f"{stats['ticks']} ticks of {stats['batch']} block(s) | headroom {stats['headroom']:.1f}% (min {stats['min_headroom']:.1f}%) | "
+          f"overruns {stats['overruns']} | underruns {stats['underruns']} | errors {stats['errors']}")
+    if args.offline and elapsed > 0:
+        print(f"rendered {stats['audio_time']:.1f}s of audio in {elapsed:.2f}s "
+              f"({stats['audio_time'] / elapsed:.0f}x realtime)")
+    if hasattr(engine.plan, "speedup"):
+        print(f"parallel speedup {engine.plan.speedup:.2f}x over {len(engine.plan.branches)} branches")
+
+    if args.metrics:
+        node_metrics.stop_export()
+        node_metrics.export(args.metrics, args.metrics_format)
+
+    dropped = engine.close()
+    # A render with holes in it is a failed render
+    if args.offline and dropped:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import os
+
+# No GUI in this process: node modules fall back to their headless base classes
+os.environ.setdefault("NODEDSP_HEADLESS", "1")
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from engine.graph import Engine
+from nodes import audioio, registry
+from nodes.fileio import WavWriter
+
+# Node types left out of generated graphs by default: they need files on disk or a network peer
+DEFAULT_EXCLUDE = ("FIN", "FOUT", "NOUT", "NIN")
+
+
+def classify(factories):
+    """Split node types into sources, filters (in and out) and sinks by their attributes"""
+    sources, filters, sinks = [], [], []
+    for type_id, factory in factories.items():
+        node = factory(type_id, None)
+        inputs, outputs = len(node._input_attributes), len(node._output_attributes)
+        if inputs == 0 and outputs > 0:
+            sources.append(type_id)
+        elif inputs > 0 and outputs > 0:
+            filters.append(type_id)
+        elif inputs > 0:
+            sinks.append(type_id)
+    return sources, filters, sinks
+
+
+def write_impulse_response(path, rate, seconds=0.5, channels=1):
+    """Exponentially decaying noise, a stand-in room response for convolver nodes"""
+    frames = int(seconds * rate)
+    decay = np.exp(-6.9 * np.arange(frames) / frames)
+    ir = np.random.default_rng(0).standard_normal((frames, channels)) * decay[:, None] * 0.1
+
+    writer = WavWriter(path, rate, channels, np.float32)
+    writer.write(ir.astype(np.float32))
+    writer.close()
+
+
+def node_data(types, directory):
+    """Settings for node types that need a file to run: a generated IR for convolvers"""
+    data = {}
+    if "CONV" in types:
+        path = os.path.join(directory, "ir.wav")
+        write_impulse_response(path, audioio.audio_manager.get_input_settings()["rate"])
+        data["CONV"] = {"path": path}
+    return data
+
+
+def synthetic_graph(width, depth, source, filters, sinks, outputs=1, data=None):
+    """One source fanned out to width branches of depth filters, each ending in a sink
+
+    data maps node types to the settings their nodes are created with.
+    """
+    data = data or {}
+    nodes = [{"id": "src", "type": source}]
+    links = []
+
+    for b in range(width):
+        prev, prev_attr = "src", b % outputs
+        for d in range(depth if filters else 0):
+            node_id = f"b{b}f{d}"
+            node_type = filters[(b + d) % len(filters)]
+            nodes.append({"id": node_id, "type": node_type, "data": data.get(node_type)})
+            links.append({"output_node": prev, "output_attr": prev_attr, "input_node": node_id, "input_attr": 0})
+            prev, prev_attr = node_id, 0
+
+        sink_id = f"b{b}out"
+        node_type = sinks[b % len(sinks)]
+        nodes.append({"id": sink_id, "type": node_type, "data": data.get(node_type)})
+        links.append({"output_node": prev, "output_attr": prev_attr, "input_node": sink_id, "input_attr": 0})
+
+    return {"nodes": nodes, "links": links}
+
+
+def _percentiles(samples):
+    samples = np.asarray(samples)
+    return {
+        "mean": float(samples.mean()),
+        "p50": float(np.percentile(samples, 50)),
+        "p90": float(np.percentile(samples, 90)),
+        "p99": float(np.percentile(samples, 99)),
+        "max": float(samples.max()),
+    }
+
+
+def run_benchmark(graph, factories, blocks=500, warmup=20, alloc_blocks=50):
+    """Time every node of the graph for a number of blocks, returns the report dict"""
+    engine = Engine(factories)
+    engine.load(graph)
+    order = engine.plan.order
+    steps = [engine.plan.nodes[node_id].process for node_id in order]
+
+    for _ in range(warmup):
+        engine.run_block()
+
+    node_times = np.zeros((blocks, len(steps)))
+    block_times = np.zeros(blocks)
+    clock = time.perf_counter
+
+    started = clock()
+    for b in range(blocks):
+        block_start = clock()
+        for i, step in enumerate(steps):
+            t = clock()
+            step(None)
+            node_times[b, i] = clock() - t
+        block_times[b] = clock() - block_start
+    elapsed = clock() - started
+
+    # Allocation pass separately, tracemalloc would skew the timings
+    alloc = []
+    tracemalloc.start()
+    for _ in range(alloc_blocks):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        engine.run_block()
+        alloc.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    engine.close()
+
+    types = {n["id"]: n["type"] for n in graph["nodes"]}
+    return {
+        "blocks": blocks,
+        "blocks_per_second": blocks / elapsed if elapsed > 0 else 0.0,
+        "block_period": audioio.audio_manager.block_period(),
+        "block_time": _percentiles(block_times),
+        "alloc_bytes_per_block": _percentiles(alloc) if alloc else None,
+        # Regions of linear nodes run fused, under a "fused <first node>" id
+        "nodes": {node_id: dict(type=types.get(node_id, "fused"), **_percentiles(node_times[:, i]))
+                  for i, node_id in enumerate(order)},
+    }
+
+
+def compare(report, baseline):
+    """Print current vs baseline block latency and per-type p50"""
+    for key in ("p50", "p99"):
+        old, new = baseline["block_time"][key], report["block_time"][key]
+        print(f"block {key}: {old * 1e6:.0f}us -> {new * 1e6:.0f}us ({new / old:.2f}x)" if old > 0 else "")
+
+    def by_type(r):
+        totals = {}
+        for node in r["nodes"].values():
+            totals.setdefault(node["type"], []).append(node["p50"])
+        return {t: float(np.mean(v)) for t, v in totals.items()}
+
+    old_types, new_types = by_type(baseline), by_type(report)
+    for type_id in sorted(set(old_types) & set(new_types)):
+        old, new = old_types[type_id], new_types[type_id]
+        print(f"{type_id}: p50 {old * 1e6:.0f}us -> {new * 1e6:.0f}us ({new / old:.2f}x)" if old > 0 else "")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m engine.bench", description="Benchmark synthetic NodeDSP graphs")
+    parser.add_argument("--width", type=int, default=4, help="parallel branches fanned out from the source")
+    parser.add_argument("--depth", type=int, default=2, help="filter nodes per branch")
+    parser.add_argument("--blocks", type=int, default=500)
+    parser.add_argument("--source", default="AIN")
+    parser.add_argument("--types", default="", help="comma separated node types to draw filters and sinks from")
+    parser.add_argument("--out", default="", help="write the report to this JSON file")
+    parser.add_argument("--compare", default="", help="baseline JSON report to compare against")
+    args = parser.parse_args()
+
+    # No hardware: streams read silence instantly so only graph cost is measured
+    audioio.audio_manager.set_backend("Null")
+
+    factories = registry.factories()
+    allowed = args.types.split(",") if args.types else [t for t in factories if t not in DEFAULT_EXCLUDE]
+    _, filters, sinks = classify({t: factories[t] for t in allowed})
+    outputs = len(factories[args.source](args.source, None)._output_attributes)
+
+    with tempfile.TemporaryDirectory() as directory:
+        graph = synthetic_graph(args.width, args.depth, args.source, filters, sinks, outputs,
+                                node_data(filters + sinks, directory))
+        report = run_benchmark(graph, factories, args.blocks)
+    report["config"] = {"width": args.width, "depth": args.depth, "source": args.source, "filters": filters,
+                        "sinks": sinks, "python": platform.python_version(), "numpy": np.__version__,
+                        "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+    block = report["block_time"]
+    print(f"{len(graph['nodes'])} nodes | {report['blocks_per_second']:.0f} blocks/s | "
+          f"block p50 {block['p50'] * 1e6:.0f}us p99 {block['p99'] * 1e6:.0f}us max {block['max'] * 1e6:.0f}us | "
+          f"budget {report['block_period'] * 1e6:.0f}us")
+    if report["alloc_bytes_per_block"]:
+        print(f"allocated per block: p50 {report['alloc_bytes_per_block']['p50'] / 1024:.1f} KiB")
+    for node_id, node in report["nodes"].items():
+        print(f"  {node_id:<10} {node['type']:<6} p50 {node['p50'] * 1e6:8.1f}us  p99 {node['p99'] * 1e6:8.1f}us")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
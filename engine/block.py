@@ -0,0 +1,166 @@
+import numpy as np
+
+# Working sample format inside the graph; devices and files convert to and from it at their edges
+CANONICAL_DTYPE = np.dtype(np.float32)
+
+
+class AudioBlock:
+    """One block of audio: a (channels, frames) buffer plus its rate and position in the stream
+
+    Per-channel blocks made with channel() are views into the same buffer, so
+    fanning a source out to its channel outputs copies nothing. Iterating gives
+    the legacy (data, rate, frame_size) tuple, with 1-D data for a single channel.
+    """
+    __slots__ = ("data", "rate", "frame_index", "timestamp", "source", "index")
+
+    def __init__(self, data, rate, frame_index=0, timestamp=0.0, source=None, index=0):
+        self.data = data
+        self.rate = rate
+        self.frame_index = frame_index
+        self.timestamp = timestamp
+        # Block this one is a channel view of, and its first channel there
+        self.source = source
+        self.index = index
+
+    @property
+    def channels(self):
+        return self.data.shape[0]
+
+    @property
+    def frames(self):
+        return self.data.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def channel(self, ch):
+        """Single-channel view sharing this block's buffer"""
+        return AudioBlock(self.data[ch:ch + 1], self.rate, self.frame_index, self.timestamp, self, ch)
+
+    def interleaved(self):
+        """(frames, channels) view of the buffer, the layout devices read and write"""
+        return self.data.T
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def __iter__(self):
+        yield self.data[0] if self.data.shape[0] == 1 else self.data
+        yield self.rate
+        yield self.data.shape[1]
+
+
+def common_source(blocks):
+    """Return the block all of these are in-order channel views of, or None"""
+    if not blocks:
+        return None
+
+    source = blocks[0].source
+    if source is None or len(blocks) != source.channels:
+        return None
+
+    for i, block in enumerate(blocks):
+        if block.source is not source or block.index != i:
+            return None
+
+    return source
+
+
+def stack_channels(blocks, buffer=None, dtype=CANONICAL_DTYPE):
+    """(len(blocks), frames) array of mono blocks in dtype, ints scaled to [-1, 1] and None silent
+
+    Channels that are all in-order views of one block already in dtype are
+    returned as that block's buffer. Otherwise they are copied into buffer,
+    reallocated when its shape or dtype does not fit; returns (array, buffer).
+    With dtype None the samples keep the first block's format, unscaled.
+    """
+    live = [block for block in blocks if block is not None]
+    if dtype is None:
+        dtype = live[0].data.dtype if live else CANONICAL_DTYPE
+    dtype = np.dtype(dtype)
+
+    source = common_source(blocks) if None not in blocks else None
+    if source is not None and source.data.dtype == dtype:
+        return source.data, buffer
+
+    frames = max((block.frames for block in live), default=0)
+    if buffer is None or buffer.shape != (len(blocks), frames) or buffer.dtype != dtype:
+        buffer = np.zeros((len(blocks), frames), dtype=dtype)
+
+    for i, block in enumerate(blocks):
+        if block is None:
+            buffer[i] = 0
+            continue
+
+        buffer[i, :block.frames] = block.data[0]
+        buffer[i, block.frames:] = 0
+        if block.data.dtype.kind == "i" and dtype.kind == "f":
+            buffer[i, :block.frames] /= -float(np.iinfo(block.data.dtype).min)
+
+    return buffer, buffer
+
+
+class InputGather:
+    """A node's input blocks, taken once each and stacked into one (channels, frames) array
+
+    Ports keep their last block, so a node runs again on the same blocks until
+    upstream produces new ones; processing them twice would repeat audio or
+    corrupt filter state. New blocks are told apart by identity with the first
+    block taken last time. Unlinked channels are None, or left out with compact.
+    """
+
+    def __init__(self, compact=False):
+        self.compact = compact
+        # First block of the last take, also the rate and position reference for the output
+        self.last = None
+        self.buffer = None
+
+    def take(self, attributes):
+        """Blocks on these attributes, or None if there are none or they were taken already"""
+        blocks = [attr.get_data() for attr in attributes]
+        blocks = [block if block is not None and len(block) > 0 else None for block in blocks]
+        live = [block for block in blocks if block is not None]
+        if not live or live[0] is self.last:
+            return None
+
+        self.last = live[0]
+        return live if self.compact else blocks
+
+    def stack(self, blocks, dtype=CANONICAL_DTYPE):
+        """The blocks as one array, see stack_channels; the buffer is reused between calls"""
+        array, self.buffer = stack_channels(blocks, self.buffer, dtype)
+        return array
+
+
+def accepted_formats(node):
+    """Sample dtypes a node's inputs take; nodes that don't say work in the canonical format"""
+    return getattr(node, "input_formats", (CANONICAL_DTYPE,))
+
+
+def convert(data, dtype, out=None):
+    """Scale samples between integer full scale and the float [-1, 1] range, clipping to the target
+
+    Writes into out when given, which may be any same-shaped view (e.g. the
+    transpose of an interleaved buffer), so deinterleaving and conversion are
+    one pass. Returns out; a matching dtype is a plain copy.
+    """
+    dtype = np.dtype(dtype)
+    if out is None:
+        out = np.empty(data.shape, dtype=dtype)
+
+    source = data.dtype
+    if source == dtype:
+        np.copyto(out, data)
+    elif dtype.kind == "f":
+        np.multiply(data, 1.0 / -float(np.iinfo(source).min) if source.kind == "i" else 1.0, out=out,
+                    casting="same_kind")
+    else:
+        # Full scale is -min both ways, so integer samples survive a round trip through float exactly
+        info = np.iinfo(dtype)
+        scaled = data * (-float(info.min) / -float(np.iinfo(source).min) if source.kind == "i" else -float(info.min))
+        np.rint(scaled, out=scaled)
+        np.clip(scaled, info.min, info.max, out=scaled)
+        np.copyto(out, scaled, casting="unsafe")
+
+    return out
@@ -0,0 +1,84 @@
+import time
+
+
+class UIBroker:
+    """Latest-value slots between DSP threads and the GUI thread
+
+    Publishers store an update callable in the slot of the widget it touches and
+    return at once; a newer update replaces one not yet applied. The GUI thread
+    calls apply once per frame, running at most one update per slot, and only
+    for slots whose rate limit has elapsed. Slot operations are single dict
+    stores and pops, so publishers never wait on the GUI.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.slots = {}
+        # Slot key -> minimum seconds between applied updates
+        self.intervals = {}
+        self.last_applied = {}
+
+        self.published = 0
+        self.applied = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def set_rate(self, key, rate):
+        """Apply updates of this slot at most rate times per second; 0 or None removes the limit"""
+        if rate:
+            self.intervals[key] = 1.0 / rate
+        else:
+            self.intervals.pop(key, None)
+
+    def due(self, key, now=None):
+        """True if an update published now would be applied on the next frame"""
+        interval = self.intervals.get(key)
+        if interval is None:
+            return True
+        now = self.clock() if now is None else now
+        return now - self.last_applied.get(key, 0.0) >= interval
+
+    def publish(self, key, update, *args):
+        """Queue update(*args) for the GUI thread, replacing the slot's pending update"""
+        if self.slots.get(key) is not None:
+            self.dropped += 1
+        self.slots[key] = (update, args)
+        self.published += 1
+
+    def discard(self, key):
+        """Forget a slot, e.g. when its widget is deleted"""
+        self.slots.pop(key, None)
+        self.intervals.pop(key, None)
+        self.last_applied.pop(key, None)
+
+    def apply(self, now=None):
+        """Run the pending update of every slot that is due; call from the GUI thread only"""
+        now = self.clock() if now is None else now
+        for key in list(self.slots):
+            if not self.due(key, now):
+                continue
+
+            pending = self.slots.pop(key, None)
+            if pending is None:
+                continue
+
+            update, args = pending
+            self.last_applied[key] = now
+            try:
+                update(*args)
+                self.applied += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"UI update error ({key}): {e}")
+
+    def stats(self):
+        return {
+            "pending": len(self.slots),
+            "published": self.published,
+            "applied": self.applied,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+ui_broker = UIBroker()
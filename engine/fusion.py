@@ -0,0 +1,166 @@
+import numpy as np
+
+from engine.block import AudioBlock, stack_channels
+from engine.graph import LinkSpec, NodeSpec, topological_order
+
+
+def is_linear(node):
+    return hasattr(node, "mix_matrix")
+
+
+class FusedMix:
+    """Connected linear nodes (gain, pan, sum, router) run as one matrix product
+
+    The region reads the ports feeding it from outside and writes only the
+    output ports something outside reads. Its matrix is the product of the
+    member matrices along every path, rebuilt when a member's mix_version
+    changes, so a block costs one stack and one np.dot for the whole region.
+    """
+
+    def __init__(self, members, nodes):
+        self.members = members
+        self.member_nodes = [nodes[node_id] for node_id in members]
+
+        produced = {}
+        for node_id in members:
+            for port in nodes[node_id]._output_attributes:
+                produced[id(port)] = port
+
+        # Ports from outside (an unlinked input has its own never-written port, so it reads as silence)
+        self._input_attributes = []
+        seen = set()
+        for node in self.member_nodes:
+            for port in node._input_attributes:
+                if id(port) not in produced and id(port) not in seen:
+                    seen.add(id(port))
+                    self._input_attributes.append(port)
+
+        self._output_attributes = []
+        self.matrix = None
+        self.versions = None
+
+        self.input_buffer = None
+        self.last_blocks = None
+
+    def expose(self, port):
+        """Make a member output port one of the region's outputs"""
+        if all(port is not p for p in self._output_attributes):
+            self._output_attributes.append(port)
+            self.versions = None
+
+    def _build(self):
+        index = {id(port): i for i, port in enumerate(self._input_attributes)}
+        identity = np.eye(len(self._input_attributes), dtype=np.float64)
+
+        # Gains from the region inputs to every port, walking members in graph order
+        rows = {}
+
+        def gains(port):
+            return rows[id(port)] if id(port) in rows else identity[index[id(port)]]
+
+        for node in self.member_nodes:
+            x = np.array([gains(port) for port in node._input_attributes])
+            x = x.reshape(len(node._input_attributes), len(identity))
+            for port, row in zip(node._output_attributes, node.mix_matrix().astype(np.float64) @ x):
+                rows[id(port)] = row
+
+        matrix = np.array([rows[id(port)] for port in self._output_attributes], dtype=np.float32)
+        self.matrix = matrix.reshape(len(self._output_attributes), len(self._input_attributes))
+        self.versions = [node.mix_version for node in self.member_nodes]
+
+    def process(self, data):
+        blocks = [port.get_data() for port in self._input_attributes]
+        blocks = [block if block is not None and len(block) > 0 else None for block in blocks]
+
+        # Nothing new on any input: consumers still hold the last mix
+        if self.last_blocks is not None and all(a is b for a, b in zip(blocks, self.last_blocks)):
+            return
+        self.last_blocks = blocks
+
+        live = [block for block in blocks if block is not None]
+        if not live:
+            return
+
+        if self.versions is None or any(node.mix_version != v for node, v in zip(self.member_nodes, self.versions)):
+            self._build()
+
+        audio_array, self.input_buffer = stack_channels(blocks, self.input_buffer)
+        out = AudioBlock(np.dot(self.matrix, audio_array), live[0].rate, live[0].frame_index, live[0].timestamp)
+        for ch, port in enumerate(self._output_attributes):
+            port.set_data(out.channel(ch))
+
+
+def _regions(order, nodes, links):
+    """Connected groups of at least two linear nodes, each listed in graph order"""
+    parent = {node_id: node_id for node_id in order if is_linear(nodes[node_id])}
+
+    def find(node_id):
+        while parent[node_id] != node_id:
+            parent[node_id] = parent[parent[node_id]]
+            node_id = parent[node_id]
+        return node_id
+
+    for link in links:
+        if link.output_node in parent and link.input_node in parent:
+            parent[find(link.output_node)] = find(link.input_node)
+
+    groups = {}
+    for node_id in order:
+        if node_id in parent:
+            groups.setdefault(find(node_id), []).append(node_id)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def _contract(order, links, region_of):
+    """Order and links of the graph with every region collapsed into one node"""
+    def rename(node_id):
+        return region_of.get(node_id, node_id)
+
+    contracted = []
+    for link in links:
+        a, b = rename(link.output_node), rename(link.input_node)
+        if a != b:
+            contracted.append(LinkSpec(a, link.output_attr, b, link.input_attr))
+
+    specs, seen = [], set()
+    for node_id in order:
+        if rename(node_id) not in seen:
+            seen.add(rename(node_id))
+            specs.append(NodeSpec(rename(node_id), None, None, None))
+    return topological_order(specs, contracted), contracted
+
+
+def fuse_linear(order, nodes, links):
+    """Replace each region of linked linear nodes with a FusedMix
+
+    Returns (order, nodes, links) for the execution plan; the node dict gets a
+    "fused <first member>" entry per region. A region a non-linear path leaves
+    and re-enters can't run as one step and is left as it is.
+    """
+    nodes = dict(nodes)
+    region_of = {}
+    plan_order, plan_links = order, links
+
+    for members in _regions(order, nodes, links):
+        fused_id = f"fused {members[0]}"
+        trial = {**region_of, **{node_id: fused_id for node_id in members}}
+        try:
+            new_order, new_links = _contract(order, links, trial)
+        except ValueError:
+            continue
+
+        fused = FusedMix(members, nodes)
+        member_set = set(members)
+        consumed = {id(port) for node_id, node in nodes.items() if node_id not in member_set
+                    for port in node._input_attributes}
+        for node_id in members:
+            for port in nodes[node_id]._output_attributes:
+                if id(port) in consumed:
+                    fused.expose(port)
+
+        nodes[fused_id] = fused
+        region_of = trial
+        plan_order, plan_links = new_order, new_links
+
+    return plan_order, nodes, plan_links
+
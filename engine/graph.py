@@ -0,0 +1,640 @@
+import itertools
+import json
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from engine.block import CANONICAL_DTYPE, accepted_formats
+from engine.scheduler import modes
+
+
+class Port:
+    """Shared slot standing in for a linked output/input attribute pair"""
+    __slots__ = ("label", "_data")
+
+    def __init__(self, label, data=None):
+        self.label = label
+        self._data = data
+
+    def get_data(self):
+        return self._data
+
+    def set_data(self, data):
+        self._data = data
+
+
+class NodeSpec:
+    """Node entry of a saved graph"""
+    __slots__ = ("id", "type", "name", "data", "worker")
+
+    def __init__(self, node_id, node_type, name, data, worker=None):
+        self.id = node_id
+        self.type = node_type
+        self.name = name
+        self.data = data
+        # Name of the worker process group this node runs in, None for the main process
+        self.worker = worker
+
+    def key(self):
+        return self.type, json.dumps(self.data, sort_keys=True, default=str)
+
+    def to_dict(self):
+        return {"id": self.id, "type": self.type, "name": self.name, "data": self.data}
+
+
+class LinkSpec:
+    """Link entry of a saved graph, attributes given by index or label"""
+    __slots__ = ("output_node", "output_attr", "input_node", "input_attr")
+
+    def __init__(self, output_node, output_attr, input_node, input_attr):
+        self.output_node = output_node
+        self.output_attr = output_attr
+        self.input_node = input_node
+        self.input_attr = input_attr
+
+    def to_dict(self):
+        return {"output_node": self.output_node, "output_attr": self.output_attr,
+                "input_node": self.input_node, "input_attr": self.input_attr}
+
+
+def parse_graph(data):
+    """Read the dict written by Nodeditor.save into node and link specs
+
+    Expected layout:
+        {"nodes": [{"id": ..., "type": "AIN", "name": ..., "data": ...}, ...],
+         "links": [{"output_node": id, "output_attr": 0 or "Channel 0",
+                    "input_node": id, "input_attr": ...}, ...]}
+
+    A node entry may also carry "worker": "<group>" to run it, together with
+    every other node of that group, in a separate process.
+    """
+    nodes = []
+    for entry in data.get("nodes", []):
+        nodes.append(NodeSpec(entry["id"], entry["type"], entry.get("name", entry["type"]), entry.get("data"),
+                              entry.get("worker")))
+
+    links = []
+    for entry in data.get("links", []):
+        links.append(LinkSpec(entry["output_node"], entry["output_attr"], entry["input_node"], entry["input_attr"]))
+
+    return nodes, links
+
+
+# Version written by this code; files without one are version 1
+GRAPH_VERSION = 1
+
+
+def _graph_events(f, chunk_size=1 << 16):
+    """Yield ("node", entry), ("link", entry) and ("meta", key, value) from a saved graph file
+
+    Node and link entries are decoded one at a time from fixed-size reads, so a
+    large patch never has to be held as one string and a bad entry is reported
+    before the rest of the file is read.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    def expect(chars):
+        nonlocal pos
+        skip_ws()
+        if pos >= len(buf) or buf[pos] not in chars:
+            found = buf[pos] if pos < len(buf) else "end of file"
+            raise ValueError(f"Malformed graph file: expected {chars!r}, found {found!r}")
+        pos += 1
+        return buf[pos - 1]
+
+    def value():
+        nonlocal pos
+        skip_ws()
+        while True:
+            try:
+                result, end = decoder.raw_decode(buf, pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(buf) or eof:
+                    pos = end
+                    return result
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"Malformed graph file: {e.msg}")
+            fill()
+
+    expect("{")
+    skip_ws()
+    if pos < len(buf) and buf[pos] == "}":
+        return
+
+    while True:
+        key = value()
+        expect(":")
+        if key in ("nodes", "links"):
+            kind = key[:-1]
+            expect("[")
+            skip_ws()
+            if buf[pos:pos + 1] == "]":
+                pos += 1
+            else:
+                while True:
+                    yield kind, value()
+                    if expect(",]") == "]":
+                        break
+        else:
+            yield "meta", key, value()
+
+        if expect(",}") == "}":
+            return
+
+
+def read_graph(path):
+    """Load a saved graph file into the dict parse_graph takes, checking its version"""
+    data = {"version": 1, "nodes": [], "links": []}
+    with open(path, "r") as f:
+        for event in _graph_events(f):
+            if event[0] == "meta":
+                data[event[1]] = event[2]
+                if event[1] == "version" and not (isinstance(event[2], int) and 1 <= event[2] <= GRAPH_VERSION):
+                    raise ValueError(f"Unsupported graph file version {event[2]} (this build reads up to "
+                                     f"{GRAPH_VERSION})")
+            else:
+                data[event[0] + "s"].append(event[1])
+    return data
+
+
+def validate_graph(data, factories):
+    """List the problems of a saved graph without instantiating any node
+
+    Checks entry fields, node types, duplicate ids, links to unknown nodes and
+    cycles. Attribute labels can only be checked against live nodes.
+    """
+    problems = []
+    ids = set()
+    for i, entry in enumerate(data.get("nodes", [])):
+        if not isinstance(entry, dict) or "id" not in entry or "type" not in entry:
+            problems.append(f"Node entry {i} needs an id and a type")
+            continue
+        if entry["id"] in ids:
+            problems.append(f"Duplicate node id: {entry['id']}")
+        ids.add(entry["id"])
+        if entry["type"] not in factories:
+            problems.append(f"Unknown node type: {entry['type']} (node {entry['id']})")
+
+    if data.get("mode", modes[0]) not in modes:
+        problems.append(f"Unknown processing mode: {data['mode']}")
+
+    fields = ("output_node", "output_attr", "input_node", "input_attr")
+    for i, entry in enumerate(data.get("links", [])):
+        if not isinstance(entry, dict) or any(field not in entry for field in fields):
+            problems.append(f"Link entry {i} needs {', '.join(fields)}")
+            continue
+        for field in ("output_node", "input_node"):
+            if entry[field] not in ids:
+                problems.append(f"Link {i} references unknown node: {entry[field]}")
+        for field in ("output_attr", "input_attr"):
+            if not isinstance(entry[field], (int, str)) or isinstance(entry[field], int) and entry[field] < 0:
+                problems.append(f"Link {i} has an invalid {field}: {entry[field]!r}")
+
+    if not problems:
+        try:
+            topological_order(*parse_graph(data))
+        except ValueError as e:
+            problems.append(str(e))
+
+    return problems
+
+
+def graph_fingerprint(data):
+    """Stable hash of a saved graph, used to skip rebuilding an unchanged plan"""
+    return hash(json.dumps(data, sort_keys=True, default=str))
+
+
+def topological_order(nodes, links):
+    """Order node ids so every node runs after the nodes feeding it (Kahn, file order on ties)"""
+    ids = [n.id for n in nodes]
+    downstream = {node_id: [] for node_id in ids}
+    indegree = {node_id: 0 for node_id in ids}
+
+    for link in links:
+        if link.output_node not in downstream or link.input_node not in indegree:
+            raise ValueError(f"Link references unknown node: {link.output_node} -> {link.input_node}")
+        downstream[link.output_node].append(link.input_node)
+        indegree[link.input_node] += 1
+
+    ready = [node_id for node_id in ids if indegree[node_id] == 0]
+    order = []
+    while ready:
+        node_id = ready.pop(0)
+        order.append(node_id)
+        for child in downstream[node_id]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+
+    if len(order) != len(ids):
+        raise ValueError("Graph contains a cycle")
+
+    return order
+
+
+def _find_attr(attributes, ref):
+    if isinstance(ref, int):
+        return ref if 0 <= ref < len(attributes) else None
+
+    for i, attr in enumerate(attributes):
+        if getattr(attr, "label", None) == ref or getattr(attr, "_label", None) == ref:
+            return i
+
+    return None
+
+
+def split_workers(nodes, links):
+    """Contract each worker group into one unit, returns (units, links)
+
+    Units are the main-process node specs plus one "worker" spec per group, whose
+    data holds the group's subgraph and its boundary (node id, attribute) slots.
+    The subgraph lists its nodes linked across the boundary, so they are scheduled
+    in the worker even without a link inside it.
+    Links crossing a group boundary are rewritten to point at the group unit.
+    """
+    member = {n.id: f"worker:{n.worker}" for n in nodes if n.worker is not None}
+    if not member:
+        return nodes, links
+
+    groups = {}
+    for n in nodes:
+        if n.worker is not None:
+            group = groups.setdefault(member[n.id], {"graph": {"nodes": [], "links": [], "boundary": []},
+                                                     "inputs": [], "outputs": []})
+            group["graph"]["nodes"].append(n.to_dict())
+
+    outer = []
+    for link in links:
+        src_group = member.get(link.output_node)
+        dst_group = member.get(link.input_node)
+        if src_group is not None and src_group == dst_group:
+            groups[src_group]["graph"]["links"].append(link.to_dict())
+            continue
+
+        output_node, output_attr = link.output_node, link.output_attr
+        input_node, input_attr = link.input_node, link.input_attr
+
+        for group, node_id in ((src_group, link.output_node), (dst_group, link.input_node)):
+            if group is not None and node_id not in groups[group]["graph"]["boundary"]:
+                groups[group]["graph"]["boundary"].append(node_id)
+
+        if src_group is not None:
+            outputs = groups[src_group]["outputs"]
+            slot = [link.output_node, link.output_attr]
+            if slot not in outputs:
+                outputs.append(slot)
+            output_node, output_attr = src_group, outputs.index(slot)
+
+        if dst_group is not None:
+            inputs = groups[dst_group]["inputs"]
+            inputs.append([link.input_node, link.input_attr])
+            input_node, input_attr = dst_group, len(inputs) - 1
+
+        outer.append(LinkSpec(output_node, output_attr, input_node, input_attr))
+
+    units = [n for n in nodes if n.worker is None]
+    units += [NodeSpec(group_id, "worker", group_id, group) for group_id, group in groups.items()]
+    return units, outer
+
+
+class ExecutionPlan:
+    """Flat, topologically sorted schedule with links resolved to shared ports"""
+
+    def __init__(self, order, nodes):
+        self.order = order
+        self.nodes = nodes
+        self.steps = [nodes[node_id].process for node_id in order]
+
+    def run(self, data=None):
+        for step in self.steps:
+            step(data)
+
+
+class EditorPlan:
+    """Execution plan over the node editor's own node objects, rebuilt when their links change
+
+    Editor attributes are linked directly: an output attribute hands each block
+    to the inputs added with add_child. The factories from tracked() record
+    those links as the editor makes them, so the linked nodes are ordered once
+    per change instead of walking the graph from every source on each tick.
+    Links are compared again for recheck_ticks ticks after invalidate(), which
+    the editor calls on input that may add, delete or relink nodes.
+    """
+
+    def __init__(self, recheck_ticks=64):
+        # Every node the editor created; deleted ones drop out once collected
+        self.nodes = weakref.WeakValueDictionary()
+        self._keys = itertools.count()
+        # Input attribute id -> (output node key, output attribute, input attribute); an input has one source
+        self.wired = {}
+        self.recheck_ticks = recheck_ticks
+        self.recheck = recheck_ticks
+        self.links = None
+        self.plan = None
+
+    def tracked(self, factory):
+        """Factory that registers every node it creates, and the links made from its outputs, with the plan"""
+        def create(name, data):
+            node = factory(name, data)
+            key = next(self._keys)
+            self.nodes[key] = node
+            for attr in node._output_attributes:
+                self._track_output(key, attr)
+
+            # Outputs added later (a channel count change) are tracked too
+            add_output_attribute = node.add_output_attribute
+
+            def add_tracked(attr, *args, **kwargs):
+                add_output_attribute(attr, *args, **kwargs)
+                self._track_output(key, attr)
+
+            node.add_output_attribute = add_tracked
+            self.invalidate()
+            return node
+        return create
+
+    def _track_output(self, key, attr):
+        add_child = attr.add_child
+
+        def add_tracked(parent, child):
+            add_child(parent, child)
+            self.wired[id(child)] = (key, attr, child)
+            self.invalidate()
+
+        attr.add_child = add_tracked
+
+    def invalidate(self):
+        self.recheck = self.recheck_ticks
+
+    def _read_links(self, nodes):
+        owner = {}
+        outputs = {}
+        for key, node in nodes:
+            for i, attr in enumerate(node._input_attributes):
+                owner[id(attr)] = (key, i)
+            for i, attr in enumerate(node._output_attributes):
+                outputs[id(attr)] = i
+
+        # Links whose nodes (or attributes) were deleted are dropped
+        for child_id, (key, attr, child) in list(self.wired.items()):
+            if key not in self.nodes or id(attr) not in outputs or child_id not in owner:
+                del self.wired[child_id]
+        return sorted((key, outputs[id(attr)]) + owner[child_id] for child_id, (key, attr, _) in self.wired.items())
+
+    def update(self):
+        """Rebuild the plan if the links between the tracked nodes changed"""
+        nodes = sorted(self.nodes.items(), key=lambda item: item[0])
+        links = self._read_links(nodes)
+        if links == self.links:
+            return False
+        self.links = links
+
+        specs = [NodeSpec(key, type(node).__name__, key, None) for key, node in nodes]
+        link_specs = [LinkSpec(*link) for link in links]
+        linked = {link[0] for link in links} | {link[2] for link in links}
+        try:
+            order = [key for key in topological_order(specs, link_specs) if key in linked]
+        except ValueError as e:
+            # Reported once per change; nothing runs until the cycle is broken
+            print(f"Graph processing error: {e}")
+            self.plan = None
+            return True
+
+        # Weak references, so the plan doesn't keep a node the editor deleted alive
+        nodes = dict(nodes)
+        self.plan = [weakref.ref(nodes[key]) for key in order]
+        return True
+
+    def run(self, data=None):
+        """Run every linked node once"""
+        if self.recheck > 0:
+            self.recheck -= 1
+            self.update()
+
+        for step in self.plan or ():
+            node = step()
+            if node is None:
+                # Deleted since the plan was built
+                self.invalidate()
+                continue
+            node.process(data)
+
+
+class Engine:
+    """Headless graph runner for patches saved by the node editor"""
+
+    def __init__(self, factories, threads=0, metrics=None, fuse=True):
+        self.factories = factories
+        # Run connected gain/pan/sum/router nodes as one matrix product per region
+        self.fuse = fuse
+        # MetricsRegistry instrumenting every node created, keyed by node id
+        self.metrics = metrics
+        self.nodes = {}
+        self.plan = None
+        # With more than one thread, independent branches run concurrently on a persistent pool
+        self.threads = threads
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix="nodedsp-branch") if threads > 1 else None
+        self.fingerprint = None
+        # Processing mode saved with the graph (scheduler.LATENCY or THROUGHPUT), None if not given
+        self.mode = None
+        self._node_keys = {}
+        self._path = None
+        self._mtime = None
+
+    def load(self, data):
+        """Build the execution plan, keeping it as-is if the graph did not change"""
+        fingerprint = graph_fingerprint(data)
+        if fingerprint == self.fingerprint:
+            return False
+        self.mode = data.get("mode")
+
+        specs, links = parse_graph(data)
+        specs, links = split_workers(specs, links)
+        order = topological_order(specs, links)
+
+        # Reuse node instances whose type and settings are unchanged, so devices stay open
+        nodes = {}
+        keys = {}
+        for spec in specs:
+            if spec.type != "worker" and spec.type not in self.factories:
+                raise ValueError(f"Unknown node type: {spec.type}")
+
+            key = spec.key()
+            if self._node_keys.get(spec.id) == key:
+                nodes[spec.id] = self.nodes[spec.id]
+            elif spec.type == "worker":
+                from engine.worker import WorkerGroup
+                nodes[spec.id] = WorkerGroup(spec.id, spec.data["graph"], spec.data["inputs"], spec.data["outputs"],
+                                             self.factories)
+            else:
+                nodes[spec.id] = self.factories[spec.type](spec.name, spec.data)
+
+            if self.metrics is not None and nodes[spec.id] is not self.nodes.get(spec.id):
+                self.metrics.instrument(nodes[spec.id], spec.id, spec.type)
+            keys[spec.id] = key
+
+        # Worker processes of groups that are gone are shut down now rather than at collection
+        for node_id, node in self.nodes.items():
+            if nodes.get(node_id) is not node and hasattr(node, "close"):
+                node.close()
+
+        self._wire(nodes, links)
+        self._negotiate(nodes, links)
+
+        # Nodes without links can't consume or produce anything; leaving them out means they are never activated.
+        # In a worker, nodes linked to the main process count as linked.
+        linked = {link.output_node for link in links} | {link.input_node for link in links}
+        linked |= set(data.get("boundary", ()))
+        order = [node_id for node_id in order if node_id in linked]
+
+        self.nodes = nodes
+        self._node_keys = keys
+
+        plan_nodes = nodes
+        if self.fuse:
+            from engine.fusion import fuse_linear
+            order, plan_nodes, links = fuse_linear(order, nodes, links)
+            if self.metrics is not None:
+                for node_id in order:
+                    if node_id not in nodes:
+                        self.metrics.instrument(plan_nodes[node_id], node_id, "fused")
+
+        if self.pool is not None:
+            from engine.parallel import ParallelPlan
+            self.plan = ParallelPlan(order, plan_nodes, links, self.pool, self.threads)
+        else:
+            self.plan = ExecutionPlan(order, plan_nodes)
+        self.fingerprint = fingerprint
+        return True
+
+    def _wire(self, nodes, links):
+        # Every attribute slot gets a Port; linked slots share the output's Port
+        for node in nodes.values():
+            node._output_attributes = [Port(self._label(attr)) for attr in node._output_attributes]
+            node._input_attributes = [Port(self._label(attr)) for attr in node._input_attributes]
+
+        for link in links:
+            src = nodes[link.output_node]
+            dst = nodes[link.input_node]
+            out_index = _find_attr(src._output_attributes, link.output_attr)
+            in_index = _find_attr(dst._input_attributes, link.input_attr)
+            if out_index is None or in_index is None:
+                raise ValueError(f"Link references unknown attribute: {link.output_attr} -> {link.input_attr}")
+
+            dst._input_attributes[in_index] = src._output_attributes[out_index]
+
+    @staticmethod
+    def _negotiate(nodes, links):
+        # Sources hand out their native sample format only when every consumer takes it as-is
+        # (e.g. a device straight into a sink of the same format); otherwise float32
+        consumers = {}
+        for link in links:
+            consumers.setdefault(link.output_node, []).append(nodes[link.input_node])
+
+        for node_id, node in nodes.items():
+            if not hasattr(node, "set_output_format"):
+                continue
+            native = node.native_format
+            readers = consumers.get(node_id, [])
+            passthrough = readers and all(native in accepted_formats(reader) for reader in readers)
+            node.set_output_format(native if passthrough else CANONICAL_DTYPE)
+
+    @staticmethod
+    def _label(attr):
+        if isinstance(attr, Port):
+            return attr.label
+        return getattr(attr, "_label", None)
+
+    def load_file(self, path):
+        """Load a graph file and remember it for poll_file"""
+        self._path = path
+        self._mtime = os.path.getmtime(path)
+        return self.load(read_graph(path))
+
+    def poll_file(self):
+        """Rebuild the plan if the loaded graph file changed on disk"""
+        if self._path is None:
+            return False
+
+        try:
+            mtime = os.path.getmtime(self._path)
+        except OSError:
+            return False
+
+        if mtime == self._mtime:
+            return False
+
+        return self.load_file(self._path)
+
+    def port(self, node_id, attr, output=False):
+        """Port behind a node's input (or output) attribute, by index or label"""
+        node = self.nodes[node_id]
+        attributes = node._output_attributes if output else node._input_attributes
+        index = _find_attr(attributes, attr)
+        if index is None:
+            raise ValueError(f"Unknown attribute {attr} on node {node_id}")
+        return attributes[index]
+
+    def activate(self):
+        """Acquire every scheduled node's resources now rather than on its first block"""
+        for node_id in self.plan.order if self.plan is not None else []:
+            node = self.plan.nodes[node_id]
+            if hasattr(node, "activate"):
+                node.activate()
+
+    def run_block(self, data=None):
+        """Run every node of the plan once"""
+        if self.plan is not None:
+            self.plan.run(data)
+
+    def finished(self):
+        """True once every scheduled node that can run out of input (file sources) has,
+        and every worker process has handed back its results for what it was sent"""
+        nodes = [self.plan.nodes[node_id] for node_id in self.plan.order] if self.plan is not None else []
+        ends = [node.finished for node in nodes if hasattr(node, "finished")]
+        return bool(ends) and all(ends) and all(node.drained() for node in nodes if hasattr(node, "drained"))
+
+    def dropped(self):
+        """Blocks each node's background queue dropped so far, for nodes that dropped any"""
+        dropped = {}
+        for node_id, node in self.nodes.items():
+            status = node.queue_status() if hasattr(node, "queue_status") else None
+            if status and status.get("dropped"):
+                dropped[node_id] = status["dropped"]
+        return dropped
+
+    def close(self):
+        """Shut down worker processes and the branch thread pool, returns the blocks dropped per node"""
+        dropped = self.dropped()
+        for node_id, count in dropped.items():
+            print(f"Engine: {node_id} dropped {count} block(s)")
+
+        for node in self.nodes.values():
+            if hasattr(node, "close"):
+                node.close()
+
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+        return dropped
@@ -0,0 +1,200 @@
+import os
+
+# No GUI in this process: node modules fall back to their headless base classes
+os.environ.setdefault("NODEDSP_HEADLESS", "1")
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+
+import numpy as np
+
+from engine.bench import node_data, synthetic_graph
+from engine.graph import Engine, read_graph
+from engine.scheduler import LATENCY, THROUGHPUT, BlockScheduler
+from nodes import audioio, registry
+
+probe_types = ["impulse", "chirp"]
+
+
+def make_probe(kind, rate, length=2048, level=0.5):
+    """Test signal found again by cross-correlation: one sample, or a Hann-windowed log sweep"""
+    if kind == "impulse":
+        return np.array([level], dtype=np.float32)
+
+    t = np.arange(length) / rate
+    duration = length / rate
+    f0, f1 = 40.0, 0.4 * rate
+    k = np.log(f1 / f0)
+    sweep = np.sin(2 * np.pi * f0 * duration / k * (np.exp(t / duration * k) - 1))
+    return (level * sweep * np.hanning(length)).astype(np.float32)
+
+
+class ProbeSignal:
+    """Capture signal of the loopback device: a probe every spacing frames from start, silence between"""
+
+    def __init__(self, probe, start, spacing, count):
+        self.probe = probe
+        self.positions = start + spacing * np.arange(count)
+
+    def __call__(self, start, frames, channels):
+        out = np.zeros((frames, channels), dtype=np.float32)
+        end = start + frames
+        for p in self.positions[(self.positions < end) & (self.positions + len(self.probe) > start)]:
+            lo, hi = max(start, p), min(end, p + len(self.probe))
+            out[lo - start:hi - start] = self.probe[lo - p:hi - p, None]
+        return out
+
+
+def find_probes(recording, probe, offsets, window, threshold=0.1):
+    """Lag of the probe's correlation peak in recording[offset:offset + window] for each offset, None if missing
+
+    A peak counts when it reaches threshold of the probe's own energy, so a
+    graph may attenuate the probe by up to 20 dB before it is missed.
+    """
+    n = len(recording) + len(probe)
+    size = 1 << int(np.ceil(np.log2(n)))
+    spectrum = np.fft.rfft(recording, size) * np.conj(np.fft.rfft(probe, size))
+    correlation = np.fft.irfft(spectrum, size)[:len(recording)]
+    energy = float(np.dot(probe, probe))
+
+    lags = []
+    for offset in offsets:
+        segment = np.abs(correlation[offset:offset + window])
+        if len(segment) == 0:
+            lags.append(None)
+            continue
+        lag = int(np.argmax(segment))
+        lags.append(lag if segment[lag] >= threshold * energy else None)
+    return lags
+
+
+def measure(graph, factories, chunk_size, stream_mode, mode, probe_kind, probes, spacing, realtime):
+    """Run the graph on a loopback device fed with probes and return the latency report of one configuration"""
+    manager = audioio.audio_manager
+    manager.input_settings["chunk_size"] = chunk_size
+    manager.input_settings["mode"] = audioio.stream_modes.index(stream_mode)
+    manager.output_settings["mode"] = audioio.stream_modes.index(stream_mode)
+    rate = manager.input_settings["rate"]
+
+    # Probes start once the streams have settled; each is looked for until the next one
+    probe = make_probe(probe_kind, rate)
+    spacing_frames = int(spacing * rate)
+    start = max(spacing_frames, 4 * chunk_size * manager.max_batch())
+    end = start + probes * spacing_frames
+    signal = ProbeSignal(probe, start, spacing_frames, probes)
+    device = audioio.LoopbackAudio(signal, realtime=realtime, tape_frames=end + spacing_frames)
+    manager.set_backend(lambda: device)
+
+    engine = Engine(factories)
+    engine.load(graph)
+    engine.activate()
+
+    def tick():
+        engine.run_block()
+        if device.clock is None or device.clock.now() >= end:
+            scheduler.is_running = False
+
+    scheduler = BlockScheduler(tick, manager.block_period(), realtime=realtime, mode=mode,
+                               max_batch=manager.max_batch(), on_batch=manager.set_batch,
+                               device_wait=manager.streams.wait_time)
+    # A graph that never reads the device would not move a simulated clock
+    scheduler.run(4 * (end // chunk_size + 1))
+    stats = dict(device.stats(), **{key: scheduler.stats()[key] for key in ("overruns", "underruns")})
+    engine.close()
+    manager.set_batch(1)
+
+    recording = device.recording(0, end)[:, 0]
+    lags = find_probes(recording, probe, signal.positions, spacing_frames - len(probe))
+    found = np.array([lag for lag in lags if lag is not None], dtype=np.float64)
+
+    report = {
+        "chunk_size": chunk_size,
+        "stream_mode": stream_mode,
+        "mode": mode,
+        "probes": probes,
+        "found": len(found),
+        "stats": stats,
+    }
+    if len(found):
+        ms = found * 1000.0 / rate
+        report.update({
+            "latency_ms": {"mean": float(ms.mean()), "min": float(ms.min()), "max": float(ms.max())},
+            # Variation between probes: scheduling, batching and xruns move the signal path
+            "jitter_ms": float(ms.std()),
+            "latency_frames": [int(lag) for lag in found],
+        })
+    return report
+
+
+def default_graph(width, depth, types, data=None):
+    """Audio source to audio sink through width branches of depth nodes drawn from types"""
+    return synthetic_graph(width, depth, "AIN", types, ["AOUT"], 1, data)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m engine.latency",
+                                     description="Measure graph-induced latency on a virtual loopback device")
+    parser.add_argument("graph", nargs="?", default="", help="graph file from AIN to AOUT (default: a synthetic chain)")
+    parser.add_argument("--width", type=int, default=1, help="parallel branches of the synthetic graph")
+    parser.add_argument("--depth", type=int, default=2, help="nodes per branch of the synthetic graph")
+    parser.add_argument("--types", default="GAIN", help="comma separated node types for the synthetic branches")
+    parser.add_argument("--chunk", default="256,512,1024", help="comma separated chunk sizes to measure")
+    parser.add_argument("--stream-modes", default=",".join(audioio.stream_modes),
+                        help="comma separated stream modes to measure")
+    parser.add_argument("--modes", default="latency", help="comma separated processing modes: latency, throughput")
+    parser.add_argument("--probe", choices=probe_types, default="chirp",
+                        help="an impulse is only found through broadband paths; a chirp survives filtering")
+    parser.add_argument("--probes", type=int, default=8, help="probes per configuration")
+    parser.add_argument("--spacing", type=float, default=0.5, help="seconds between probes, above the worst latency")
+    parser.add_argument("--clock", choices=["real", "simulated"], default="real",
+                        help="simulated runs blocking streams as fast as possible and leaves processing time out")
+    parser.add_argument("--out", default="", help="write the report to this JSON file")
+    args = parser.parse_args()
+
+    factories = registry.factories()
+    fixtures = tempfile.TemporaryDirectory()
+    if args.graph:
+        graph = read_graph(args.graph)
+    else:
+        types = args.types.split(",") if args.types else []
+        graph = default_graph(args.width, args.depth, types, node_data(types, fixtures.name))
+
+    realtime = args.clock == "real"
+    modes = [THROUGHPUT if m == "throughput" else LATENCY for m in args.modes.split(",")]
+    results = []
+    for chunk_size in [int(c) for c in args.chunk.split(",")]:
+        for stream_mode in args.stream_modes.split(","):
+            # Callback streams are driven by device threads, which only the real clock paces
+            if stream_mode == "Callback" and not realtime:
+                print(f"chunk {chunk_size} | {stream_mode}: skipped, needs --clock real")
+                continue
+
+            for mode in modes:
+                report = measure(graph, factories, chunk_size, stream_mode, mode, args.probe, args.probes,
+                                 args.spacing, realtime)
+                results.append(report)
+
+                line = f"chunk {chunk_size:>5} | {stream_mode:<8} | {mode:<11} | found {report['found']}/{args.probes}"
+                if report["found"]:
+                    latency = report["latency_ms"]
+                    line += (f" | latency {latency['mean']:.2f}ms (min {latency['min']:.2f} max {latency['max']:.2f})"
+                             f" | jitter {report['jitter_ms']:.2f}ms")
+                stats = report["stats"]
+                print(line + f" | xruns {stats['overflows']}/{stats['underflows']}")
+
+    fixtures.cleanup()
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"config": {"graph": args.graph or graph, "probe": args.probe, "clock": args.clock,
+                                  "rate": audioio.audio_manager.input_settings["rate"],
+                                  "python": platform.python_version(), "numpy": np.__version__,
+                                  "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import bisect
+import json
+import os
+import threading
+import time
+import weakref
+
+# Process time bucket bounds in seconds: 10us doubling up to ~1.3s
+TIME_BUCKETS = [10e-6 * 2 ** i for i in range(18)]
+
+
+def _nbytes(value):
+    """Size of a block, legacy (data, rate, frames) tuple or array moved through an attribute"""
+    if value is None:
+        return 0
+    if isinstance(value, tuple):
+        value = value[0]
+    return getattr(value, "nbytes", 0)
+
+
+class Histogram:
+    """Fixed-bucket histogram; cheap enough to update on every process call"""
+
+    def __init__(self, bounds=TIME_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimate of the q-th quantile, interpolated within its bucket and never above the largest value seen"""
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i >= len(self.bounds):
+                    return self.max
+                lower = min(self.bounds[i - 1] if i > 0 else 0.0, self.max)
+                upper = min(self.bounds[i], self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+
+class NodeMetrics:
+    """Counters of one node: process time, calls, errors and bytes through its attributes"""
+
+    def __init__(self, key, node_type, node):
+        self.key = key
+        self.type = node_type
+        self.node = weakref.ref(node)
+        self.time = Histogram()
+        self.calls = 0
+        self.errors = 0
+        self.last_error = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._last_in = []
+        self._last_out = []
+
+    def count_bytes(self, attributes, last):
+        """Bytes of blocks not seen on these attributes before; ports keep their last block"""
+        if len(last) != len(attributes):
+            last[:] = [None] * len(attributes)
+
+        total = 0
+        for i, attr in enumerate(attributes):
+            get_data = getattr(attr, "get_data", None)
+            value = get_data() if get_data is not None else None
+            if value is not None and value is not last[i]:
+                total += _nbytes(value)
+                last[i] = value
+        return total
+
+    def queues(self):
+        """Fill levels and drop counters the node reports about its background queues"""
+        node = self.node()
+        if node is None:
+            return {}
+
+        gauges = {}
+        for method in ("queue_status", "stream_status"):
+            status = getattr(node, method, None)
+            status = status() if status is not None else None
+            for name, value in (status or {}).items():
+                if isinstance(value, (int, float)):
+                    gauges[name] = value
+        return gauges
+
+    def snapshot(self):
+        return {
+            "node": self.key,
+            "type": self.type,
+            "calls": self.calls,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "time_mean": self.time.sum / self.time.count if self.time.count else 0.0,
+            "time_p50": self.time.quantile(0.5),
+            "time_p99": self.time.quantile(0.99),
+            "time_max": self.time.max,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "queues": self.queues(),
+        }
+
+
+class MetricsRegistry:
+    """Per-node instrumentation of process calls, with JSON lines and Prometheus text export"""
+
+    def __init__(self):
+        self.nodes = {}
+        self.scheduler = None
+        self.lock = threading.Lock()
+
+        self.export_thread = None
+        self.export_running = False
+
+    def instrument(self, node, key, node_type=None):
+        """Wrap node.process to record its timing, errors and traffic under key"""
+        with self.lock:
+            # Keys of nodes that are still alive stay unique; editor nodes often share a name
+            base, n = key, 1
+            while key in self.nodes and self.nodes[key].node() is not None and self.nodes[key].node() is not node:
+                n += 1
+                key = f"{base} {n}"
+
+            metrics = NodeMetrics(key, node_type or type(node).__name__, node)
+            self.nodes[key] = metrics
+
+        process = node.process
+        clock = time.perf_counter
+
+        def instrumented_process(data):
+            metrics.bytes_in += metrics.count_bytes(node._input_attributes, metrics._last_in)
+            start = clock()
+            try:
+                return process(data)
+            except Exception as e:
+                metrics.errors += 1
+                metrics.last_error = str(e)
+                raise
+            finally:
+                metrics.time.observe(clock() - start)
+                metrics.calls += 1
+                metrics.bytes_out += metrics.count_bytes(node._output_attributes, metrics._last_out)
+
+        node.process = instrumented_process
+        return node
+
+    def instrumented(self, node_type, factory):
+        """Factory that instruments every node it creates"""
+        def create(name, data):
+            return self.instrument(factory(name, data), name, node_type)
+        return create
+
+    def snapshot(self):
+        """Counters of all live nodes, plus the scheduler's when one is attached"""
+        with self.lock:
+            for key in [key for key, m in self.nodes.items() if m.node() is None]:
+                del self.nodes[key]
+            nodes = list(self.nodes.values())
+
+        snapshot = {"time": time.time(), "nodes": [m.snapshot() for m in nodes]}
+        if self.scheduler is not None:
+            snapshot["scheduler"] = self.scheduler.stats()
+        return snapshot
+
+    def to_json_line(self, snapshot=None):
+        return json.dumps(snapshot or self.snapshot(), default=str)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format, for a node_exporter textfile collector or similar"""
+        lines = [
+            "# TYPE nodedsp_node_process_seconds histogram",
+        ]
+        with self.lock:
+            nodes = [m for m in self.nodes.values() if m.node() is not None]
+
+        for m in nodes:
+            labels = f'node="{_escape(m.key)}",type="{_escape(m.type)}"'
+            cumulative = 0
+            for bound, n in zip(m.time.bounds, m.time.counts):
+                cumulative += n
+                lines.append(f'nodedsp_node_process_seconds_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'nodedsp_node_process_seconds_bucket{{{labels},le="+Inf"}} {m.time.count}')
+            lines.append(f"nodedsp_node_process_seconds_sum{{{labels}}} {m.time.sum:.9f}")
+            lines.append(f"nodedsp_node_process_seconds_count{{{labels}}} {m.time.count}")
+
+        for name, attr in (("calls", "calls"), ("errors", "errors"), ("bytes_in", "bytes_in"),
+                           ("bytes_out", "bytes_out")):
+            lines.append(f"# TYPE nodedsp_node_{name}_total counter")
+            for m in nodes:
+                lines.append(f'nodedsp_node_{name}_total{{node="{_escape(m.key)}",type="{_escape(m.type)}"}} '
+                             f"{getattr(m, attr)}")
+
+        lines.append("# TYPE nodedsp_node_queue gauge")
+        for m in nodes:
+            for queue, value in m.queues().items():
+                lines.append(f'nodedsp_node_queue{{node="{_escape(m.key)}",queue="{_escape(queue)}"}} {value}')
+
+        if self.scheduler is not None:
+            for name, value in self.scheduler.stats().items():
+                lines.append(f"# TYPE nodedsp_scheduler_{name} gauge")
+                lines.append(f"nodedsp_scheduler_{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, path, fmt="jsonl"):
+        """Append a JSON line, or rewrite the Prometheus text file in one rename"""
+        if fmt == "prom":
+            tmp = f"{path}.tmp"
+            with open(tmp, "w") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp, path)
+        else:
+            with open(path, "a") as f:
+                f.write(self.to_json_line() + "\n")
+
+    def start_export(self, path, interval=5.0, fmt="jsonl"):
+        """Export every interval seconds from a daemon thread"""
+        self.stop_export()
+        self.export_running = True
+
+        def loop():
+            while self.export_running:
+                time.sleep(interval)
+                try:
+                    self.export(path, fmt)
+                except OSError as e:
+                    print(f"Metrics export error: {e}")
+
+        self.export_thread = threading.Thread(target=loop, daemon=True)
+        self.export_thread.start()
+
+    def stop_export(self):
+        self.export_running = False
+        self.export_thread = None
+
+
+class StartupTimer:
+    """Wall time of named startup phases, each measured from the end of the previous one"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def total(self):
+        return self.last - self.start
+
+    def report(self):
+        phases = " | ".join(f"{phase} {duration * 1000:.0f}ms" for phase, duration in self.phases)
+        return f"Startup {self.total() * 1000:.0f}ms: {phases}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+node_metrics = MetricsRegistry()
+startup = StartupTimer()
@@ -0,0 +1,147 @@
+import os
+import time
+
+
+class ParallelPlan:
+    """Schedule that runs independent branches of the graph concurrently
+
+    Straight chains (each node the only consumer of the one before) are merged
+    into branches, and branches are grouped into dependency levels. Each block
+    runs level by level. The branches of a level are packed into at most one
+    chunk per thread, balanced by their measured time; the chunks go to a
+    persistent thread pool, with the calling thread taking one of them, and the
+    level ends in a barrier. Worth it because numpy FFT, mixing and casting
+    release the GIL, but only for levels whose work outweighs handing it out:
+    a level goes to the pool when the time it would save exceeds min_gain times
+    the measured dispatch cost, and runs inline on the calling thread otherwise.
+    """
+
+    def __init__(self, order, nodes, links, pool, threads, min_gain=2.0, rebalance=64):
+        self.order = order
+        self.nodes = nodes
+        self.pool = pool
+
+        preds = {node_id: set() for node_id in order}
+        succs = {node_id: set() for node_id in order}
+        for link in links:
+            preds[link.input_node].add(link.output_node)
+            succs[link.output_node].add(link.input_node)
+
+        # Merge straight chains into branches
+        branch_of = {}
+        branches = []
+        for node_id in order:
+            if len(preds[node_id]) == 1:
+                parent = next(iter(preds[node_id]))
+                if len(succs[parent]) == 1:
+                    branch = branch_of[parent]
+                    branches[branch].append(node_id)
+                    branch_of[node_id] = branch
+                    continue
+
+            branch_of[node_id] = len(branches)
+            branches.append([node_id])
+
+        # Level of a branch: one past the deepest branch feeding its head
+        level_of = []
+        for branch in branches:
+            head_preds = preds[branch[0]]
+            level_of.append(1 + max((level_of[branch_of[p]] for p in head_preds), default=-1))
+
+        self.branches = branches
+        self.levels = [[] for _ in range(max(level_of, default=-1) + 1)]
+        for index, level in enumerate(level_of):
+            self.levels[level].append(index)
+
+        self._steps = [[nodes[node_id].process for node_id in branch] for branch in branches]
+        self.branch_times = [0.0] * len(branches)
+        # Smoothed branch times, what chunks are balanced and levels judged on
+        self.branch_costs = [0.0] * len(branches)
+        self.block_time = 0.0
+        self.speedup = 1.0
+        self.smoothing = 0.9
+
+        # More chunks than cores only adds switching
+        self.width = max(1, min(threads, os.cpu_count() or 1))
+        self.min_gain = min_gain
+        self.rebalance = rebalance
+        self.overhead = self._dispatch_overhead()
+        self.blocks = 0
+        # Every level starts inline until its branches have been timed
+        self.chunks = [[level] for level in self.levels]
+        self.parallel = [False] * len(self.levels)
+
+    def _dispatch_overhead(self, rounds=16):
+        # Round trip of an empty task through the pool: the least a chunk costs to hand out
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            self.pool.submit(int).result()
+            times.append(time.perf_counter() - start)
+        return sorted(times)[rounds // 2]
+
+    def _split(self, level):
+        # Longest branch first onto the least loaded chunk
+        count = min(self.width, len(level))
+        chunks = [[] for _ in range(count)]
+        loads = [0.0] * count
+        for index in sorted(level, key=lambda i: -self.branch_costs[i]):
+            target = min(range(count), key=lambda c: (loads[c], len(chunks[c])))
+            chunks[target].append(index)
+            loads[target] += self.branch_costs[index]
+        return chunks, loads
+
+    def _plan_levels(self):
+        for i, level in enumerate(self.levels):
+            chunks, loads = self._split(level)
+            # The level's serial time minus its longest chunk, against one dispatch per extra chunk
+            gain = sum(loads) - max(loads)
+            self.chunks[i] = chunks
+            self.parallel[i] = len(chunks) > 1 and gain > self.min_gain * (len(chunks) - 1) * self.overhead
+
+    def _run_branch(self, index, data):
+        start = time.perf_counter()
+        for step in self._steps[index]:
+            step(data)
+        elapsed = time.perf_counter() - start
+        self.branch_times[index] = elapsed
+        self.branch_costs[index] = self.smoothing * self.branch_costs[index] + (1.0 - self.smoothing) * elapsed
+
+    def _run_chunk(self, chunk, data):
+        for index in chunk:
+            self._run_branch(index, data)
+
+    def run(self, data=None):
+        start = time.perf_counter()
+
+        for i, chunks in enumerate(self.chunks):
+            if self.parallel[i]:
+                futures = [self.pool.submit(self._run_chunk, chunk, data) for chunk in chunks[1:]]
+                self._run_chunk(chunks[0], data)
+                for future in futures:
+                    future.result()
+            else:
+                for chunk in chunks:
+                    self._run_chunk(chunk, data)
+
+        self.block_time = time.perf_counter() - start
+
+        # Serial time over wall time: how much the pool actually bought this block
+        if self.block_time > 0:
+            speedup = sum(self.branch_times) / self.block_time
+            self.speedup = self.smoothing * self.speedup + (1.0 - self.smoothing) * speedup
+
+        self.blocks += 1
+        if self.blocks % self.rebalance == 0:
+            self._plan_levels()
+
+    def stats(self):
+        """Per-branch timing, how each level is run and the measured parallel speedup"""
+        return {
+            "branches": [{"nodes": branch, "time": self.branch_times[i]} for i, branch in enumerate(self.branches)],
+            "levels": len(self.levels),
+            "chunks": [len(chunks) if self.parallel[i] else 0 for i, chunks in enumerate(self.chunks)],
+            "dispatch_overhead": self.overhead,
+            "block_time": self.block_time,
+            "speedup": self.speedup,
+        }
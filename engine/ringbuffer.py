@@ -0,0 +1,281 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+from engine.block import convert
+
+
+class RingBuffer:
+    """Preallocated single-producer/single-consumer ring of interleaved frames
+
+    The producer only advances the write counter and the consumer only advances
+    the read counter, each after its copy is done, so one writer thread and one
+    reader thread (e.g. a PyAudio callback and the graph thread) need no lock.
+    """
+
+    def __init__(self, capacity, channels=1, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self.buffer = np.zeros((self.capacity, channels), dtype=dtype)
+
+        # Monotonic frame counters; position in the buffer is counter % capacity
+        self._written = 0
+        self._read = 0
+
+        self.overflows = 0
+        self.underflows = 0
+
+    def available(self):
+        """Frames ready to be read"""
+        return self._written - self._read
+
+    def free(self):
+        """Frames that can be written without overwriting unread data"""
+        return self.capacity - (self._written - self._read)
+
+    def fill(self):
+        """Fill level as a fraction of capacity"""
+        return (self._written - self._read) / self.capacity
+
+    def write(self, frames):
+        """Copy (n, channels) frames in, returns how many fit"""
+        n = min(len(frames), self.free())
+        if n < len(frames):
+            self.overflows += 1
+
+        if n > 0:
+            start = self._written % self.capacity
+            first = min(n, self.capacity - start)
+            self.buffer[start:start + first] = frames[:first]
+            if first < n:
+                self.buffer[:n - first] = frames[first:n]
+            self._written += n
+
+        return n
+
+    def read(self, out):
+        """Copy up to len(out) frames into out, returns how many were read"""
+        n = min(len(out), self.available())
+        if n < len(out):
+            self.underflows += 1
+
+        if n > 0:
+            start = self._read % self.capacity
+            first = min(n, self.capacity - start)
+            out[:first] = self.buffer[start:start + first]
+            if first < n:
+                out[first:n] = self.buffer[:n - first]
+            self._read += n
+
+        return n
+
+    def skip(self, n):
+        """Drop up to n unread frames, returns how many were dropped"""
+        n = min(n, self.available())
+        self._read += n
+        return n
+
+    def clear(self):
+        self._read = self._written
+
+
+class HistoryBuffer:
+    """Fixed-size circular buffer holding the most recent samples of a mono signal"""
+
+    def __init__(self, capacity, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.buffer = np.zeros(self.capacity, dtype=dtype)
+        self.pos = 0
+        self.count = 0
+
+    def extend(self, samples):
+        """Append a block with slice copies, overwriting the oldest samples"""
+        n = len(samples)
+        if n >= self.capacity:
+            self.buffer[:] = samples[n - self.capacity:]
+            self.pos = 0
+            self.count = self.capacity
+            return
+
+        first = min(n, self.capacity - self.pos)
+        self.buffer[self.pos:self.pos + first] = samples[:first]
+        if first < n:
+            self.buffer[:n - first] = samples[first:]
+
+        self.pos = (self.pos + n) % self.capacity
+        self.count = min(self.count + n, self.capacity)
+
+    def __len__(self):
+        return self.count
+
+    def copy_to(self, out):
+        """Copy the last len(out) samples into out, oldest first"""
+        n = len(out)
+        start = (self.pos - n) % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.buffer[start:start + first]
+        if first < n:
+            out[first:] = self.buffer[:n - first]
+        return out
+
+    def clear(self):
+        self.pos = 0
+        self.count = 0
+
+
+class JitterBuffer:
+    """Reorders numbered packets from a network thread and releases them one per block, concealing losses
+
+    The receiving thread put()s packets in whatever order they arrive; the graph
+    thread pop()s one per block. Playout starts once target packets are queued.
+    The target follows the interarrival jitter measured against the packets'
+    own frame positions (the RFC 3550 estimator), plus one per recent underrun.
+    A packet missing at its turn while later ones are queued is concealed by
+    repeating the previous one at half the level per consecutive loss; packets
+    arriving after their turn are dropped, and a queue grown well past the
+    target is trimmed from the oldest end to bring latency back down.
+    """
+
+    def __init__(self, slots, channels, max_frames, min_depth=2, clock=time.perf_counter):
+        self.slots = slots
+        self.channels = channels
+        self.max_frames = max_frames
+        self.min_depth = min_depth
+        self.clock = clock
+        self.lock = threading.Lock()
+
+        # Packet payloads in float32, slot = sequence number % slots
+        self.data = np.zeros((slots, channels, max_frames), dtype=np.float32)
+        self.seqs = np.full(slots, -1, dtype=np.int64)
+        self.frames = np.zeros(slots, dtype=np.int64)
+        self.frame_index = np.zeros(slots, dtype=np.int64)
+        self.rate = 0
+
+        # Last released packet, the material for concealment
+        self.last = np.zeros((channels, max_frames), dtype=np.float32)
+        self.last_frames = 0
+        self.last_index = 0
+        self.loss_run = 0
+
+        self.received = 0
+        self.late = 0
+        self.lost = 0
+        self.underruns = 0
+        self.skipped = 0
+        self.truncated = 0
+
+        self.jitter = 0.0
+        self.packet_period = 0.0
+        self._reset()
+
+    def _reset(self):
+        self.seqs[:] = -1
+        self.next_seq = None
+        self.newest = -1
+        self.primed = False
+        self.extra = 0
+        self.good = 0
+        self.target = self.min_depth
+        self.last_arrival = None
+        self.last_media = None
+
+    def _retarget(self):
+        depth = self.min_depth
+        if self.packet_period > 0:
+            depth = max(depth, math.ceil(2.0 * self.jitter / self.packet_period) + 1)
+        self.target = min(depth + self.extra, self.slots // 2)
+
+    def depth(self):
+        """Packets from the next one due to the newest received, gaps included"""
+        return 0 if self.next_seq is None else max(0, self.newest - self.next_seq + 1)
+
+    def put(self, seq, frame_index, rate, payload):
+        """Store one packet of (channels, frames) samples; called from the receiving thread"""
+        now = self.clock()
+        with self.lock:
+            if self.next_seq is not None and seq < self.next_seq:
+                if seq >= self.next_seq - self.slots:
+                    self.late += 1
+                    return
+                # Far behind what we are playing: the sender restarted
+                self._reset()
+
+            channels = min(payload.shape[0], self.channels)
+            frames = min(payload.shape[1], self.max_frames)
+            if frames < payload.shape[1]:
+                self.truncated += 1
+
+            slot = seq % self.slots
+            convert(payload[:channels, :frames], np.float32, self.data[slot, :channels, :frames])
+            self.data[slot, channels:, :frames] = 0
+            self.seqs[slot] = seq
+            self.frames[slot] = frames
+            self.frame_index[slot] = frame_index
+            self.rate = rate
+            self.newest = max(self.newest, seq)
+            self.received += 1
+
+            if rate > 0:
+                self.packet_period = frames / rate
+                if self.last_arrival is not None:
+                    transit = (now - self.last_arrival) - (frame_index - self.last_media) / rate
+                    self.jitter += (abs(transit) - self.jitter) / 16
+                self.last_arrival = now
+                self.last_media = frame_index
+            self._retarget()
+
+    def pop(self, burst=1):
+        """Return (samples, frame index, rate) of the next packet, a concealment of it, or None
+
+        burst is the packets the caller takes in a row for one block: that many
+        queued at once is the normal rhythm, not latency to trim away.
+        """
+        with self.lock:
+            if self.next_seq is None:
+                queued = self.seqs[self.seqs >= 0]
+                if len(queued) == 0:
+                    return None
+                self.next_seq = int(queued.min())
+
+            if not self.primed:
+                if self.depth() < self.target:
+                    return None
+                self.primed = True
+
+            while self.depth() > self.target + 1 + burst:
+                self.seqs[self.next_seq % self.slots] = -1
+                self.next_seq += 1
+                self.skipped += 1
+
+            slot = self.next_seq % self.slots
+            if self.seqs[slot] == self.next_seq:
+                frames = int(self.frames[slot])
+                samples = self.data[slot, :, :frames].copy()
+                self.seqs[slot] = -1
+                self.last[:, :frames] = samples
+                self.last_frames = frames
+                self.last_index = int(self.frame_index[slot])
+                self.loss_run = 0
+
+                # Underrun headroom is given back slowly once the stream runs clean
+                self.good += 1
+                if self.extra > 0 and self.good % 256 == 0:
+                    self.extra -= 1
+                    self._retarget()
+            elif self.newest > self.next_seq:
+                self.loss_run += 1
+                self.lost += 1
+                samples = self.last[:, :self.last_frames] * np.float32(0.5 ** self.loss_run)
+                self.last_index += self.last_frames
+            else:
+                # Nothing queued: wait for the target depth again, with one more packet of margin
+                self.primed = False
+                self.underruns += 1
+                self.extra += 1
+                self._retarget()
+                return None
+
+            self.next_seq += 1
+            return samples, self.last_index, self.rate
@@ -0,0 +1,207 @@
+import time
+from threading import Thread
+
+# Low latency runs one device block per tick; throughput batches several to amortize per-call overhead
+LATENCY = "Low latency"
+THROUGHPUT = "Throughput"
+modes = [LATENCY, THROUGHPUT]
+
+
+class BlockScheduler:
+    """Drives graph ticks from the audio block period with deadline accounting
+
+    Tick n is released at start + n * period and must finish by the next release.
+    A tick that finishes after its deadline is an overrun; block periods that pass
+    without any tick being released (the device side ran dry) are underruns.
+
+    With realtime off (offline rendering) ticks run back to back as fast as the
+    CPU allows and no deadlines are kept.
+
+    device_wait returns the running total of seconds ticks spent blocked in
+    device reads and writes. That time is the device pacing the graph rather
+    than processing, so it is left out of process time, and a tick that waited
+    was released by the device: its deadline runs from when the wait ended
+    and the next tick starts without sleeping.
+
+    In throughput mode each tick carries batch blocks and the tick period
+    stretches to match. The batch doubles while the mean headroom of the last
+    adapt_ticks ticks stays below target_headroom, and halves once even a tick
+    of unchanged cost would keep the halved batch above it, so it settles
+    without oscillating. on_batch is told every new batch size, so the sources
+    read that many blocks.
+    """
+
+    def __init__(self, tick, period, max_lag=2, clock=time.perf_counter, sleep=time.sleep, realtime=True,
+                 mode=LATENCY, max_batch=1, on_batch=None, target_headroom=40.0, adapt_ticks=32, device_wait=None):
+        self.tick = tick
+        self.block_period = period
+        self.period = period
+        self.realtime = realtime
+        self.max_lag = max_lag
+        self.clock = clock
+        self.sleep = sleep
+        self.device_wait = device_wait
+
+        self.is_running = False
+        self.thread = None
+
+        self.ticks = 0
+        # Seconds of audio the ticks covered, summed tick by tick as the batch changes
+        self.audio_time = 0.0
+        self.overruns = 0
+        self.underruns = 0
+        self.errors = 0
+        self.last_error = None
+
+        self.process_time = 0.0
+        self.headroom = 100.0
+        self.min_headroom = 100.0
+        self.smoothing = 0.9
+
+        self.mode = LATENCY
+        self.batch = 1
+        self.max_batch = max_batch
+        self.on_batch = on_batch
+        self.target_headroom = target_headroom
+        self.adapt_ticks = adapt_ticks
+        self._adapt_time = 0.0
+        self._adapt_count = 0
+
+        self._next_release = None
+        self.set_mode(mode)
+
+    def set_mode(self, mode):
+        """Switch between LATENCY (one block per tick) and THROUGHPUT (adaptive batching)"""
+        self.mode = mode
+        if mode == THROUGHPUT and not self.realtime:
+            # No deadlines offline: the largest batch is always the cheapest
+            self.set_batch(self.max_batch)
+        else:
+            self.set_batch(1)
+
+    def set_batch(self, batch):
+        batch = max(1, min(batch, self.max_batch))
+        self._adapt_time = 0.0
+        self._adapt_count = 0
+        if batch == self.batch:
+            return
+
+        self.batch = batch
+        self.period = self.block_period * batch
+        if self.on_batch is not None:
+            self.on_batch(batch)
+
+    def _adapt(self):
+        """Pick the batch from the mean headroom since the last change"""
+        self._adapt_time += self.process_time
+        self._adapt_count += 1
+        if self._adapt_count < self.adapt_ticks or self.period <= 0:
+            return
+
+        headroom = 1.0 - self._adapt_time / self._adapt_count / self.period
+        target = self.target_headroom / 100.0
+        if headroom < target and self.batch < self.max_batch:
+            self.set_batch(self.batch * 2)
+        elif self.batch > 1 and 2.0 * headroom - 1.0 >= target:
+            # Halving the period at the same tick cost leaves 2h - 1 headroom; the real cost only drops
+            self.set_batch(self.batch // 2)
+        else:
+            self._adapt_time = 0.0
+            self._adapt_count = 0
+
+    def reset_stats(self):
+        """Clear the xrun and headroom counters"""
+        self.ticks = 0
+        self.audio_time = 0.0
+        self.overruns = 0
+        self.underruns = 0
+        self.errors = 0
+        self.last_error = None
+        self.headroom = 100.0
+        self.min_headroom = 100.0
+
+    def step(self):
+        """Wait for the next release time and run one tick"""
+        now = self.clock()
+        if self._next_release is None or not self.realtime:
+            self._next_release = now
+
+        wait = self._next_release - now
+        if wait > 0:
+            self.sleep(wait)
+        elif -wait > self.max_lag * self.period:
+            # Too far behind to catch up; count the lost blocks and restart the timeline
+            missed = int(-wait // self.period)
+            self.underruns += missed
+            self._next_release = now
+
+        deadline = self._next_release + self.period
+        waited = self.device_wait() if self.device_wait is not None else 0.0
+        start = self.clock()
+        try:
+            self.tick()
+        except Exception as e:
+            self.errors += 1
+            message = str(e)
+            if message != self.last_error:
+                print(f"Graph processing error: {e}")
+            self.last_error = message
+
+        end = self.clock()
+        waited = self.device_wait() - waited if self.device_wait is not None else 0.0
+        self.ticks += 1
+        # The period the tick ran with: a mode change inside the tick has already set its batch
+        self.audio_time += self.period
+        self.process_time = max(0.0, end - start - waited)
+        next_release = deadline
+        if waited > 0:
+            # Released by the device when it handed over (or took) a block; it paces the next tick as well
+            deadline = end - self.process_time + self.period
+            next_release = end
+        if end > deadline and self.realtime:
+            self.overruns += 1
+
+        headroom = (1.0 - self.process_time / self.period) * 100.0 if self.period > 0 else 0.0
+        self.headroom = self.smoothing * self.headroom + (1.0 - self.smoothing) * headroom
+        self.min_headroom = min(self.min_headroom, headroom)
+
+        self._next_release = next_release
+        if self.mode == THROUGHPUT and self.realtime:
+            self._adapt()
+
+    def run(self, max_ticks=0):
+        """Tick until stopped, or until max_ticks ticks if given"""
+        self.is_running = True
+        self._next_release = None
+        count = 0
+        while self.is_running and (max_ticks == 0 or count < max_ticks):
+            self.step()
+            count += 1
+        self.is_running = False
+
+    def start(self):
+        """Run the scheduler on a daemon thread"""
+        self.is_running = True
+        self.thread = Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.is_running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+    def stats(self):
+        """Snapshot of the tick counters"""
+        return {
+            "ticks": self.ticks,
+            "period": self.period,
+            "audio_time": self.audio_time,
+            "batch": self.batch,
+            "process_time": self.process_time,
+            "headroom": self.headroom,
+            "min_headroom": self.min_headroom,
+            "overruns": self.overruns,
+            "underruns": self.underruns,
+            "errors": self.errors,
+        }
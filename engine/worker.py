@@ -0,0 +1,299 @@
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from engine.block import AudioBlock
+from engine.graph import Engine, Port
+from engine.scheduler import BlockScheduler
+
+# Sample formats a shared ring slot can carry
+_dtypes = [np.float32, np.int16, np.int32]
+
+_HEADER = 4  # int64: write sequence, read sequence, overflows, slot count
+_META = 6  # float64 per slot: rate, frame index, timestamp, channels, frames, dtype code
+
+
+class SharedRing:
+    """Single-producer/single-consumer ring of AudioBlocks in multiprocessing shared memory
+
+    The producer fills a slot and then bumps the write sequence; the consumer
+    copies a slot out and then bumps the read sequence. Each counter has one
+    writer, so no lock is shared between the processes.
+    """
+
+    def __init__(self, name=None, slots=8, max_channels=8, max_frames=8192):
+        self.slots = slots
+        self.max_channels = max_channels
+        self.max_frames = max_frames
+        self.slot_bytes = max_channels * max_frames * 4
+        meta_bytes = slots * _META * 8
+        size = _HEADER * 8 + meta_bytes + slots * self.slot_bytes
+
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # Spawned workers share the parent's resource tracker, so attaching adds no second owner
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        buf = self.shm.buf
+        self.header = np.ndarray((_HEADER,), dtype=np.int64, buffer=buf)
+        self.meta = np.ndarray((slots, _META), dtype=np.float64, buffer=buf, offset=_HEADER * 8)
+        self.data = np.ndarray((slots, self.slot_bytes), dtype=np.uint8, buffer=buf, offset=_HEADER * 8 + meta_bytes)
+
+        if self.owner:
+            self.header[:] = 0
+            self.header[3] = slots
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def spec(self):
+        """Arguments for attaching to this ring from another process"""
+        return self.name, self.slots, self.max_channels, self.max_frames
+
+    def available(self):
+        return int(self.header[0] - self.header[1])
+
+    def full(self):
+        return self.available() >= self.slots
+
+    @property
+    def overflows(self):
+        """Blocks the producer lost to a full ring"""
+        return int(self.header[2])
+
+    def write(self, block):
+        """Copy a block into the next free slot, returns False if the ring is full"""
+        write_seq = int(self.header[0])
+        if write_seq - int(self.header[1]) >= self.slots:
+            self.header[2] += 1
+            return False
+
+        data = block.data
+        if data.dtype not in _dtypes:
+            data = data.astype(np.float32)
+        if data.nbytes > self.slot_bytes:
+            raise ValueError(f"Block of {data.shape} does not fit a shared ring slot")
+
+        slot = write_seq % self.slots
+        view = self.data[slot, :data.nbytes].view(data.dtype).reshape(data.shape)
+        view[...] = data
+        self.meta[slot] = (block.rate, block.frame_index, block.timestamp, data.shape[0], data.shape[1],
+                           _dtypes.index(data.dtype.type))
+
+        # Publish only after the slot is complete
+        self.header[0] = write_seq + 1
+        return True
+
+    def read(self):
+        """Copy the oldest block out of the ring, or None if it is empty"""
+        read_seq = int(self.header[1])
+        if read_seq == int(self.header[0]):
+            return None
+
+        slot = read_seq % self.slots
+        rate, frame_index, timestamp, channels, frames, code = self.meta[slot]
+        dtype = np.dtype(_dtypes[int(code)])
+        channels, frames = int(channels), int(frames)
+        nbytes = channels * frames * dtype.itemsize
+        data = self.data[slot, :nbytes].view(dtype).reshape(channels, frames).copy()
+
+        self.header[1] = read_seq + 1
+        return AudioBlock(data, int(rate), int(frame_index), timestamp)
+
+    def close(self):
+        self.header = self.meta = self.data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _as_block(data):
+    if isinstance(data, AudioBlock):
+        return data
+
+    samples, rate, _ = data
+    return AudioBlock(np.atleast_2d(samples), rate)
+
+
+def _worker_main(graph, factories, settings, backend, inputs, outputs, stop, consumed, realtime):
+    """Entry point of a worker process: run a subgraph between shared rings
+
+    consumed counts the input blocks whose results are in the output rings.
+    """
+    from nodes import audioio
+    # The parent's backend before anything can open a stream on the default one
+    if backend is not None:
+        audioio.audio_manager.set_backend(backend)
+    audioio.audio_manager.import_settings(settings)
+    audioio.audio_manager.realtime = realtime
+
+    engine = Engine(factories)
+    engine.load(graph)
+
+    in_ports = [(SharedRing(*ring), engine.port(node_id, attr)) for ring, node_id, attr in inputs]
+    out_ports = [(SharedRing(*ring), engine.port(node_id, attr, output=True)) for ring, node_id, attr in outputs]
+    sent = [None] * len(out_ports)
+
+    def tick():
+        engine.run_block()
+        for i, (ring, port) in enumerate(out_ports):
+            data = port.get_data()
+            if data is not None and data is not sent[i]:
+                # Offline the parent reads every block eventually; wait for it rather than overflow
+                while not realtime and ring.full() and not stop.is_set():
+                    time.sleep(0.0005)
+                ring.write(_as_block(data))
+                sent[i] = data
+
+    try:
+        if not in_ports:
+            # Nothing upstream in the main process: pace on the block clock
+            scheduler = BlockScheduler(tick, audioio.audio_manager.block_period(),
+                                       device_wait=audioio.audio_manager.streams.wait_time)
+            while not stop.is_set():
+                scheduler.step()
+            return
+
+        while not stop.is_set():
+            received = 0
+            for ring, port in in_ports:
+                block = ring.read()
+                if block is not None:
+                    port.set_data(block)
+                    received += 1
+
+            if received:
+                tick()
+                consumed.value += received
+            else:
+                time.sleep(0.0005)
+    finally:
+        engine.close()
+        for ring, _ in in_ports + out_ports:
+            ring.close()
+
+
+class WorkerGroup:
+    """Stands in for a subgraph whose nodes run in a separate process
+
+    Inputs are the subgraph's (node id, attribute) slots fed from the main
+    process and outputs the slots read back. Blocks cross in both directions
+    through SharedRings, so results arrive one tick after their input. When
+    audio_manager.realtime is off both sides wait for ring space instead.
+    """
+
+    def __init__(self, name, graph, inputs, outputs, factories, max_backlog=2):
+        self.name = name
+        self.max_backlog = max_backlog
+        self.process_handle = None
+
+        self._input_attributes = [Port(f"{node_id}:{attr}") for node_id, attr in inputs]
+        self._output_attributes = [Port(f"{node_id}:{attr}") for node_id, attr in outputs]
+
+        self.input_rings = [SharedRing() for _ in inputs]
+        self.output_rings = [SharedRing() for _ in outputs]
+        self._sent = [None] * len(inputs)
+        self.dropped = 0
+        # Input blocks handed to the worker, against those it has answered in consumed
+        self.written = 0
+
+        from nodes import audioio
+        settings = audioio.audio_manager.export_settings()
+        self.realtime = audioio.audio_manager.realtime
+
+        # Spawn rather than fork: the parent may hold audio device and GUI threads
+        context = multiprocessing.get_context("spawn")
+        self.stop_event = context.Event()
+        self.consumed = context.Value("q", 0, lock=False)
+        self.process_handle = context.Process(
+            target=_worker_main,
+            args=(graph, factories, settings, audioio.audio_manager.backend_name,
+                  [(ring.spec(), node_id, attr) for ring, (node_id, attr) in zip(self.input_rings, inputs)],
+                  [(ring.spec(), node_id, attr) for ring, (node_id, attr) in zip(self.output_rings, outputs)],
+                  self.stop_event, self.consumed, self.realtime),
+            name=f"nodedsp-worker-{name}",
+            daemon=True
+        )
+
+        # Workers never show a GUI; the child reads the flag when it imports the node modules
+        headless = os.environ.get("NODEDSP_HEADLESS")
+        os.environ["NODEDSP_HEADLESS"] = "1"
+        try:
+            self.process_handle.start()
+        finally:
+            if headless is None:
+                del os.environ["NODEDSP_HEADLESS"]
+            else:
+                os.environ["NODEDSP_HEADLESS"] = headless
+
+    def process(self, data):
+        for i, port in enumerate(self._input_attributes):
+            block = port.get_data()
+            if block is not None and block is not self._sent[i]:
+                ring = self.input_rings[i]
+                while not self.realtime and ring.full() and self.process_handle.is_alive():
+                    time.sleep(0.0005)
+                if ring.write(_as_block(block)):
+                    self.written += 1
+                self._sent[i] = block
+
+        # Take one block from every ring together so channels of a block stay aligned; while the
+        # worker is still writing a round some rings are a block behind the others
+        caught_up = self.consumed.value >= self.written
+        if not caught_up and not all(ring.available() for ring in self.output_rings):
+            return
+
+        # Live, skip ahead a round at a time if the worker got more than max_backlog blocks in front;
+        # offline every block is played
+        while self.realtime and self.output_rings and \
+                all(ring.available() > self.max_backlog for ring in self.output_rings):
+            for ring in self.output_rings:
+                ring.read()
+            self.dropped += 1
+
+        for ring, port in zip(self.output_rings, self._output_attributes):
+            block = ring.read()
+            if block is not None:
+                port.set_data(block)
+
+    def drained(self):
+        """True once the worker has answered every block sent to it and its results were passed on"""
+        if self.process_handle is None or not self.process_handle.is_alive():
+            return True
+        return self.consumed.value >= self.written and not any(ring.available() for ring in self.output_rings)
+
+    def queue_status(self):
+        """Blocks queued in the shared rings towards and back from the worker, and blocks lost:
+        rounds skipped to catch up plus blocks that found a ring full"""
+        if self.process_handle is None:
+            return None
+
+        overflows = sum(ring.overflows for ring in self.input_rings + self.output_rings)
+        status = {"dropped": self.dropped + overflows, "skipped": self.dropped, "overflows": overflows}
+        for i, ring in enumerate(self.input_rings):
+            status[f"in{i}"] = ring.available()
+        for i, ring in enumerate(self.output_rings):
+            status[f"out{i}"] = ring.available()
+        return status
+
+    def close(self):
+        if self.process_handle is None:
+            return
+
+        self.stop_event.set()
+        self.process_handle.join(timeout=2.0)
+        if self.process_handle.is_alive():
+            self.process_handle.terminate()
+        self.process_handle = None
+
+        for ring in self.input_rings + self.output_rings:
+            ring.close()
+
+    def __del__(self):
+        self.close()
@@ -1,6 +1,8 @@
+# Imported first so the startup report covers every other import
+from engine.metrics import node_metrics, startup
+
 import json
 import time
-from threading import Thread
 
 import dearpygui.dearpygui as dpg
 import uuid6
@@ -8,11 +10,20 @@ import uuid6
 from DPGWidgets.NodeEditor.widget import NodeEditor, DragSourceContainer, DragSource
 from DPGWidgets.NodeEditor.node import NodeManager
 
-from nodes import audioio, analyzer
+from engine.broker import ui_broker
+from engine.graph import GRAPH_VERSION, EditorPlan, read_graph, validate_graph
+from engine.scheduler import LATENCY, BlockScheduler, modes
+from nodes import audioio, registry
+
+startup.mark("imports")
 
 class Nodeditor:
     def __init__(self):
-        #self.effects_contaniar = DragSourceContainer("Effects", 150, -1)
+        # Graph-level processing mode, saved with the graph
+        self.mode = LATENCY
+        self.on_mode = None
+
+        self.effects_container = DragSourceContainer("Effects", 150, -1)
         self.IO_container = DragSourceContainer("Nodes", 150, -1)
 
         self.left_panel = uuid6.uuid7().hex
@@ -20,37 +31,115 @@ class Nodeditor:
         nm = NodeManager()
 
         self.node_editor = NodeEditor(nm)
+        # Schedule of the linked nodes, in place of walking the graph from its sources every tick
+        self.plan = EditorPlan()
 
-        nm.register("AIN", audioio.AudioSource.factory)
-        nm.register("AOUT", audioio.AudioSink.factory)
-
-        nm.register("STV", analyzer.SpectrumView.factory)
-
-        self.IO_container.add_drag_source(DragSource("Audio Source", "AIN", None, "I/O"))
-        self.IO_container.add_drag_source(DragSource("Audio Sink", "AOUT", None, "I/O"))
-        self.IO_container.add_drag_source(DragSource("Spectrum", "STV", None, "Viewer"))
+        for type_id, (label, category, factory) in registry.NODE_TYPES.items():
+            nm.register(type_id, self.plan.tracked(node_metrics.instrumented(type_id, factory)))
+            container = self.effects_container if category in ("Effects", "Mixer") else self.IO_container
+            container.add_drag_source(DragSource(label, type_id, None, category))
 
     def save(self, _, __):
         data = self.node_editor.save()
+        data["version"] = GRAPH_VERSION
+        data["mode"] = self.mode
         json.dump(data, open("ne.json", "w"))
 
     def load(self, _, __):
-        data = json.load(open("ne.json", "r"))
+        try:
+            data = read_graph("ne.json")
+        except (OSError, ValueError) as e:
+            print(f"Graph load error: {e}")
+            return
+
+        # Reject a broken patch before any node is built
+        problems = validate_graph(data, registry.factories())
+        if problems:
+            for problem in problems:
+                print(f"Graph load error: {problem}")
+            return
+
+        data.pop("version", None)
+        self.set_mode(data.pop("mode", LATENCY))
         self.node_editor.load(data)
+        self.plan.invalidate()
+
+    def set_mode(self, mode):
+        self.mode = mode
+        if self.on_mode is not None:
+            self.on_mode(mode)
 
     def widget(self, parent):
         with dpg.group(id=self.left_panel, parent=parent):
             self.IO_container.submit(self.left_panel)
+            self.effects_container.submit(self.left_panel)
 
         # center panel
         self.node_editor.submit(parent, width=-1)
 
+class MetricsOverlay:
+    """Window listing per-node process time, traffic, errors and queue levels"""
+    columns = ["Node", "Type", "Calls", "p50 ms", "p99 ms", "Max ms", "Budget %", "In KiB", "Out KiB", "Errors", "Queues"]
+
+    def __init__(self, interval=0.25):
+        self.window_tag = uuid6.uuid7().hex
+        self.table_tag = uuid6.uuid7().hex
+        self.interval = interval
+        self.last_update = 0.0
+        self.rows = {}
+        self.export_path = "metrics.jsonl"
+
+    def window(self):
+        with dpg.window(label="Metrics", tag=self.window_tag, width=760, height=260, show=False):
+            dpg.add_checkbox(label=f"Export to {self.export_path}", callback=lambda _, value: self.set_export(value))
+            with dpg.table(tag=self.table_tag, header_row=True, resizable=True, policy=dpg.mvTable_SizingStretchProp):
+                for column in self.columns:
+                    dpg.add_table_column(label=column)
+
+    def show(self):
+        dpg.show_item(self.window_tag)
+
+    def set_export(self, enabled):
+        if enabled:
+            node_metrics.start_export(self.export_path)
+        else:
+            node_metrics.stop_export()
+
+    def render(self, now, period):
+        if now - self.last_update < self.interval or not dpg.is_item_shown(self.window_tag):
+            return
+        self.last_update = now
+
+        nodes = node_metrics.snapshot()["nodes"]
+        keys = [node["node"] for node in nodes]
+        if keys != list(self.rows):
+            # Node set changed: rebuild the rows, otherwise only the cell values are updated
+            for row in self.rows.values():
+                dpg.delete_item(row[0])
+            self.rows = {}
+            for key in keys:
+                with dpg.table_row(parent=self.table_tag) as row:
+                    cells = [dpg.add_text("") for _ in self.columns]
+                self.rows[key] = (row, cells)
+
+        for node in nodes:
+            queues = " ".join(f"{name}={value:.3g}" for name, value in node["queues"].items())
+            values = [node["node"], node["type"], node["calls"], f"{node['time_p50'] * 1000:.3f}",
+                      f"{node['time_p99'] * 1000:.3f}", f"{node['time_max'] * 1000:.3f}",
+                      f"{node['time_mean'] / period * 100:.1f}" if period > 0 else "",
+                      f"{node['bytes_in'] / 1024:.0f}", f"{node['bytes_out'] / 1024:.0f}", node["errors"], queues]
+            for cell, value in zip(self.rows[node["node"]][1], values):
+                dpg.set_value(cell, str(value))
+
+
 class App:
     def __init__(self):
         self.ne = Nodeditor()
-        self.is_running = False
-        self.process_time = 0
+        self.metrics = MetricsOverlay()
+        self.scheduler = None
         self.last_window_size = (0, 0)
+        # The status text only needs to be readable, not redrawn every frame
+        ui_broker.set_rate("menubar_status", 10)
 
     def window(self):
         with dpg.window(label="Node Editor", tag="nodewindow", width=500, height=320, no_close=True):
@@ -67,31 +156,39 @@ class App:
                 dpg.add_spacer()
                 dpg.add_menu_item(label="Exit", callback=lambda: self.exit())
 
-            dpg.add_text(f"Processing Time: ???", tag="menubar_status")
+            with dpg.menu(label="View"):
+                dpg.add_menu_item(label="Metrics", callback=lambda: self.metrics.show())
+
+            with dpg.menu(label="Processing"):
+                dpg.add_radio_button(modes, tag="processing_mode", default_value=self.ne.mode,
+                                     callback=lambda _, value: self.ne.set_mode(value))
+
+            dpg.add_text(f"Headroom: ???", tag="menubar_status")
 
     def on_mouse_click(self, sender, app_data):
         self.ne.node_editor.on_mouse_click(sender, app_data)
+        self.ne.plan.invalidate()
+
+    def on_mouse_release(self, sender, app_data):
+        # Links and dropped nodes land when the drag ends
+        self.ne.plan.invalidate()
 
     def on_key_press(self, sender, key):
         self.ne.node_editor.on_key_press(sender, key)
+        self.ne.plan.invalidate()
 
-    def working_thread(self):
-        while self.is_running:
-            starttime = time.time()
-            try:
-                self.ne.node_editor.process(None)
-            except Exception as e:
-                pass
-
-            self.process_time = time.time() - starttime
+    def process_graph(self):
+        self.ne.plan.run()
 
     def init(self):
         dpg.create_context()
         dpg.create_viewport(title='NodeDSP', width=1280, height=720)  # set viewport window
         dpg.setup_dearpygui()
+        startup.mark("context")
         # -------------- add code here --------------
         with dpg.handler_registry():
             dpg.add_mouse_click_handler(callback=self.on_mouse_click)
+            dpg.add_mouse_release_handler(callback=self.on_mouse_release)
             dpg.add_key_press_handler(callback=self.on_key_press)
 
         #dpg.configure_app(docking=True, docking_space=True)
@@ -99,16 +196,28 @@ class App:
 
         self.window()
         self.menubar()
+        self.metrics.window()
         audioio.audio_manager.window()
 
         self.ne.widget("nodeeditor")
+        startup.mark("windows")
 
         # -------------------------------------------
         dpg.show_viewport()
+        startup.mark("viewport")
 
-        self.is_running = True
-        ta = Thread(target=self.working_thread, daemon=True)
-        ta.start()
+        self.scheduler = BlockScheduler(self.process_graph, audioio.audio_manager.block_period(),
+                                        mode=self.ne.mode, max_batch=audioio.audio_manager.max_batch(),
+                                        on_batch=audioio.audio_manager.set_batch,
+                                        device_wait=audioio.audio_manager.streams.wait_time)
+        self.ne.on_mode = self.set_mode
+        node_metrics.scheduler = self.scheduler
+        self.scheduler.start()
+
+        self.render()
+        dpg.render_dearpygui_frame()
+        startup.mark("first frame")
+        print(startup.report())
 
         while dpg.is_dearpygui_running():
             self.render()
@@ -121,11 +230,31 @@ class App:
         window_height = dpg.get_viewport_height()
 
         if self.last_window_size != (window_width, window_height):
-            dpg.set_item_pos("menubar_status", [dpg.get_viewport_width() - 200, 0])
+            dpg.set_item_pos("menubar_status", [dpg.get_viewport_width() - 420, 0])
+
+        now = time.perf_counter()
+        if ui_broker.due("menubar_status", now):
+            ui_broker.publish("menubar_status", self.show_status)
+
+        # At most one update per widget per frame, from DSP threads and the status line alike
+        ui_broker.apply(now)
+        self.metrics.render(now, self.scheduler.period)
+
+    def show_status(self):
+        scheduler = self.scheduler
+        dpg.set_value("menubar_status", f"Headroom: {scheduler.headroom:.0f}% (min {scheduler.min_headroom:.0f}%) | "
+                                        f"{scheduler.process_time*1000:.2f}ms x{scheduler.batch} | "
+                                        f"Xruns: {scheduler.overruns}/{scheduler.underruns}")
 
-        dpg.set_value("menubar_status", f"Processing Time: {self.process_time*1000:.2f}ms")
+    def set_mode(self, mode):
+        self.scheduler.set_mode(mode)
+        if dpg.does_item_exist("processing_mode"):
+            dpg.set_value("processing_mode", mode)
 
     def exit(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        node_metrics.stop_export()
         dpg.destroy_context()
 
 
@@ -1,8 +1,60 @@
-import dearpygui.dearpygui as dpg
 import numpy as np
-from DPGWidgets.NodeEditor.node import InputNodeAttribute, Node, NodeType
 import threading
-from collections import deque
+import time
+from functools import lru_cache
+
+from nodes.base import InputNodeAttribute, Node, NodeType, dpg
+from dsp.filters import SOSFilter, k_weighting
+from dsp.mixing import LAYOUTS
+from engine.block import InputGather
+from engine.broker import ui_broker
+from engine.ringbuffer import HistoryBuffer, RingBuffer
+
+# Default display updates per second of a viewer node
+DEFAULT_UI_RATE = 30
+
+
+@lru_cache(maxsize=16)
+def fft_plan(size, sample_rate):
+    """Cached Hann window, frequency axis and magnitude scale for a real FFT of this size"""
+    window = np.hanning(size).astype(np.float32)
+    freqs = np.fft.rfftfreq(size, 1.0 / sample_rate)[:size // 2]
+
+    # Single-sided amplitude normalization, DC is not doubled
+    scale = np.full(size // 2, 2.0 / size)
+    scale[0] = 1.0 / size
+
+    return window, freqs, scale
+
+
+# Spectrum display decimation: every FFT bin, one bin per plot pixel, or log-spaced bins
+display_modes = ["Full", "Pixel", "Log"]
+fft_sizes = [256, 512, 1024, 2048, 4096, 8192]
+
+
+@lru_cache(maxsize=16)
+def display_bins(size, sample_rate, points, log_spaced, min_freq=20.0):
+    """Cached reduceat start indices and x positions for binning an FFT of this size down to points"""
+    freqs = fft_plan(size, sample_rate)[1]
+
+    if log_spaced:
+        edges = np.geomspace(max(min_freq, freqs[1]), freqs[-1], points + 1)
+    else:
+        edges = np.linspace(0.0, freqs[-1], points + 1)
+
+    # Bins narrower than the FFT resolution collapse onto the same start index
+    starts = np.unique(np.searchsorted(freqs, edges[:-1]))
+    starts = starts[starts < len(freqs)]
+
+    return starts, freqs[starts]
+
+
+def _set_log_axis(axis, enabled):
+    # DearPyGui 2.x replaced log_scale with a scale enum
+    if hasattr(dpg, "mvPlotScale_Log10"):
+        dpg.configure_item(axis, scale=dpg.mvPlotScale_Log10 if enabled else dpg.mvPlotScale_Linear)
+    else:
+        dpg.configure_item(axis, log_scale=enabled)
 
 
 class SpectrumView(Node):
@@ -14,14 +66,31 @@ class SpectrumView(Node):
         super().__init__(name, data, NodeType.INPUT)
 
         self.add_input_attribute(InputNodeAttribute("Input"))
+        self.gather = InputGather()
+        settings = data if isinstance(data, dict) else {}
 
         self.series_tag = dpg.generate_uuid()
+        self.peak_series_tag = dpg.generate_uuid()
+        self.x_axis_tag = dpg.generate_uuid()
         self.smoothed_fft = None
         self.smoothing_factor = 0.5
 
+        # Plot updates go through the UI broker; spectra are only computed when the plot will take one
+        self.ui_rate = settings.get("ui_rate", DEFAULT_UI_RATE)
+        ui_broker.set_rate(self.series_tag, self.ui_rate)
+
+        # Display decimation and peak hold
+        self.plot_width = 520
+        self.display_mode = "Pixel"
+        self.peak_hold = False
+        self.peak_decay = 20.0  # dB per second
+        self.peak_db = None
+        self.peak_time = None
+
         # Buffer for storing audio samples
-        self.buffer_duration = 0.2  # Store 0.5 seconds of audio
-        self.audio_buffer = deque()
+        self.buffer_duration = 0.2  # Store 0.2 seconds of audio
+        self.audio_buffer = None
+        self.frame_buffer = None
         self.max_buffer_samples = 0
         self.sample_rate = None
 
@@ -30,12 +99,21 @@ class SpectrumView(Node):
         self.thread_running = False
         self.lock = threading.Lock()
         self.latest_data = None
+        self.dropped_blocks = 0
 
     def custom(self):
-        with dpg.plot(label="Spectrum", height=300, width=520):
+        with dpg.group(horizontal=True):
+            dpg.add_combo(display_modes, default_value=self.display_mode, width=80,
+                          callback=lambda _, value: self.set_display_mode(value))
+            dpg.add_checkbox(label="Peak Hold", default_value=self.peak_hold,
+                             callback=lambda _, value: self.set_peak_hold(value))
+            dpg.add_input_int(label="FPS", default_value=self.ui_rate, width=80, min_value=1, min_clamped=True,
+                              callback=lambda _, value: self.set_ui_rate(value))
+
+        with dpg.plot(label="Spectrum", height=300, width=self.plot_width):
             dpg.add_plot_legend()
 
-            x = dpg.add_plot_axis(dpg.mvXAxis, label="Frequency (Hz)")
+            x = dpg.add_plot_axis(dpg.mvXAxis, label="Frequency (Hz)", tag=self.x_axis_tag)
             dpg.set_axis_limits_auto(x)
 
             y = dpg.add_plot_axis(dpg.mvYAxis, label="Magnitude (dB)")
@@ -43,6 +121,44 @@ class SpectrumView(Node):
 
             # Add line series for FFT data
             dpg.add_line_series([], [], label="FFT", parent=y, tag=self.series_tag)
+            dpg.add_line_series([], [], label="Peak", parent=y, tag=self.peak_series_tag, show=self.peak_hold)
+
+        if self.display_mode == "Log":
+            _set_log_axis(x, True)
+
+    def set_display_mode(self, mode):
+        self.display_mode = mode
+        self.peak_db = None
+        if dpg.does_item_exist(self.x_axis_tag):
+            _set_log_axis(self.x_axis_tag, mode == "Log")
+
+    def set_ui_rate(self, rate):
+        self.ui_rate = rate
+        ui_broker.set_rate(self.series_tag, rate)
+
+    def set_peak_hold(self, enabled):
+        self.peak_hold = enabled
+        self.peak_db = None
+        if dpg.does_item_exist(self.peak_series_tag):
+            dpg.configure_item(self.peak_series_tag, show=enabled)
+
+    def _decimate(self, magnitude, n, sample_rate):
+        """Reduce the spectrum to at most one max-held point per display bin"""
+        if self.display_mode == "Full":
+            return fft_plan(n, sample_rate)[1], magnitude
+
+        starts, freqs = display_bins(n, sample_rate, self.plot_width, self.display_mode == "Log")
+        return freqs, np.maximum.reduceat(magnitude, starts)
+
+    def _update_peak(self, fft_db):
+        now = time.perf_counter()
+        if self.peak_db is None or len(self.peak_db) != len(fft_db):
+            self.peak_db = fft_db.copy()
+        else:
+            self.peak_db -= self.peak_decay * (now - self.peak_time)
+            np.maximum(self.peak_db, fft_db, out=self.peak_db)
+        self.peak_time = now
+        return self.peak_db
 
     def _processing_loop(self):
         """Background thread for FFT processing"""
@@ -55,58 +171,52 @@ class SpectrumView(Node):
                 try:
                     audio_data, sample_rate, chunksize = data_to_process
 
-                    # Initialize buffer size on first run
-                    if self.sample_rate is None:
+                    # (Re)allocate the sample history when the rate changes
+                    if self.sample_rate != sample_rate:
                         self.sample_rate = sample_rate
                         self.max_buffer_samples = int(self.buffer_duration * sample_rate)
+                        self.audio_buffer = HistoryBuffer(self.max_buffer_samples)
+                        self.frame_buffer = np.zeros(self.max_buffer_samples, dtype=np.float32)
+                        self.smoothed_fft = None
 
-                    # Add new audio to buffer
+                    # Add new audio to buffer, overwriting the oldest samples
                     self.audio_buffer.extend(audio_data)
 
-                    # Trim buffer to max size
-                    while len(self.audio_buffer) > self.max_buffer_samples:
-                        self.audio_buffer.popleft()
-
-                    # Only process if we have enough samples
-                    if len(self.audio_buffer) >= self.max_buffer_samples // 2:
-                        # Convert buffer to numpy array
-                        buffer_array = np.array(self.audio_buffer)
+                    # Only process if we have enough samples and the plot is due for an update
+                    n = len(self.audio_buffer)
+                    if n >= self.max_buffer_samples // 2 and ui_broker.due(self.series_tag):
+                        window, _, scale = fft_plan(n, sample_rate)
 
-                        # Apply window function to reduce spectral leakage
-                        window = np.hanning(len(buffer_array))
-                        windowed_data = buffer_array * window
+                        # Unroll the ring oldest-first and apply the window to reduce spectral leakage
+                        frame = self.audio_buffer.copy_to(self.frame_buffer[:n])
+                        frame *= window
 
-                        # Compute FFT with larger buffer
-                        fft_data = np.fft.fft(windowed_data)
-
-                        # Take only positive frequencies
-                        n = len(fft_data)
-                        fft_data = np.abs(fft_data[:n // 2])
+                        # Real-input FFT, positive frequencies only
+                        fft_data = np.abs(np.fft.rfft(frame)[:n // 2])
 
                         # Normalize
-                        fft_data = fft_data * 2.0 / n
-                        fft_data[0] = fft_data[0] / 2.0
-
-                        # Get corresponding frequencies
-                        freqs = np.fft.fftfreq(n, 1.0 / sample_rate)[:n // 2]
+                        fft_data *= scale
 
                         # Apply exponential smoothing
                         if self.smoothed_fft is None or len(self.smoothed_fft) != len(fft_data):
                             self.smoothed_fft = fft_data
                         else:
-                            self.smoothed_fft = (self.smoothing_factor * self.smoothed_fft +
-                                                 (1 - self.smoothing_factor) * fft_data)
+                            self.smoothed_fft *= self.smoothing_factor
+                            self.smoothed_fft += (1 - self.smoothing_factor) * fft_data
+
+                        # Bin down to display resolution before the dB conversion
+                        freqs, magnitude = self._decimate(self.smoothed_fft, n, sample_rate)
 
                         # Convert to dB scale
                         epsilon = 1e-10
-                        fft_db = 20 * np.log10(self.smoothed_fft + epsilon)
+                        fft_db = 20 * np.log10(magnitude + epsilon)
 
                         # Clip values
-                        fft_db = np.clip(fft_db, -120, 10)
+                        np.clip(fft_db, -120, 10, out=fft_db)
 
-                        # Update plot on main thread
-                        if dpg.does_item_exist(self.series_tag):
-                            dpg.set_value(self.series_tag, [freqs.tolist(), fft_db.tolist()])
+                        # Hand the frame to the GUI thread; an unapplied older one is dropped
+                        peak_db = self._update_peak(fft_db).copy() if self.peak_hold else None
+                        ui_broker.publish(self.series_tag, self._show, freqs, fft_db, peak_db)
 
                 except Exception as e:
                     print(f"SpectrumView processing error: {e}")
@@ -114,12 +224,21 @@ class SpectrumView(Node):
                 # Sleep briefly if no data to process
                 threading.Event().wait(0.01)
 
-    def process(self, data):
-        # Get audio data from input
-        data = self._input_attributes[0].get_data()
+    def _show(self, freqs, fft_db, peak_db):
+        """Apply one spectrum to the plot; runs on the GUI thread"""
+        if not dpg.does_item_exist(self.series_tag):
+            return
 
-        if data is None or len(data) == 0:
+        freqs_list = freqs.tolist()
+        dpg.set_value(self.series_tag, [freqs_list, fft_db.tolist()])
+        if peak_db is not None:
+            dpg.set_value(self.peak_series_tag, [freqs_list, peak_db.tolist()])
+
+    def process(self, data):
+        blocks = self.gather.take(self._input_attributes[:1])
+        if blocks is None:
             return
+        data = blocks[0]
 
         # Start processing thread if not running
         if not self.thread_running:
@@ -129,11 +248,249 @@ class SpectrumView(Node):
 
         # Store latest data for processing
         with self.lock:
+            if self.latest_data is not None:
+                self.dropped_blocks += 1
             self.latest_data = data
 
+    def queue_status(self):
+        """Hand-off slot and sample history fill levels"""
+        return {
+            "pending": int(self.latest_data is not None),
+            "dropped_blocks": self.dropped_blocks,
+            "history_fill": len(self.audio_buffer) / self.max_buffer_samples if self.audio_buffer is not None else 0.0,
+        }
+
+    def __del__(self):
+        """Cleanup when node is deleted"""
+        self.stop_thread()
+        ui_broker.discard(self.series_tag)
+
+    def stop_thread(self):
+        """Stop the processing thread"""
+        if self.thread_running:
+            self.thread_running = False
+            if self.processing_thread is not None:
+                self.processing_thread.join(timeout=1.0)
+                self.processing_thread = None
+
+
+def _colormap_lut(size=256):
+    """RGBA float32 lookup table running dark blue -> purple -> orange -> pale yellow"""
+    stops = np.array([0.0, 0.25, 0.5, 0.75, 1.0])
+    colors = np.array([
+        [0.0, 0.0, 0.02],
+        [0.25, 0.04, 0.43],
+        [0.72, 0.2, 0.42],
+        [0.98, 0.55, 0.04],
+        [0.99, 1.0, 0.64],
+    ])
+
+    x = np.linspace(0.0, 1.0, size)
+    lut = np.ones((size, 4), dtype=np.float32)
+    for c in range(3):
+        lut[:, c] = np.interp(x, stops, colors[:, c])
+    return lut
+
+
+class Spectrogram(Node):
+    @staticmethod
+    def factory(name, data):
+        return Spectrogram(name, data)
+
+    def __init__(self, name, data):
+        super().__init__(name, data, NodeType.INPUT)
+
+        self.add_input_attribute(InputNodeAttribute("Input"))
+        self.gather = InputGather()
+        settings = data if isinstance(data, dict) else {}
+
+        # STFT settings; a new size or hop is applied by the DSP thread on its next block
+        self.fft_size, self.hop = self.check_stft(settings.get("fft_size", 2048), settings.get("hop", 512))
+        self.stft_request = None
+        self.floor_db = -120.0
+        self.range_db = 120.0
+
+        # Texture ring: one column per hop, low frequencies at the bottom
+        self.width = 520
+        self.height = 300
+        self.columns = 256
+        self.rows = 200
+        self.texture = np.zeros((self.rows, self.columns, 4), dtype=np.float32)
+        self.texture[:, :, 3] = 1.0
+        self.column = 0
+        self.lut = _colormap_lut()
+
+        self.texture_tag = dpg.generate_uuid()
+        self.old_image_tag = dpg.generate_uuid()
+        self.new_image_tag = dpg.generate_uuid()
+
+        self.ui_rate = settings.get("ui_rate", DEFAULT_UI_RATE)
+        ui_broker.set_rate(self.texture_tag, self.ui_rate)
+
+        self.sample_rate = None
+        self.history = None
+        self.frame = None
+        self.until_hop = self.hop
+        self.input_ring = None
+        self.input_block = None
+        self.bin_starts = None
+        self.row_map = None
+
+        # Threading
+        self.processing_thread = None
+        self.thread_running = False
+
+    def custom(self):
+        with dpg.texture_registry():
+            dpg.add_dynamic_texture(self.columns, self.rows, self.texture.ravel(), tag=self.texture_tag)
+
+        # The ring is drawn as two slices so the newest column is always on the right
+        with dpg.drawlist(width=self.width, height=self.height):
+            dpg.draw_image(self.texture_tag, (0, 0), (self.width, self.height), uv_min=(0, 0), uv_max=(1, 1),
+                           tag=self.old_image_tag)
+            dpg.draw_image(self.texture_tag, (self.width, 0), (self.width, self.height), uv_min=(0, 0),
+                           uv_max=(0, 1), tag=self.new_image_tag)
+
+        with dpg.group(horizontal=True):
+            dpg.add_combo([str(size) for size in fft_sizes], label="FFT", default_value=str(self.fft_size), width=80,
+                          callback=lambda _, value: self.set_stft(int(value), self.hop))
+            dpg.add_input_int(label="Hop", default_value=self.hop, width=80, min_value=1, min_clamped=True,
+                              step=0, callback=lambda _, value: self.set_stft(self.fft_size, value))
+            dpg.add_input_int(label="FPS", default_value=self.ui_rate, width=80, min_value=1, min_clamped=True,
+                              callback=lambda _, value: self.set_ui_rate(value))
+
+    def set_ui_rate(self, rate):
+        self.ui_rate = rate
+        ui_broker.set_rate(self.texture_tag, rate)
+
+    @staticmethod
+    def check_stft(fft_size, hop):
+        """(fft_size, hop) with the hop kept within one frame; a longer hop would skip samples"""
+        fft_size = max(2, int(fft_size))
+        hop = max(1, int(hop))
+        if hop > fft_size:
+            print(f"Spectrogram: hop {hop} is longer than the FFT size, using {fft_size}")
+            hop = fft_size
+        return fft_size, hop
+
+    def set_stft(self, fft_size, hop):
+        self.stft_request = self.check_stft(fft_size, hop)
+
+    def _write_column(self, magnitude):
+        """Map one spectrum to colors and store it at the ring's write column"""
+        binned = np.maximum.reduceat(magnitude, self.bin_starts)
+
+        levels = 20 * np.log10(binned + 1e-10)
+        levels -= self.floor_db
+        levels *= (len(self.lut) - 1) / self.range_db
+        np.clip(levels, 0, len(self.lut) - 1, out=levels)
+
+        self.texture[:, self.column] = self.lut[levels.astype(np.intp)[self.row_map]]
+        self.column = (self.column + 1) % self.columns
+
+    def _show(self):
+        """Upload the texture and move the split; runs on the GUI thread"""
+        if not dpg.does_item_exist(self.texture_tag):
+            return
+
+        dpg.set_value(self.texture_tag, self.texture.ravel())
+
+        # Oldest column (the write position) on the left, newest on the right
+        split = self.column / self.columns
+        x = (1.0 - split) * self.width
+        dpg.configure_item(self.old_image_tag, pmin=(0, 0), pmax=(x, self.height), uv_min=(split, 0), uv_max=(1, 1))
+        dpg.configure_item(self.new_image_tag, pmin=(x, 0), pmax=(self.width, self.height), uv_min=(0, 0),
+                           uv_max=(split, 1))
+
+    def _analyze(self, samples, sample_rate):
+        """Advance the STFT by a block of samples, one column per completed hop"""
+        window, _, scale = fft_plan(self.fft_size, sample_rate)
+
+        pos = 0
+        written = False
+        while pos < len(samples):
+            take = min(self.until_hop, len(samples) - pos)
+            self.history.extend(samples[pos:pos + take])
+            pos += take
+            self.until_hop -= take
+
+            if self.until_hop == 0:
+                self.until_hop = self.hop
+                if len(self.history) == self.fft_size:
+                    frame = self.history.copy_to(self.frame)
+                    frame *= window
+                    magnitude = np.abs(np.fft.rfft(frame)[:self.fft_size // 2])
+                    magnitude *= scale
+                    self._write_column(magnitude)
+                    written = True
+
+        return written
+
+    def _processing_loop(self):
+        """Background thread for STFT processing"""
+        while self.thread_running:
+            available = self.input_ring.available()
+            if available == 0:
+                threading.Event().wait(0.01)
+                continue
+
+            try:
+                n = self.input_ring.read(self.input_block[:available])
+                # Columns keep accumulating in the texture; the GUI uploads it at most ui_rate times a second
+                if self._analyze(self.input_block[:n, 0], self.sample_rate):
+                    ui_broker.publish(self.texture_tag, self._show)
+            except Exception as e:
+                print(f"Spectrogram processing error: {e}")
+
+    def process(self, data):
+        blocks = self.gather.take(self._input_attributes[:1])
+        if blocks is None:
+            return
+        data = blocks[0]
+
+        audio_data, sample_rate, chunksize = data
+
+        # Allocate the hand-off ring and STFT history on first data, and again for a new FFT size or hop
+        if self.sample_rate != sample_rate or self.stft_request is not None:
+            self.stop_thread()
+            if self.stft_request is not None:
+                self.fft_size, self.hop = self.stft_request
+                self.stft_request = None
+            self.sample_rate = sample_rate
+            self.history = HistoryBuffer(self.fft_size)
+            self.frame = np.zeros(self.fft_size, dtype=np.float32)
+            self.until_hop = self.hop
+            self.input_ring = RingBuffer(sample_rate, 1)
+            self.input_block = np.zeros((sample_rate, 1), dtype=np.float32)
+
+            # Log-spaced bins; rows finer than the FFT resolution repeat their bin. Row 0 (top) is the highest.
+            self.bin_starts, bin_freqs = display_bins(self.fft_size, sample_rate, self.rows, True)
+            row_freqs = np.geomspace(bin_freqs[0], bin_freqs[-1], self.rows)
+            self.row_map = (np.searchsorted(bin_freqs, row_freqs, side="right") - 1)[::-1].copy()
+
+        # Start processing thread if not running
+        if not self.thread_running:
+            self.thread_running = True
+            self.processing_thread = threading.Thread(target=self._processing_loop, daemon=True)
+            self.processing_thread.start()
+
+        # Queue every block so the STFT stays continuous
+        self.input_ring.write(np.reshape(audio_data, (-1, 1)))
+
+    def queue_status(self):
+        """Fill level and overflows of the ring feeding the STFT thread"""
+        if self.input_ring is None:
+            return None
+
+        return {
+            "fill": self.input_ring.fill(),
+            "overflows": self.input_ring.overflows,
+        }
+
     def __del__(self):
         """Cleanup when node is deleted"""
         self.stop_thread()
+        ui_broker.discard(self.texture_tag)
 
     def stop_thread(self):
         """Stop the processing thread"""
@@ -141,4 +498,216 @@ class SpectrumView(Node):
             self.thread_running = False
             if self.processing_thread is not None:
                 self.processing_thread.join(timeout=1.0)
-                self.processing_thread = None
\ No newline at end of file
+                self.processing_thread = None
+
+
+# BS.1770 channel weights by speaker label; anything else counts 1.0
+LOUDNESS_WEIGHTS = {"LFE": 0.0, "Ls": 1.41, "Rs": 1.41, "Lb": 1.41, "Rb": 1.41}
+
+# Integrated loudness histogram: 0.1 LU bins from the -70 LUFS absolute gate up
+GATE_LUFS = -70.0
+HISTOGRAM_STEP = 0.1
+HISTOGRAM_BINS = 800
+
+METER_FLOOR_DB = -60.0
+
+
+def _db(power, offset=0.0):
+    """Power (or a ratio of it) in dB, floored instead of -inf"""
+    return offset + 10 * np.log10(np.maximum(power, 1e-20))
+
+
+class LoudnessMeter(Node):
+    """Per-channel peak and RMS plus momentary, short-term and integrated loudness (LUFS)
+
+    Every block is K-weighted with the filter state carried over, squared and
+    summed into 100 ms bins. The last 30 bins sit in a fixed ring: 4 of them make
+    the momentary (400 ms) loudness, all 30 the short-term and the last 3 the
+    RMS. Each completed bin closes a 400 ms gating block, which goes into a
+    histogram of energy per 0.1 LU instead of a list, so integrated loudness is
+    two gated sums over the histogram. A block costs O(frames); nothing grows.
+    """
+
+    @staticmethod
+    def factory(name, data):
+        return LoudnessMeter(name, data)
+
+    def __init__(self, name, data):
+        super().__init__(name, data, NodeType.INPUT)
+
+        settings = data if isinstance(data, dict) else {}
+        self.channel = settings.get("channels", 2)
+        labels = LAYOUTS.get(self.channel, ())
+        self.weights = np.array(settings.get("weights", [LOUDNESS_WEIGHTS.get(label, 1.0) for label in labels]
+                                             or [1.0] * self.channel), dtype=np.float64)
+        self.peak_decay = settings.get("peak_decay", 20.0)  # dB per second
+
+        self.meter_tags = [dpg.generate_uuid() for _ in range(self.channel)]
+        self.loudness_tag = dpg.generate_uuid()
+        self.ui_rate = settings.get("ui_rate", DEFAULT_UI_RATE)
+        ui_broker.set_rate(self.loudness_tag, self.ui_rate)
+
+        self.sample_rate = None
+        self.filter = None
+        self.gather = InputGather()
+
+        for ch in range(self.channel):
+            self.add_input_attribute(InputNodeAttribute(f"Channel {ch}"), dynamic=True)
+
+    def custom(self):
+        for ch in range(self.channel):
+            dpg.add_progress_bar(tag=self.meter_tags[ch], default_value=0.0, width=240, overlay=f"Ch {ch}")
+        dpg.add_text("", tag=self.loudness_tag)
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="Reset", callback=lambda: self.reset())
+            dpg.add_input_int(label="FPS", default_value=self.ui_rate, width=80, min_value=1, min_clamped=True,
+                              callback=lambda _, value: self.set_ui_rate(value))
+
+    def set_ui_rate(self, rate):
+        self.ui_rate = rate
+        ui_broker.set_rate(self.loudness_tag, rate)
+
+    def _start(self, rate):
+        self.sample_rate = rate
+        self.filter = SOSFilter(k_weighting(rate), self.channel)
+        self.bin_frames = max(1, int(round(rate / 10)))
+        self.reset()
+
+    def reset(self):
+        """Clear the meters and start a new integrated measurement"""
+        self.peak = np.zeros(self.channel)
+        self.max_peak = np.zeros(self.channel)
+
+        # Unweighted and K-weighted sums of squares of the bin being filled and the last 30
+        self.fill = 0
+        self.sum_raw = np.zeros(self.channel)
+        self.sum_weighted = np.zeros(self.channel)
+        self.bins_raw = np.zeros((30, self.channel))
+        self.bins_weighted = np.zeros((30, self.channel))
+        self.bin_pos = 0
+        self.bins_done = 0
+
+        self.gate_counts = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+        self.gate_energy = np.zeros(HISTOGRAM_BINS)
+
+    def _recent(self, bins, n):
+        """Sum of the last n completed bins of a ring"""
+        n = min(n, self.bins_done)
+        rows = (self.bin_pos - 1 - np.arange(n)) % len(bins)
+        return bins[rows].sum(axis=0), n
+
+    def _close_bin(self):
+        self.bins_raw[self.bin_pos] = self.sum_raw
+        self.bins_weighted[self.bin_pos] = self.sum_weighted
+        self.bin_pos = (self.bin_pos + 1) % len(self.bins_raw)
+        self.bins_done += 1
+        self.sum_raw[:] = 0
+        self.sum_weighted[:] = 0
+        self.fill = 0
+
+        # Gating blocks are 400 ms long and start every 100 ms
+        if self.bins_done >= 4:
+            power = self.weights @ self._recent(self.bins_weighted, 4)[0] / (4 * self.bin_frames)
+            level = _db(power, -0.691)
+            if level > GATE_LUFS:
+                index = min(int((level - GATE_LUFS) / HISTOGRAM_STEP), HISTOGRAM_BINS - 1)
+                self.gate_counts[index] += 1
+                self.gate_energy[index] += power
+
+    def measure(self, audio_array, rate):
+        """Advance the meters by a (channels, frames) float block"""
+        if rate != self.sample_rate:
+            self._start(rate)
+
+        frames = audio_array.shape[1]
+        self.peak *= 10 ** (-self.peak_decay * frames / rate / 20)
+        np.maximum(self.peak, np.abs(audio_array).max(axis=1), out=self.peak)
+        np.maximum(self.max_peak, self.peak, out=self.max_peak)
+
+        raw = np.square(audio_array, dtype=np.float64)
+        weighted = np.square(self.filter.process(audio_array), dtype=np.float64)
+
+        # Split the block where 100 ms bins end and add each piece to the bin it belongs to
+        edges = np.arange(self.bin_frames - self.fill, frames, self.bin_frames)
+        starts = np.concatenate(([0], edges))
+        lengths = np.diff(np.append(starts, frames))
+        pieces_raw = np.add.reduceat(raw, starts, axis=1)
+        pieces_weighted = np.add.reduceat(weighted, starts, axis=1)
+
+        for i, length in enumerate(lengths):
+            self.sum_raw += pieces_raw[:, i]
+            self.sum_weighted += pieces_weighted[:, i]
+            self.fill += int(length)
+            if self.fill == self.bin_frames:
+                self._close_bin()
+
+    def integrated(self):
+        """Gated integrated loudness in LUFS, or None before the first gating block above -70 LUFS
+
+        The relative gate works on whole 0.1 LU histogram bins and leaves out
+        the bin holding the threshold, so it sits up to 0.1 LU above where
+        BS.1770 puts it. Steady programme and the EBU Tech 3341 cases read
+        within their 0.1 LU tolerance; programme with many blocks less than
+        0.1 LU above the gate reads higher, as those blocks are gated out.
+        """
+        counts = self.gate_counts
+        total = counts.sum()
+        if total == 0:
+            return None
+
+        # Relative gate 10 LU under the mean of the absolutely gated blocks
+        threshold = _db(self.gate_energy.sum() / total, -0.691) - 10.0
+        first = max(0, int(np.ceil((threshold - GATE_LUFS) / HISTOGRAM_STEP)))
+        count = counts[first:].sum()
+        if count == 0:
+            return None
+        return float(_db(self.gate_energy[first:].sum() / count, -0.691))
+
+    def readings(self):
+        """Current peak and RMS per channel in dBFS, and momentary, short-term and integrated LUFS"""
+        if self.sample_rate is None:
+            return None
+
+        raw, n = self._recent(self.bins_raw, 3)
+        rms_db = _db(raw / max(1, n * self.bin_frames)) if n else np.full(self.channel, -200.0)
+        momentary, n_m = self._recent(self.bins_weighted, 4)
+        short_term, n_s = self._recent(self.bins_weighted, 30)
+
+        return {
+            "peak_db": (20 * np.log10(np.maximum(self.peak, 1e-10))).tolist(),
+            "max_peak_db": (20 * np.log10(np.maximum(self.max_peak, 1e-10))).tolist(),
+            "rms_db": rms_db.tolist(),
+            "momentary": float(_db(self.weights @ momentary / (4 * self.bin_frames), -0.691)) if n_m == 4 else None,
+            "short_term": float(_db(self.weights @ short_term / (30 * self.bin_frames), -0.691)) if n_s == 30 else None,
+            "integrated": self.integrated(),
+        }
+
+    def process(self, data):
+        blocks = self.gather.take(self._input_attributes)
+        if blocks is None:
+            return
+
+        self.measure(self.gather.stack(blocks), self.gather.last.rate)
+
+        if ui_broker.due(self.loudness_tag):
+            ui_broker.publish(self.loudness_tag, self._show, self.readings())
+
+    def _show(self, readings):
+        """Apply one set of readings to the meters; runs on the GUI thread"""
+        if readings is None or not dpg.does_item_exist(self.loudness_tag):
+            return
+
+        for ch, tag in enumerate(self.meter_tags):
+            peak, rms = readings["peak_db"][ch], readings["rms_db"][ch]
+            dpg.set_value(tag, min(max(1.0 - peak / METER_FLOOR_DB, 0.0), 1.0))
+            dpg.configure_item(tag, overlay=f"Ch {ch}  pk {max(peak, METER_FLOOR_DB):.1f}  "
+                                            f"rms {max(rms, METER_FLOOR_DB):.1f}")
+
+        def lufs(value):
+            return "--" if value is None or value < GATE_LUFS else f"{value:.1f}"
+
+        dpg.set_value(self.loudness_tag, f"M {lufs(readings['momentary'])}  S {lufs(readings['short_term'])}  "
+                                         f"I {lufs(readings['integrated'])} LUFS")
+
+    def __del__(self):
+        ui_broker.discard(self.loudness_tag)
@@ -1,15 +1,616 @@
 import json
+import threading
+import time
 import numpy as np
 import uuid6
-from DPGWidgets.NodeEditor.node import InputNodeAttribute, OutputNodeAttribute, Node, NodeType
-import dearpygui.dearpygui as dpg
 import pyaudio
 
+from nodes.base import InputNodeAttribute, OutputNodeAttribute, Node, NodeType, dpg
+from engine.block import CANONICAL_DTYPE, AudioBlock, InputGather, convert
+from engine.ringbuffer import RingBuffer
+from dsp.mixing import mix_presets, preset_matrix
+from dsp.resample import PolyphaseResampler
+
 formats = [
     ["Float32", pyaudio.paFloat32, np.float32],
     ["Int16", pyaudio.paInt16, np.int16]
 ]
 
+# Blocking: read/write on the graph thread. Callback: PyAudio callback backed by a ring buffer.
+stream_modes = ["Blocking", "Callback"]
+
+# Throughput mode reads up to this many device blocks per graph tick, capped so a batched block
+# still fits a worker process ring slot
+MAX_BATCH = 8
+MAX_BATCH_FRAMES = 8192
+
+
+class NullStream:
+    """Stand-in for a PyAudio stream: reads return silence at once and writes are discarded"""
+
+    def __init__(self, format=pyaudio.paFloat32, channels=1, rate=48000, frames_per_buffer=1024, stream_callback=None,
+                 input=False, output=False, **kwargs):
+        self.dtype = next(f[2] for f in formats if f[1] == format)
+        self.channels = channels
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self.input = input
+        self.silence = b""
+
+        # Callback streams get their callback called on the block clock
+        self.callback = stream_callback
+        self.running = stream_callback is not None
+        if self.running:
+            threading.Thread(target=self._callback_loop, daemon=True).start()
+
+    def _callback_loop(self):
+        period = self.frames_per_buffer / self.rate
+        next_time = time.perf_counter()
+        while self.running:
+            in_data = self.read(self.frames_per_buffer) if self.input else None
+            self.callback(in_data, self.frames_per_buffer, {}, 0)
+            next_time += period
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+
+    def read(self, num_frames, exception_on_overflow=True):
+        size = num_frames * self.channels * np.dtype(self.dtype).itemsize
+        if len(self.silence) != size:
+            self.silence = bytes(size)
+        return self.silence
+
+    def write(self, frames, num_frames=None, exception_on_underflow=False):
+        pass
+
+    def close(self):
+        self.running = False
+
+
+class VirtualDevices:
+    """Device listing of a virtual backend: one capture and one playback device"""
+    name = "Virtual"
+
+    def get_host_api_info_by_index(self, index):
+        return {"deviceCount": 2}
+
+    def get_device_info_by_host_api_device_index(self, host_api, index):
+        capture = index == 0
+        return {"name": f"{self.name} {'Capture' if capture else 'Playback'}",
+                "maxInputChannels": 8 if capture else 0, "maxOutputChannels": 0 if capture else 8}
+
+
+class NullAudio(VirtualDevices):
+    """PyAudio stand-in opening NullStreams, for benchmarks and machines without a sound card"""
+    name = "Null"
+
+    def open(self, **kwargs):
+        return NullStream(**kwargs)
+
+    def terminate(self):
+        pass
+
+
+class LoopbackClock:
+    """Device time in frames, from the wall clock or simulated
+
+    A simulated clock only moves when a blocking read or write waits on it, and
+    then jumps straight to the frame waited for: a run takes only as long as the
+    graph's processing, which the measured timing leaves out, and repeats exactly.
+    """
+
+    def __init__(self, rate, realtime=True):
+        self.rate = rate
+        self.realtime = realtime
+        self.start = time.perf_counter()
+        self.position = 0
+
+    def now(self):
+        if self.realtime:
+            return int((time.perf_counter() - self.start) * self.rate)
+        return self.position
+
+    def wait_until(self, frame):
+        if self.realtime:
+            delay = (frame - self.now()) / self.rate
+            if delay > 0:
+                time.sleep(delay)
+        else:
+            self.position = max(self.position, frame)
+
+
+class LoopbackStream:
+    """Stream of a LoopbackAudio device: blocking, or with its callback called on the device clock"""
+
+    # Capture buffers a blocking reader may fall behind by before the oldest frames are lost
+    overflow_buffers = 4
+    # Playback buffers a blocking write may queue before it waits
+    queue_buffers = 2
+
+    def __init__(self, device, format=pyaudio.paFloat32, channels=1, rate=48000, frames_per_buffer=1024,
+                 stream_callback=None, input=False, output=False, **kwargs):
+        self.device = device
+        self.clock = device.clock
+        self.dtype = np.dtype(next(f[2] for f in formats if f[1] == format))
+        self.channels = channels
+        self.frames_per_buffer = frames_per_buffer
+        self.input = input
+
+        # Next capture frame, or the device frame the next written frame plays at
+        self.position = self.clock.now()
+        self.started = False
+        self.overflows = 0
+        self.underflows = 0
+
+        self.callback = stream_callback
+        self.running = stream_callback is not None
+        if self.running:
+            if not self.clock.realtime:
+                raise ValueError("Callback streams need the loopback device's real-time clock")
+            threading.Thread(target=self._callback_loop, daemon=True).start()
+
+    def _callback_loop(self):
+        n = self.frames_per_buffer
+        position = self.clock.now()
+        while self.running:
+            # A buffer is handed over once the device has played or captured all of it
+            self.clock.wait_until(position + n)
+            if self.input:
+                self.callback(self._encode(self.device.capture(position, n, self.channels)), n, {}, 0)
+            else:
+                out, _ = self.callback(None, n, {}, 0)
+                # Filled while the previous buffer played, heard from now on
+                self.device.play(position + n, self._decode(out))
+            position += n
+
+    def _encode(self, samples):
+        return convert(samples, self.dtype).tobytes()
+
+    def _decode(self, data):
+        return convert(np.frombuffer(data, dtype=self.dtype).reshape(-1, self.channels), np.float32)
+
+    def read(self, num_frames, exception_on_overflow=True):
+        # A reader too far behind loses the oldest frames, like a device overflow
+        now = self.clock.now()
+        if now - self.position > self.overflow_buffers * max(self.frames_per_buffer, num_frames):
+            self.overflows += 1
+            self.position = now - num_frames
+
+        self.clock.wait_until(self.position + num_frames)
+        samples = self.device.capture(self.position, num_frames, self.channels)
+        self.position += num_frames
+        return self._encode(samples)
+
+    def write(self, frames, num_frames=None, exception_on_underflow=False):
+        samples = self._decode(frames)
+
+        # Playback that ran dry restarts at the current frame, leaving a gap
+        now = self.clock.now()
+        if self.position < now:
+            if self.started:
+                self.underflows += 1
+            self.position = now
+        self.started = True
+
+        self.device.play(self.position, samples)
+        self.position += len(samples)
+
+        # Returns once the queued frames fit the device buffers, as a blocking write would
+        self.clock.wait_until(self.position - self.queue_buffers * max(self.frames_per_buffer, len(samples)))
+
+    def close(self):
+        self.running = False
+
+
+class LoopbackAudio(VirtualDevices):
+    """Virtual device pair for exercising and timing the I/O path without a sound card
+
+    Capture hears signal(start, frames, channels), float (frames, channels)
+    samples for capture frames start..start + frames, or without a signal what
+    playback played loop_frames earlier. Playback goes onto a tape indexed by
+    the device frame each sample is heard at, so recording() lines it up with
+    the capture side on the same clock. Only the last tape_frames are kept.
+    """
+    name = "Loopback"
+
+    def __init__(self, signal=None, realtime=True, tape_frames=1 << 20, loop_frames=0):
+        self.signal = signal
+        self.realtime = realtime
+        self.tape_frames = tape_frames
+        self.loop_frames = loop_frames
+
+        self.clock = None
+        self.lock = threading.Lock()
+        self.tape = None
+        self.played_until = 0
+        self.streams = []
+
+    def open(self, **kwargs):
+        # Every stream of the device runs on one clock, started by the first
+        if self.clock is None:
+            self.clock = LoopbackClock(kwargs.get("rate", 48000), self.realtime)
+        stream = LoopbackStream(self, **kwargs)
+        self.streams.append(stream)
+        return stream
+
+    def capture(self, start, frames, channels):
+        if self.signal is not None:
+            return self.signal(start, frames, channels)
+
+        out = np.zeros((frames, channels), dtype=np.float32)
+        with self.lock:
+            if self.tape is not None:
+                positions = np.arange(start, start + frames) - self.loop_frames
+                heard = (positions >= max(0, self.played_until - self.tape_frames)) & (positions < self.played_until)
+                c = min(channels, self.tape.shape[1])
+                out[heard, :c] = self.tape[positions[heard] % self.tape_frames, :c]
+        return out
+
+    def play(self, start, samples):
+        """Record float (frames, channels) samples heard from device frame start"""
+        with self.lock:
+            if self.tape is None:
+                self.tape = np.zeros((self.tape_frames, samples.shape[1]), dtype=np.float32)
+
+            # Frames skipped since the last write were silence
+            if start > self.played_until:
+                gap = np.arange(max(self.played_until, start - self.tape_frames), start)
+                self.tape[gap % self.tape_frames] = 0
+
+            c = min(samples.shape[1], self.tape.shape[1])
+            positions = np.arange(start, start + len(samples)) % self.tape_frames
+            self.tape[positions, :c] = samples[:, :c]
+            self.played_until = max(self.played_until, start + len(samples))
+
+    def recording(self, start, frames):
+        """Float (frames, channels) of what was heard from device frame start; silence where nothing was"""
+        with self.lock:
+            if self.tape is None:
+                return np.zeros((frames, 1), dtype=np.float32)
+            out = np.zeros((frames, self.tape.shape[1]), dtype=np.float32)
+            positions = np.arange(start, start + frames)
+            kept = (positions >= max(0, self.played_until - self.tape_frames)) & (positions < self.played_until)
+            out[kept] = self.tape[positions[kept] % self.tape_frames]
+            return out
+
+    def stats(self):
+        return {
+            "overflows": sum(s.overflows for s in self.streams),
+            "underflows": sum(s.underflows for s in self.streams),
+        }
+
+    def terminate(self):
+        for stream in self.streams:
+            stream.close()
+
+
+# Backends by name. A backend is a factory for a PyAudio-like object: open(**kwargs) returning a stream
+# with read/write/close, terminate(), and the host API device listing refresh_devices reads.
+backends = {
+    "PyAudio": pyaudio.PyAudio,
+    "Null": NullAudio,
+    "Loopback": LoopbackAudio,
+}
+
+
+class SharedInput:
+    """One capture stream shared by every AudioSource on the same device and settings
+
+    Each block is read from the device once, by whichever subscriber asks for it
+    first; the others get the same AudioBlock, whose channel views copy nothing.
+    """
+
+    def __init__(self, pa, device_index, format, channels, rate, frame_size, callback_mode, target_frames):
+        self.format = format
+        self.channel = channels
+        self.rate = rate
+        self.frame_size = frame_size
+        self.callback_mode = callback_mode
+        self.target_frames = target_frames
+        self.refs = 0
+
+        self.lock = threading.Lock()
+        self.seq = 0
+        # Latest block by sample dtype; subscribers may have negotiated different ones
+        self.blocks = {}
+        self.frame_index = 0
+        self.dropped_frames = 0
+        self.ring = None
+        # Seconds spent blocked in device reads, which the scheduler doesn't count as processing
+        self.wait_time = 0.0
+
+        if callback_mode:
+            # Room for a full batch on top of the latency target
+            self.ring = RingBuffer(target_frames + (MAX_BATCH + 1) * frame_size, channels, format[2])
+            self.buffer = np.zeros((MAX_BATCH * frame_size, channels), dtype=format[2])
+            self.stream = pa.open(format=format[1], channels=channels, rate=rate, input=True,
+                                  frames_per_buffer=frame_size, input_device_index=device_index,
+                                  stream_callback=self._stream_callback)
+        else:
+            self.stream = pa.open(format=format[1], channels=channels, rate=rate, input=True,
+                                  frames_per_buffer=frame_size, input_device_index=device_index)
+
+    def _stream_callback(self, in_data, frame_count, time_info, status):
+        # Runs on the PyAudio thread: only copy into the ring
+        frames = np.frombuffer(in_data, dtype=self.format[2])
+        self.ring.write(frames.reshape(-1, self.channel))
+        return None, pyaudio.paContinue
+
+    def _pull(self, frames):
+        if self.callback_mode:
+            available = self.ring.available()
+            if available < self.frame_size:
+                return None
+
+            # Drop the oldest frames beyond the latency target, which a batch stretches to its own length
+            limit = max(self.target_frames, frames)
+            if available > limit:
+                self.dropped_frames += self.ring.skip(available - limit)
+                available = limit
+
+            # Whole device blocks only, up to the batch
+            n = min(frames, available // self.frame_size * self.frame_size, len(self.buffer))
+            self.ring.read(self.buffer[:n])
+            return self.buffer[:n]
+
+        started = time.perf_counter()
+        data = self.stream.read(frames, exception_on_overflow=False)
+        self.wait_time += time.perf_counter() - started
+        arr = np.frombuffer(data, dtype=self.format[2])
+        total_samples = arr.size // self.channel
+        return arr[:total_samples * self.channel].reshape(total_samples, self.channel)
+
+    def read(self, seen, frames=None, dtype=None):
+        """Return (seq, block): a fresh block of up to frames if the caller has seen the latest, else the latest
+
+        Blocks come in dtype, the device format by default, converted once per
+        block and shared by every subscriber asking for the same dtype.
+        """
+        dtype = np.dtype(dtype or self.format[2])
+        with self.lock:
+            if seen == self.seq:
+                arr = self._pull(frames or self.frame_size)
+                if arr is None:
+                    return seen, None
+
+                # One deinterleaving copy, converting the samples on the way
+                block = AudioBlock(convert(arr.T, dtype), self.rate, self.frame_index, time.perf_counter())
+                self.blocks = {dtype: block}
+                self.frame_index += block.frames
+                self.seq += 1
+            elif dtype not in self.blocks:
+                base = next(iter(self.blocks.values()))
+                self.blocks[dtype] = AudioBlock(convert(base.data, dtype), base.rate, base.frame_index,
+                                                base.timestamp)
+            return self.seq, self.blocks[dtype]
+
+    def status(self):
+        """Ring fill level and xrun counters of callback mode"""
+        if self.ring is None:
+            return None
+
+        return {
+            "fill": self.ring.fill(),
+            "latency": self.ring.available() / self.rate,
+            "overflows": self.ring.overflows,
+            "underflows": self.ring.underflows,
+            "dropped_frames": self.dropped_frames,
+            "subscribers": self.refs,
+        }
+
+    def close(self):
+        self.stream.close()
+
+
+class SharedOutput:
+    """One playback stream shared by every AudioSink on the same device and settings
+
+    With a single sink its blocks go straight to the device. With several, their
+    blocks are summed and written once every sink has contributed; a sink
+    contributing twice first flushes the pending sum.
+    """
+
+    def __init__(self, pa, device_index, format, channels, rate, frame_size, callback_mode, target_frames):
+        self.format = format
+        self.channel = channels
+        self.rate = rate
+        self.frame_size = frame_size
+        self.callback_mode = callback_mode
+        self.target_frames = target_frames
+        self.refs = 0
+
+        self.lock = threading.Lock()
+        self.contributors = set()
+        self.sum_buffer = None
+        self.sum_frames = 0
+
+        self.ring = None
+        self.primed = False
+        self.callback_buffer = None
+        # Frames of the largest recent write; batched writes arrive in bursts of several blocks
+        self.burst_frames = frame_size
+        # Seconds spent blocked in device writes
+        self.wait_time = 0.0
+
+        if callback_mode:
+            self.ring = RingBuffer(target_frames + (MAX_BATCH + 1) * frame_size, channels, format[2])
+            self.callback_buffer = np.zeros((frame_size, channels), dtype=format[2])
+            self.stream = pa.open(format=format[1], channels=channels, rate=rate, output=True,
+                                  frames_per_buffer=frame_size, output_device_index=device_index,
+                                  stream_callback=self._stream_callback)
+        else:
+            self.stream = pa.open(format=format[1], channels=channels, rate=rate, output=True,
+                                  frames_per_buffer=frame_size, output_device_index=device_index)
+
+    def _stream_callback(self, in_data, frame_count, time_info, status):
+        # Runs on the PyAudio thread: play silence until the latency target is queued
+        if len(self.callback_buffer) != frame_count:
+            self.callback_buffer = np.zeros((frame_count, self.channel), dtype=self.format[2])
+        out = self.callback_buffer
+
+        # A burst plus one block of slack keeps batched writes from running the ring dry in between
+        if not self.primed and self.ring.available() >= max(self.target_frames, self.burst_frames + self.frame_size):
+            self.primed = True
+
+        if self.primed:
+            n = self.ring.read(out)
+            if n < frame_count:
+                out[n:] = 0
+                self.primed = False
+        else:
+            out[:] = 0
+
+        return out.tobytes(), pyaudio.paContinue
+
+    def _emit(self, frames):
+        # Write to stream, or queue for the callback without blocking
+        if self.callback_mode:
+            self.burst_frames = len(frames)
+            self.ring.write(frames)
+        else:
+            started = time.perf_counter()
+            self.stream.write(frames.tobytes())
+            self.wait_time += time.perf_counter() - started
+
+    def _flush(self):
+        if not self.contributors:
+            return
+
+        out = self.sum_buffer[:self.sum_frames]
+        dtype = self.format[2]
+        if np.issubdtype(dtype, np.integer):
+            info = np.iinfo(dtype)
+            np.rint(out, out=out)
+            np.clip(out, info.min, info.max, out=out)
+        self._emit(out.astype(dtype))
+
+        self.contributors.clear()
+        self.sum_frames = 0
+
+    def write(self, sink, frames):
+        """Queue a sink's interleaved (frames, channels) block in the device format"""
+        with self.lock:
+            if self.refs <= 1:
+                self._emit(frames)
+                return
+
+            if sink in self.contributors:
+                self._flush()
+
+            n = len(frames)
+            if self.sum_buffer is None or len(self.sum_buffer) < n:
+                self.sum_buffer = np.zeros((n, self.channel), dtype=np.float32)
+            if not self.contributors:
+                self.sum_buffer[:n] = 0
+            elif n > self.sum_frames:
+                self.sum_buffer[self.sum_frames:n] = 0
+
+            self.sum_buffer[:n] += frames
+            self.sum_frames = max(self.sum_frames, n)
+            self.contributors.add(sink)
+
+            if len(self.contributors) >= self.refs:
+                self._flush()
+
+    def status(self):
+        """Ring fill level and xrun counters of callback mode"""
+        if self.ring is None:
+            return None
+
+        return {
+            "fill": self.ring.fill(),
+            "latency": self.ring.available() / self.rate,
+            "overflows": self.ring.overflows,
+            "underflows": self.ring.underflows,
+            "subscribers": self.refs,
+        }
+
+    def close(self):
+        self.stream.close()
+
+
+class DeviceStreams:
+    """Process-wide device streams, opened once per device and settings and reference counted"""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.pa = None
+        self.streams = {}
+        self.lock = threading.Lock()
+        # Device wait of streams already closed, so wait_time never goes backwards
+        self.closed_wait = 0.0
+
+    def _acquire(self, key, cls, device, *args):
+        with self.lock:
+            shared = self.streams.get(key)
+            if shared is None:
+                if self.pa is None:
+                    self.pa = self.manager.backend()
+                shared = cls(self.pa, self._device_index(*device), *args)
+                self.streams[key] = shared
+            shared.refs += 1
+            return shared
+
+    def _device_index(self, name, index, channels_key):
+        """Index of the device called name on the open backend, or index if it has none by that name
+
+        Indices move when devices come and go; names are looked up only here, as a stream opens.
+        """
+        if not name:
+            return index
+
+        info = self.pa.get_host_api_info_by_index(0)
+        for i in range(info.get('deviceCount')):
+            device = self.pa.get_device_info_by_host_api_device_index(0, i)
+            if device.get('name') == name and device.get(channels_key) > 0:
+                return i
+        return index
+
+    def open_input(self):
+        """Capture stream for the current input settings"""
+        settings = self.manager.get_input_settings()
+        format = formats[settings["format"]]
+        callback_mode = stream_modes[settings["mode"]] == "Callback"
+        # Frames kept queued at most; older frames are dropped to hold the latency target
+        target_frames = max(settings["chunk_size"], int(settings["latency"] * settings["rate"] / 1000))
+        device = (settings.get("device_name"), settings["device"], 'maxInputChannels')
+        key = ("input", device[:2], settings["format"], settings["channels"], settings["rate"],
+               settings["chunk_size"], callback_mode, target_frames)
+        return self._acquire(key, SharedInput, device, format, settings["channels"], settings["rate"],
+                             settings["chunk_size"], callback_mode, target_frames)
+
+    def open_output(self):
+        """Playback stream for the current output settings"""
+        settings = self.manager.get_output_settings()
+        frame_size = self.manager.get_input_settings()["chunk_size"]
+        format = formats[settings["format"]]
+        callback_mode = stream_modes[settings["mode"]] == "Callback"
+        # Frames queued before playback starts (and again after the ring runs dry)
+        target_frames = max(frame_size, int(settings["latency"] * settings["rate"] / 1000))
+        device = (settings.get("device_name"), settings["device"], 'maxOutputChannels')
+        key = ("output", device[:2], settings["format"], settings["channels"], settings["rate"],
+               frame_size, callback_mode, target_frames)
+        return self._acquire(key, SharedOutput, device, format, settings["channels"], settings["rate"],
+                             frame_size, callback_mode, target_frames)
+
+    def wait_time(self):
+        """Total seconds graph ticks spent blocked in device reads and writes"""
+        with self.lock:
+            return self.closed_wait + sum(shared.wait_time for shared in self.streams.values())
+
+    def release(self, shared):
+        """Drop one reference; the last one closes the stream, and the last stream the backend"""
+        with self.lock:
+            shared.refs -= 1
+            if shared.refs > 0:
+                return
+
+            shared.close()
+            self.closed_wait += shared.wait_time
+            self.streams = {key: s for key, s in self.streams.items() if s is not shared}
+            if not self.streams and self.pa is not None:
+                self.pa.terminate()
+                self.pa = None
+
+
 class AudioIOManager:
     def __init__(self):
         # UUIDs for input device controls
@@ -18,56 +619,104 @@ class AudioIOManager:
         self.input_rate_uuid = uuid6.uuid7().hex
         self.input_chunk_uuid = uuid6.uuid7().hex
         self.input_format_uuid = uuid6.uuid7().hex
+        self.input_mode_uuid = uuid6.uuid7().hex
+        self.input_latency_uuid = uuid6.uuid7().hex
 
         # UUIDs for output device controls
         self.output_device_uuid = uuid6.uuid7().hex
         self.output_channels_uuid = uuid6.uuid7().hex
         self.output_rate_uuid = uuid6.uuid7().hex
         self.output_format_uuid = uuid6.uuid7().hex
+        self.output_mode_uuid = uuid6.uuid7().hex
+        self.output_latency_uuid = uuid6.uuid7().hex
 
         # Status text UUIDs
         self.input_status_uuid = uuid6.uuid7().hex
         self.output_status_uuid = uuid6.uuid7().hex
 
         # Default settings
+        # device is an index into the backend's list; device_name, when set, finds it again as indices move
         self.input_settings = {
             "device": 0,
+            "device_name": "",
             "channels": 2,
             "rate": 48000,
             "chunk_size": 1024,
-            "format": 0
+            "format": 0,
+            "mode": 0,
+            "latency": 50
         }
 
         self.output_settings = {
             "device": 0,
+            "device_name": "",
             "channels": 2,
             "rate": 48000,
-            "format": 0
+            "format": 0,
+            "mode": 0,
+            "latency": 50
         }
 
         self.is_init_window = False
 
-        self.devices_input = []
-        self.devices_output = []
+        # Factory for the PyAudio-like object nodes open their streams on; see set_backend
+        self.backend = pyaudio.PyAudio
+        self.backend_name = "PyAudio"
+
+        # (input, output) device lists, enumerated on first use; headless runs never pay for it
+        self._devices = None
+
+        # Open device streams shared between nodes
+        self.streams = DeviceStreams(self)
+
+        # Device blocks sources read per graph tick; raised above 1 by the scheduler in throughput mode
+        self.batch = 1
+
+        # False while rendering offline: nodes wait on full queues instead of dropping blocks
+        self.realtime = True
+
+    def set_backend(self, backend):
+        """Open streams on a backend from backends by name, or on any factory of PyAudio-like objects
+
+        Only streams opened afterwards use it; the device list is enumerated again on next use.
+        """
+        self.backend = backends[backend] if isinstance(backend, str) else backend
+        # Worker processes select the same backend by name; a custom factory has none
+        self.backend_name = backend if isinstance(backend, str) else None
+        self._devices = None
 
-        self.refresh_devices()
+    @property
+    def devices_input(self):
+        if self._devices is None:
+            self.refresh_devices()
+        return self._devices[0]
 
+    @property
+    def devices_output(self):
+        if self._devices is None:
+            self.refresh_devices()
+        return self._devices[1]
 
     def refresh_devices(self):
         """Refresh the audio device list"""
-        pa = pyaudio.PyAudio()
-        info = pa.get_host_api_info_by_index(0)
-        numdevices = info.get('deviceCount')
-        self.devices_input.clear()
-        self.devices_output.clear()
+        devices_input = []
+        devices_output = []
 
-        for i in range(0, numdevices):
-            if pa.get_device_info_by_host_api_device_index(0, i).get('maxInputChannels') > 0:
-                self.devices_input.append([pa.get_device_info_by_host_api_device_index(0, i).get('name'), i])
-            elif pa.get_device_info_by_host_api_device_index(0, i).get('maxOutputChannels') > 0:
-                self.devices_output.append([pa.get_device_info_by_host_api_device_index(0, i).get('name'), i])
+        pa = self.backend()
+        try:
+            info = pa.get_host_api_info_by_index(0)
+            numdevices = info.get('deviceCount')
+
+            for i in range(0, numdevices):
+                device = pa.get_device_info_by_host_api_device_index(0, i)
+                if device.get('maxInputChannels') > 0:
+                    devices_input.append([device.get('name'), i])
+                elif device.get('maxOutputChannels') > 0:
+                    devices_output.append([device.get('name'), i])
+        finally:
+            pa.terminate()
 
-        pa.terminate()
+        self._devices = (devices_input, devices_output)
 
         # Update combo boxes
         if self.is_init_window:
@@ -86,11 +735,14 @@ class AudioIOManager:
                     result = d[1]
                     break
             self.input_settings["device"] = result
+            self.input_settings["device_name"] = device_name
             self.input_settings["channels"] = dpg.get_value(self.input_channels_uuid)
             self.input_settings["rate"] = dpg.get_value(self.input_rate_uuid)
             self.input_settings["chunk_size"] = dpg.get_value(self.input_chunk_uuid)
             format_name = dpg.get_value(self.input_format_uuid)
             self.input_settings["format"] = 0 if "Float32" in format_name else 1
+            self.input_settings["mode"] = stream_modes.index(dpg.get_value(self.input_mode_uuid))
+            self.input_settings["latency"] = dpg.get_value(self.input_latency_uuid)
             self.save(None, None)
             dpg.set_value(self.input_status_uuid, "✓ Input settings updated")
         except Exception as e:
@@ -107,10 +759,13 @@ class AudioIOManager:
                     break
 
             self.output_settings["device"] = result
+            self.output_settings["device_name"] = device_name
             self.output_settings["channels"] = dpg.get_value(self.output_channels_uuid)
             self.output_settings["rate"] = dpg.get_value(self.output_rate_uuid)
             format_name = dpg.get_value(self.output_format_uuid)
             self.output_settings["format"] = 0 if "Float32" in format_name else 1
+            self.output_settings["mode"] = stream_modes.index(dpg.get_value(self.output_mode_uuid))
+            self.output_settings["latency"] = dpg.get_value(self.output_latency_uuid)
             self.save(None, None)
             dpg.set_value(self.output_status_uuid, "✓ Output settings updated")
         except Exception as e:
@@ -155,6 +810,17 @@ class AudioIOManager:
                         dpg.add_combo([f[0] for f in formats], tag=self.input_format_uuid, width=300,
                                       default_value=formats[self.input_settings["format"]][0])
 
+                    with dpg.table_row():
+                        dpg.add_text("Stream Mode")
+                        dpg.add_combo(stream_modes, tag=self.input_mode_uuid, width=300,
+                                      default_value=stream_modes[self.input_settings["mode"]])
+
+                    with dpg.table_row():
+                        dpg.add_text("Latency Target (ms)")
+                        dpg.add_input_int(tag=self.input_latency_uuid, width=300,
+                                          min_value=5, max_value=1000, min_clamped=True, max_clamped=True,
+                                          default_value=self.input_settings["latency"])
+
                 dpg.add_spacer(height=5)
                 with dpg.group(horizontal=True):
                     dpg.add_button(label="Apply Input Settings", callback=lambda: self.update_input_settings(),
@@ -191,6 +857,17 @@ class AudioIOManager:
                         dpg.add_combo([f[0] for f in formats], tag=self.output_format_uuid, width=300,
                                       default_value=formats[self.output_settings["format"]][0])
 
+                    with dpg.table_row():
+                        dpg.add_text("Stream Mode")
+                        dpg.add_combo(stream_modes, tag=self.output_mode_uuid, width=300,
+                                      default_value=stream_modes[self.output_settings["mode"]])
+
+                    with dpg.table_row():
+                        dpg.add_text("Latency Target (ms)")
+                        dpg.add_input_int(tag=self.output_latency_uuid, width=300,
+                                          min_value=5, max_value=1000, min_clamped=True, max_clamped=True,
+                                          default_value=self.output_settings["latency"])
+
                 dpg.add_spacer(height=5)
                 with dpg.group(horizontal=True):
                     dpg.add_button(label="Apply Output Settings", callback=lambda: self.update_output_settings(),
@@ -205,8 +882,8 @@ class AudioIOManager:
                 dpg.add_text(f"Input devices: {len(self.devices_input)} | Output devices: {len(self.devices_output)}")
             dpg.add_text("Please restart software after changed.", color=(255, 255, 0))
 
-        self.load(None, None)
         self.is_init_window = True
+        self.load(None, None)
 
     def get_input_settings(self):
         """Return current input settings"""
@@ -216,6 +893,17 @@ class AudioIOManager:
         """Return current output settings"""
         return self.output_settings.copy()
 
+    def block_period(self):
+        """Duration of one input block in seconds"""
+        return self.input_settings["chunk_size"] / self.input_settings["rate"]
+
+    def max_batch(self):
+        """Most device blocks one graph tick may carry"""
+        return max(1, min(MAX_BATCH, MAX_BATCH_FRAMES // self.input_settings["chunk_size"]))
+
+    def set_batch(self, batch):
+        self.batch = max(1, min(batch, self.max_batch()))
+
     def save(self, _, __):
         data = self.export_settings()
         json.dump(data, open("io.json", "w"))
@@ -240,48 +928,63 @@ class AudioIOManager:
                 # Validate and update input settings
                 input_data = settings_dict["input"]
                 self.input_settings["device"] = input_data.get("device", 0)
+                self.input_settings["device_name"] = input_data.get("device_name", "")
                 self.input_settings["channels"] = input_data.get("channels", 2)
                 self.input_settings["rate"] = input_data.get("rate", 48000)
                 self.input_settings["chunk_size"] = input_data.get("chunk_size", 1024)
                 self.input_settings["format"] = input_data.get("format", 0)
+                self.input_settings["mode"] = input_data.get("mode", 0)
+                self.input_settings["latency"] = input_data.get("latency", 50)
 
                 # Update UI elements
-                if dpg.does_item_exist(self.input_device_uuid) and self.input_settings["device"] < len(self.devices_input):
-                    dpg.set_value(self.input_device_uuid, self.devices_input[self.input_settings["device"]][0])
-                if dpg.does_item_exist(self.input_channels_uuid):
-                    dpg.set_value(self.input_channels_uuid, self.input_settings["channels"])
-                if dpg.does_item_exist(self.input_rate_uuid):
-                    dpg.set_value(self.input_rate_uuid, self.input_settings["rate"])
-                if dpg.does_item_exist(self.input_chunk_uuid):
-                    dpg.set_value(self.input_chunk_uuid, self.input_settings["chunk_size"])
-                if dpg.does_item_exist(self.input_format_uuid):
-                    dpg.set_value(self.input_format_uuid, formats[self.input_settings["format"]][0])
+                if self.is_init_window:
+                    if dpg.does_item_exist(self.input_device_uuid) and self.input_settings["device"] < len(self.devices_input):
+                        dpg.set_value(self.input_device_uuid, self.devices_input[self.input_settings["device"]][0])
+                    if dpg.does_item_exist(self.input_channels_uuid):
+                        dpg.set_value(self.input_channels_uuid, self.input_settings["channels"])
+                    if dpg.does_item_exist(self.input_rate_uuid):
+                        dpg.set_value(self.input_rate_uuid, self.input_settings["rate"])
+                    if dpg.does_item_exist(self.input_chunk_uuid):
+                        dpg.set_value(self.input_chunk_uuid, self.input_settings["chunk_size"])
+                    if dpg.does_item_exist(self.input_format_uuid):
+                        dpg.set_value(self.input_format_uuid, formats[self.input_settings["format"]][0])
+                    if dpg.does_item_exist(self.input_mode_uuid):
+                        dpg.set_value(self.input_mode_uuid, stream_modes[self.input_settings["mode"]])
+                    if dpg.does_item_exist(self.input_latency_uuid):
+                        dpg.set_value(self.input_latency_uuid, self.input_settings["latency"])
 
             if "output" in settings_dict:
                 # Validate and update output settings
                 output_data = settings_dict["output"]
                 self.output_settings["device"] = output_data.get("device", 0)
-
+                self.output_settings["device_name"] = output_data.get("device_name", "")
                 self.output_settings["channels"] = output_data.get("channels", 2)
                 self.output_settings["rate"] = output_data.get("rate", 48000)
                 self.output_settings["format"] = output_data.get("format", 0)
-
-                result_display = 0
-                for i, d in enumerate(self.devices_output):
-                    if d[1] == self.output_settings["device"]:
-                        result_display = i
-                        break
-
-                # Update UI elements
-                if dpg.does_item_exist(self.output_device_uuid) and result_display < len(
-                        self.devices_output):
-                    dpg.set_value(self.output_device_uuid, self.devices_output[result_display][0])
-                if dpg.does_item_exist(self.output_channels_uuid):
-                    dpg.set_value(self.output_channels_uuid, self.output_settings["channels"])
-                if dpg.does_item_exist(self.output_rate_uuid):
-                    dpg.set_value(self.output_rate_uuid, self.output_settings["rate"])
-                if dpg.does_item_exist(self.output_format_uuid):
-                    dpg.set_value(self.output_format_uuid, formats[self.output_settings["format"]][0])
+                self.output_settings["mode"] = output_data.get("mode", 0)
+                self.output_settings["latency"] = output_data.get("latency", 50)
+
+                # Update UI elements; only the settings window needs the device list
+                if self.is_init_window:
+                    result_display = 0
+                    for i, d in enumerate(self.devices_output):
+                        if d[1] == self.output_settings["device"]:
+                            result_display = i
+                            break
+
+                    if dpg.does_item_exist(self.output_device_uuid) and result_display < len(
+                            self.devices_output):
+                        dpg.set_value(self.output_device_uuid, self.devices_output[result_display][0])
+                    if dpg.does_item_exist(self.output_channels_uuid):
+                        dpg.set_value(self.output_channels_uuid, self.output_settings["channels"])
+                    if dpg.does_item_exist(self.output_rate_uuid):
+                        dpg.set_value(self.output_rate_uuid, self.output_settings["rate"])
+                    if dpg.does_item_exist(self.output_format_uuid):
+                        dpg.set_value(self.output_format_uuid, formats[self.output_settings["format"]][0])
+                    if dpg.does_item_exist(self.output_mode_uuid):
+                        dpg.set_value(self.output_mode_uuid, stream_modes[self.output_settings["mode"]])
+                    if dpg.does_item_exist(self.output_latency_uuid):
+                        dpg.set_value(self.output_latency_uuid, self.output_settings["latency"])
 
             return True, "Settings imported successfully"
         except Exception as e:
@@ -307,34 +1010,54 @@ class AudioSource(Node):
 
         self.apply_output_attr()
 
-        self.pa = pyaudio.PyAudio()
-        self.stream = self.pa.open(format=self.format[1], channels=self.channel, rate=self.rate, input=True, frames_per_buffer=self.frame_size, input_device_index=self.device_index)
+        # Device samples enter the graph as float32 unless the engine finds every consumer takes the raw format
+        self.native_format = np.dtype(self.format[2])
+        self.output_format = CANONICAL_DTYPE
+
+        # Capture stream shared with other sources on this device, opened on the first block; seen is the
+        # last block taken from it
+        self.device = None
+        self.seen = 0
+
+    def activate(self):
+        """Open the capture stream; called by the first process, or up front by the engine"""
+        if self.device is None:
+            self.device = audio_manager.streams.open_input()
+            self.seen = 0
 
     def apply_output_attr(self):
         for ch in range(self.channel):
             self.add_output_attribute(OutputNodeAttribute(f"Channel {ch}"), dynamic=True)
 
+    def set_output_format(self, dtype):
+        self.output_format = np.dtype(dtype)
+
+    def stream_status(self):
+        """Ring fill level and xrun counters of callback mode"""
+        return self.device.status() if self.device is not None else None
+
     def process(self, data):
-        if not self.stream:
-            self.onCreate()
+        if not self._output_attributes:
+            return
 
-        if self._output_attributes and self.stream:
-            arr = np.frombuffer(self.stream.read(self.frame_size, exception_on_overflow=False), dtype=self.format[2])
-            total_samples = arr.size // self.channel
-            arr = arr[:total_samples * self.channel]
+        self.activate()
+        self.seen, block = self.device.read(self.seen, self.frame_size * audio_manager.batch, self.output_format)
+        if block is None:
+            return
 
-            arr = arr.reshape(total_samples, self.channel)
+        for ch in range(self.channel):
+            try:
+                self._output_attributes[ch].set_data(block.channel(ch))
+            except:
+                pass
 
-            for ch in range(self.channel):
-                try:
-                    self._output_attributes[ch].set_data((arr[:, ch].copy(), self.rate, self.frame_size))
-                except:
-                    pass
+    def close(self):
+        if getattr(self, "device", None) is not None:
+            audio_manager.streams.release(self.device)
+            self.device = None
 
     def __del__(self):
-        if self.stream:
-            self.stream.close()
-            self.pa.terminate()
+        self.close()
 
 class AudioSink(Node):
     @staticmethod
@@ -351,74 +1074,138 @@ class AudioSink(Node):
         self.channel = output_device_settings["channels"]
         self.rate = output_device_settings["rate"]
 
-        self.apply_input_attr()
+        # Float32 from the graph, or the device format as-is when it comes straight from a matching source
+        self.input_formats = (CANONICAL_DTYPE, np.dtype(self.format[2]))
 
-        self.pa = pyaudio.PyAudio()
+        self.apply_input_attr()
 
-        self.stream = self.pa.open(
-            format=self.format[1],
-            channels=self.channel,
-            rate=self.rate,
-            output=True,
-            output_device_index=self.device_index
-        )
+        # Channel mixing, rebuilt only when the input layout changes
+        self.mix_preset = "Auto"
+        self.custom_matrix = None
+        self.mix_key = None
+        self.mix = None
+        self.mix_passthrough = False
+        self.mix_buffer = None
+        self.output_buffer = None
+        # Linked channels only: the mix preset follows how many there are
+        self.gather = InputGather(compact=True)
+
+        # Inserted when the input rate differs from the device rate, instead of device-side resampling
+        self.resampler = None
+
+        # Playback stream shared with other sinks on this device, which sums their blocks; opened on the first
+        # block, so a sink nothing plays into never holds the device
+        self.device = None
+
+    def activate(self):
+        """Open the playback stream; called by the first block, or up front by the engine"""
+        if self.device is None:
+            self.device = audio_manager.streams.open_output()
 
     def apply_input_attr(self):
         for ch in range(self.channel):
             self.add_input_attribute(InputNodeAttribute(f"Channel {ch}"), dynamic=True)
 
-    def process(self, data):
-        if not self.stream:
-            self.onCreate()
+    def custom(self):
+        dpg.add_combo(mix_presets, label="Mix", default_value=self.mix_preset, width=100,
+                      callback=lambda _, value: self.set_mix_preset(value))
+
+    def set_mix_preset(self, preset):
+        self.mix_preset = preset
+        self.mix_key = None
+
+    def set_mix_matrix(self, matrix):
+        """Use a custom (output_channels, input_channels) matrix, or None to go back to the preset"""
+        self.custom_matrix = None if matrix is None else np.asarray(matrix, dtype=np.float32)
+        self.mix_key = None
+
+    def _update_mix(self, in_channels, in_dtype):
+        """Build the (input, output) matrix for X.T @ mix with sample scaling folded in"""
+        if self.custom_matrix is not None and self.custom_matrix.shape == (self.channel, in_channels):
+            matrix = self.custom_matrix.copy()
+        else:
+            matrix = preset_matrix(self.mix_preset, in_channels, self.channel)
+
+        out_dtype = np.dtype(self.format[2])
+        self.mix_passthrough = (np.dtype(in_dtype) == out_dtype and in_channels == self.channel
+                                and np.array_equal(matrix, np.eye(self.channel)))
+
+        if np.issubdtype(in_dtype, np.integer):
+            matrix /= -float(np.iinfo(in_dtype).min)
+        if np.issubdtype(out_dtype, np.integer):
+            matrix *= -float(np.iinfo(out_dtype).min)
+
+        self.mix = np.ascontiguousarray(matrix.T)
+        self.mix_key = (in_channels, np.dtype(in_dtype))
+
+    def _mix_to_output(self, audio_array, capacity=0):
+        """Mix (input_channels, samples) into a slice of the reusable interleaved output buffer
+
+        The buffers hold at least capacity frames, so blocks that vary in length
+        (resampled, batched) reuse them; they only grow for a longer block.
+        """
+        in_channels, frames = audio_array.shape
+        out_dtype = self.format[2]
+
+        if self.output_buffer is None or len(self.output_buffer) < frames:
+            size = max(frames, capacity)
+            self.output_buffer = np.zeros((size, self.channel), dtype=out_dtype)
+            self.mix_buffer = np.zeros((size, self.channel), dtype=np.float32)
+        output, mix = self.output_buffer[:frames], self.mix_buffer[:frames]
+
+        if self.mix_key != (in_channels, audio_array.dtype):
+            self._update_mix(in_channels, audio_array.dtype)
+
+        if self.mix_passthrough:
+            np.copyto(output, audio_array.T)
+        elif np.issubdtype(out_dtype, np.integer):
+            info = np.iinfo(out_dtype)
+            np.dot(audio_array.T, self.mix, out=mix)
+            np.rint(mix, out=mix)
+            np.clip(mix, info.min, info.max, out=mix)
+            output[...] = mix
+        else:
+            np.dot(audio_array.T, self.mix, out=output)
+
+        return output
+
+    def stream_status(self):
+        """Ring fill level and xrun counters of callback mode"""
+        return self.device.status() if self.device is not None else None
 
-        if not self._input_attributes or not self.stream:
+    def process(self, data):
+        if not self._input_attributes:
             return
 
-        # Collect all input channel data
-        channel_data = []
-        max_len = 0
-
-        for ch in range(self.channel):
-            if ch < len(self._input_attributes):
-                data = self._input_attributes[ch].get_data()
-                if data:
-                    ch_data, sample_rate, chunksize = data
-
-                    if ch_data is not None and len(ch_data) > 0:
-                        channel_data.append(ch_data)
-                        max_len = max(max_len, len(ch_data))
-
-        if not channel_data or max_len == 0:
+        blocks = self.gather.take(self._input_attributes[:self.channel])
+        if blocks is None:
             return
+        self.activate()
 
-        # Pad all channels to same length
-        for i in range(len(channel_data)):
-            if len(channel_data[i]) < max_len:
-                channel_data[i] = np.pad(channel_data[i], (0, max_len - len(channel_data[i])))
-
-        # Stack channels
-        audio_array = np.column_stack(channel_data)  # Shape: (samples, input_channels)
+        # Device format kept as-is: the mix matrix folds in the sample scaling
+        audio_array = self.gather.stack(blocks, dtype=None)
 
-        # Matrix mixing: downmix or upmix to output channels
-        if audio_array.shape[1] != self.channel:
-            output_array = np.zeros((audio_array.shape[0], self.channel), dtype=self.format[2])
+        # Convert to the device rate; the resampler keeps its filter state between blocks
+        rate = blocks[0].rate
+        if rate != self.rate:
+            if self.resampler is None or self.resampler.in_rate != rate or self.resampler.channels != len(audio_array):
+                self.resampler = PolyphaseResampler(rate, self.rate, len(audio_array))
+            audio_array = self.resampler.process(audio_array)
+        else:
+            self.resampler = None
 
-            if self.channel == 1:
-                # Downmix to mono: average all channels
-                output_array[:, 0] = np.mean(audio_array, axis=1)
-            elif self.channel == 2 and audio_array.shape[1] == 1:
-                # Upmix mono to stereo: duplicate
-                output_array[:, 0] = audio_array[:, 0]
-                output_array[:, 1] = audio_array[:, 0]
-            audio_array = output_array
+        # Matrix mixing into output channels, interleaved in place, with room for the longest tick a batch
+        # can bring at the device rate
+        longest = audio_manager.max_batch() * audio_manager.get_input_settings()["chunk_size"]
+        capacity = -(-longest * self.rate // rate) + 1
+        output_data = self._mix_to_output(audio_array, capacity)
 
-        # Interleave channels for output
-        output_data = audio_array.astype(self.format[2]).flatten()
+        self.device.write(id(self), output_data)
 
-        # Write to stream
-        self.stream.write(output_data.tobytes())
+    def close(self):
+        if getattr(self, "device", None) is not None:
+            audio_manager.streams.release(self.device)
+            self.device = None
 
     def __del__(self):
-        if self.stream:
-            self.stream.close()
-            self.pa.terminate()
\ No newline at end of file
+        self.close()
\ No newline at end of file
@@ -0,0 +1,87 @@
+import enum
+import itertools
+import os
+
+# Headless processes (the engine runner, benchmarks, worker processes) skip the GUI toolkit even when installed
+HEADLESS = os.environ.get("NODEDSP_HEADLESS") == "1"
+
+if not HEADLESS:
+    try:
+        import dearpygui.dearpygui as dpg
+        from DPGWidgets.NodeEditor.node import InputNodeAttribute, OutputNodeAttribute, Node, NodeType
+    except ImportError:
+        HEADLESS = True
+
+
+class _NullDPG:
+    """Stands in for dearpygui without a GUI: items never exist and calls do nothing"""
+
+    def __init__(self):
+        self._uuids = itertools.count(1)
+
+    def generate_uuid(self):
+        return next(self._uuids)
+
+    def does_item_exist(self, item):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class _NullNodeType(enum.Enum):
+    INPUT = 0
+    OUTPUT = 1
+
+
+class _NullInputNodeAttribute:
+    """Input slot of a GUI-less node; the engine replaces it with a Port when wiring"""
+
+    def __init__(self, label="input", data=None):
+        self._label = label
+        self._data = data
+
+    def get_data(self):
+        return self._data
+
+
+class _NullOutputNodeAttribute:
+    """Output slot of a GUI-less node"""
+
+    def __init__(self, label="output"):
+        self._label = label
+        self._data = None
+
+    def get_data(self):
+        return self._data
+
+    def set_data(self, data):
+        self._data = data
+
+
+class _NullNode:
+    """Node base with the attribute lists of the editor's Node and no widgets"""
+
+    def __init__(self, label, data, type=None):
+        self._label = label
+        self._data = data
+        self._type = type
+        self._input_attributes = []
+        self._output_attributes = []
+
+    def add_input_attribute(self, attr, dynamic=False):
+        self._input_attributes.append(attr)
+
+    def add_output_attribute(self, attr, dynamic=False):
+        self._output_attributes.append(attr)
+
+    def custom(self):
+        pass
+
+
+if HEADLESS:
+    dpg = _NullDPG()
+    NodeType = _NullNodeType
+    InputNodeAttribute = _NullInputNodeAttribute
+    OutputNodeAttribute = _NullOutputNodeAttribute
+    Node = _NullNode
@@ -0,0 +1,230 @@
+import os
+
+import numpy as np
+import uuid6
+
+from nodes.base import InputNodeAttribute, OutputNodeAttribute, Node, NodeType, dpg
+from engine.block import AudioBlock, InputGather
+from dsp import convolution, filters
+from dsp.resample import resample_offline
+from nodes.audioio import audio_manager
+from nodes.fileio import read_wav_info
+
+fir_types = ["Lowpass", "Highpass"]
+
+# FIR responses longer than this run through the partitioned convolver instead of direct form
+DIRECT_FIR_TAPS = 64
+
+
+class ChannelEffect(Node):
+    """Node processing all its channels as one (channels, frames) float32 array per block"""
+
+    def __init__(self, name, data):
+        super().__init__(name, data, NodeType.INPUT)
+
+        self.settings = data if isinstance(data, dict) else {}
+        self.channel = self.settings.get("channels", audio_manager.get_output_settings()["channels"])
+        self.frame_size = audio_manager.get_input_settings()["chunk_size"]
+
+        # Unlinked inputs as silence, so each output stays on its input's channel
+        self.gather = InputGather()
+        self.frame_index = 0
+
+        for ch in range(self.channel):
+            self.add_input_attribute(InputNodeAttribute(f"Channel {ch}"), dynamic=True)
+            self.add_output_attribute(OutputNodeAttribute(f"Channel {ch}"), dynamic=True)
+
+    def apply(self, audio_array, rate):
+        """Return the processed (channels, frames) float32 array"""
+        return audio_array
+
+    def process(self, data):
+        blocks = self.gather.take(self._input_attributes[:self.channel])
+        if blocks is None:
+            return
+
+        first = self.gather.last
+        audio_array = self.gather.stack(blocks)
+        out = AudioBlock(self.apply(audio_array, first.rate), first.rate, self.frame_index, first.timestamp)
+        self.frame_index += out.frames
+
+        for ch in range(out.channels):
+            self._output_attributes[ch].set_data(out.channel(ch))
+
+
+class BiquadFilter(ChannelEffect):
+    @staticmethod
+    def factory(name, data):
+        return BiquadFilter(name, data)
+
+    def __init__(self, name, data):
+        super().__init__(name, data)
+
+        self.filter_type = self.settings.get("type", "Lowpass")
+        self.freq = self.settings.get("freq", 1000.0)
+        self.q = self.settings.get("q", 0.7071)
+        self.gain = self.settings.get("gain", 0.0)
+        # Identical sections in series, for steeper slopes
+        self.stages = self.settings.get("stages", 1)
+
+        self.filter = None
+        self.design_key = None
+
+    def custom(self):
+        dpg.add_combo(filters.filter_types, default_value=self.filter_type, width=100,
+                      callback=lambda _, value: self.set_param("filter_type", value))
+        dpg.add_input_float(label="Hz", default_value=self.freq, width=100, step=0,
+                            callback=lambda _, value: self.set_param("freq", value))
+        dpg.add_input_float(label="Q", default_value=self.q, width=100, step=0,
+                            callback=lambda _, value: self.set_param("q", value))
+        dpg.add_input_float(label="dB", default_value=self.gain, width=100, step=0,
+                            callback=lambda _, value: self.set_param("gain", value))
+        dpg.add_input_int(label="Stages", default_value=self.stages, width=100, min_value=1, min_clamped=True,
+                          callback=lambda _, value: self.set_param("stages", value))
+
+    def set_param(self, name, value):
+        setattr(self, name, value)
+        self.design_key = None
+
+    def apply(self, audio_array, rate):
+        key = (self.filter_type, self.freq, self.q, self.gain, self.stages, rate)
+        if key != self.design_key:
+            sos = [filters.biquad(self.filter_type, self.freq, rate, self.q, self.gain)] * max(1, self.stages)
+            if self.filter is None:
+                self.filter = filters.SOSFilter(sos, len(audio_array))
+            else:
+                # Same section count keeps the state, so sweeping a parameter doesn't click
+                self.filter.set_sos(sos)
+            self.design_key = key
+
+        return self.filter.process(audio_array)
+
+
+class FIRFilter(ChannelEffect):
+    @staticmethod
+    def factory(name, data):
+        return FIRFilter(name, data)
+
+    def __init__(self, name, data):
+        super().__init__(name, data)
+
+        self.filter_type = self.settings.get("type", "Lowpass")
+        self.cutoff = self.settings.get("cutoff", 1000.0)
+        self.taps = self.settings.get("taps", 255)
+
+        self.filter = None
+        self.design_key = None
+
+    def custom(self):
+        dpg.add_combo(fir_types, default_value=self.filter_type, width=100,
+                      callback=lambda _, value: self.set_param("filter_type", value))
+        dpg.add_input_float(label="Hz", default_value=self.cutoff, width=100, step=0,
+                            callback=lambda _, value: self.set_param("cutoff", value))
+        dpg.add_input_int(label="Taps", default_value=self.taps, width=100, min_value=3, min_clamped=True,
+                          callback=lambda _, value: self.set_param("taps", value))
+
+    def set_param(self, name, value):
+        setattr(self, name, value)
+        self.design_key = None
+
+    def apply(self, audio_array, rate):
+        key = (self.filter_type, self.cutoff, self.taps, rate, len(audio_array))
+        if key != self.design_key:
+            taps = self.taps | 1
+            if self.filter_type == "Highpass":
+                h = filters.fir_highpass(taps, self.cutoff, rate)
+            else:
+                h = filters.fir_lowpass(taps, self.cutoff, rate)
+
+            if taps <= DIRECT_FIR_TAPS:
+                self.filter = filters.FIRFilter(h, len(audio_array))
+            else:
+                self.filter = convolution.PartitionedConvolver(h, self.frame_size, len(audio_array))
+            self.design_key = key
+
+        return self.filter.process(audio_array)
+
+
+class Convolver(ChannelEffect):
+    @staticmethod
+    def factory(name, data):
+        return Convolver(name, data)
+
+    def __init__(self, name, data):
+        super().__init__(name, data)
+
+        self.path = self.settings.get("path", "ir.wav")
+        self.wet = self.settings.get("wet", 1.0)
+
+        self.path_uuid = uuid6.uuid7().hex
+        self.status_uuid = uuid6.uuid7().hex
+
+        self.ir = None
+        self.ir_rate = None
+        self.convolver = None
+        self.convolver_key = None
+        # The response is read on the first block, so loading a patch doesn't read every IR file
+        self.ir_loaded = False
+
+    def activate(self):
+        if self.ir_loaded:
+            return
+        self.ir_loaded = True
+        try:
+            self.load_ir(self.path)
+        except (OSError, ValueError) as e:
+            print(f"Convolver: {e}")
+
+    def load_ir(self, path):
+        """Read an impulse response WAV; it is transformed when the first block shows the rate"""
+        offset, frames, channels, rate, dtype = read_wav_info(path)
+        samples = np.fromfile(path, dtype=dtype, count=frames * channels, offset=offset).reshape(frames, channels)
+
+        ir = samples.T.astype(np.float32)
+        if dtype.kind == "i":
+            ir /= -float(np.iinfo(dtype).min)
+
+        self.path = path
+        self.ir_loaded = True
+        self.ir = ir
+        self.ir_rate = rate
+        self.convolver_key = None
+
+    def custom(self):
+        dpg.add_input_text(tag=self.path_uuid, default_value=self.path, width=200)
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="Load", callback=lambda: self._load_clicked())
+            dpg.add_slider_float(label="Wet", default_value=self.wet, min_value=0.0, max_value=1.0, width=100,
+                                 callback=lambda _, value: setattr(self, "wet", value))
+        dpg.add_text("", tag=self.status_uuid)
+
+    def _load_clicked(self):
+        try:
+            self.load_ir(dpg.get_value(self.path_uuid))
+            dpg.set_value(self.status_uuid, f"{os.path.basename(self.path)}: {self.ir.shape[1]} taps")
+        except (OSError, ValueError) as e:
+            dpg.set_value(self.status_uuid, f"✗ {e}")
+
+    def apply(self, audio_array, rate):
+        self.activate()
+        if self.ir is None:
+            return audio_array
+
+        key = (rate, len(audio_array))
+        if key != self.convolver_key:
+            ir = self.ir
+            if self.ir_rate != rate:
+                # Bring the response to the stream rate once, rather than the stream to the response
+                ir = resample_offline(ir, self.ir_rate, rate)
+
+            # A mono response applies to every channel; otherwise channel i uses response channel i
+            if len(ir) != 1 and len(ir) != len(audio_array):
+                ir = ir[:1]
+            self.convolver = convolution.PartitionedConvolver(ir, self.frame_size, len(audio_array))
+            self.convolver_key = key
+
+        wet = self.convolver.process(audio_array)
+        if self.wet < 1.0:
+            wet *= self.wet
+            wet += (1.0 - self.wet) * audio_array
+        return wet
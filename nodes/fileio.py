@@ -0,0 +1,300 @@
+import os
+import queue
+import struct
+import threading
+import numpy as np
+import uuid6
+
+from nodes.base import InputNodeAttribute, OutputNodeAttribute, Node, NodeType, dpg
+from engine.block import CANONICAL_DTYPE, AudioBlock, InputGather, common_source, convert
+from nodes.audioio import audio_manager, formats
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _wav_dtype(tag, bits):
+    if tag == WAVE_FORMAT_PCM and bits == 16:
+        return np.dtype("<i2")
+    if tag == WAVE_FORMAT_PCM and bits == 32:
+        return np.dtype("<i4")
+    if tag == WAVE_FORMAT_IEEE_FLOAT and bits == 32:
+        return np.dtype("<f4")
+    raise ValueError(f"Unsupported WAV sample format (tag {tag}, {bits} bit)")
+
+
+def read_wav_info(path):
+    """Return (data offset, frames, channels, rate, dtype) of a WAV file without reading samples"""
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise ValueError(f"{path} is not a WAV file")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+
+            chunk_id, chunk_size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                body = f.read(chunk_size)
+                tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", body[:16])
+                if tag == WAVE_FORMAT_EXTENSIBLE:
+                    tag = struct.unpack("<H", body[24:26])[0]
+                fmt = (channels, rate, _wav_dtype(tag, bits))
+                if chunk_size & 1:
+                    f.seek(1, 1)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"{path} has data before its fmt chunk")
+                offset = f.tell()
+                # Streamed files may leave the size unset; trust the file length instead
+                size = min(chunk_size, file_size - offset)
+                channels, rate, dtype = fmt
+                return offset, size // (channels * dtype.itemsize), channels, rate, dtype
+            else:
+                f.seek(chunk_size + (chunk_size & 1), 1)
+
+
+def _wav_header(rate, channels, dtype, data_bytes):
+    tag = WAVE_FORMAT_IEEE_FLOAT if dtype.kind == "f" else WAVE_FORMAT_PCM
+    block_align = channels * dtype.itemsize
+    return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_bytes, b"WAVE", b"fmt ", 16, tag, channels, rate,
+                       rate * block_align, block_align, dtype.itemsize * 8, b"data", data_bytes)
+
+
+class WavWriter:
+    """WAV file written by a background thread, so the graph thread never waits on disk
+
+    A full queue makes write wait up to timeout seconds for the writer before
+    dropping the block; None waits as long as it takes, for offline renders.
+    """
+
+    def __init__(self, path, rate, channels, dtype, max_pending=64, timeout=None):
+        self.path = path
+        self.rate = rate
+        self.channels = channels
+        self.dtype = np.dtype(dtype)
+        self.timeout = timeout
+        self.data_bytes = 0
+        self.dropped = 0
+
+        self.file = open(path, "wb", buffering=1 << 20)
+        self.file.write(_wav_header(rate, channels, self.dtype, 0))
+
+        self.queue = queue.Queue(max_pending)
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.thread.start()
+
+    def _writer_loop(self):
+        while True:
+            frames = self.queue.get()
+            if frames is None:
+                break
+            self.file.write(frames.tobytes())
+            self.data_bytes += frames.nbytes
+
+    def write(self, frames):
+        """Queue interleaved (frames, channels) samples; the array must not be reused by the caller"""
+        try:
+            self.queue.put(frames, timeout=self.timeout)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Flush queued blocks and patch the header sizes"""
+        if self.file is None:
+            return
+
+        self.queue.put(None)
+        self.thread.join()
+        self.file.seek(0)
+        self.file.write(_wav_header(self.rate, self.channels, self.dtype, self.data_bytes))
+        self.file.close()
+        self.file = None
+
+
+class FileSource(Node):
+    @staticmethod
+    def factory(name, data):
+        return FileSource(name, data)
+
+    def __init__(self, name, data):
+        super().__init__(name, data, NodeType.INPUT)
+
+        settings = data if isinstance(data, dict) else {}
+        input_device_settings = audio_manager.get_input_settings()
+
+        self.path = settings.get("path", "input.wav")
+        self.loop = settings.get("loop", False)
+        self.frame_size = input_device_settings["chunk_size"]
+
+        # Raw PCM has no header, so its layout comes from the node settings or the input device
+        self.raw_channels = settings.get("channels", input_device_settings["channels"])
+        self.raw_rate = settings.get("rate", input_device_settings["rate"])
+        self.raw_format = formats[settings.get("format", input_device_settings["format"])]
+
+        self.path_uuid = uuid6.uuid7().hex
+        self.status_uuid = uuid6.uuid7().hex
+
+        self.samples = None
+        self.channel = settings.get("channels", input_device_settings["channels"])
+        self.rate = None
+        self.position = 0
+        self.finished = False
+        # File samples enter the graph as float32 unless the engine finds every consumer takes the raw format
+        self.output_format = CANONICAL_DTYPE
+
+        try:
+            self.open(self.path)
+        except (OSError, ValueError) as e:
+            print(f"FileSource: {e}")
+
+        self.apply_output_attr()
+
+    def apply_output_attr(self):
+        for ch in range(self.channel):
+            self.add_output_attribute(OutputNodeAttribute(f"Channel {ch}"), dynamic=True)
+
+    @property
+    def native_format(self):
+        return self.samples.dtype if self.samples is not None else CANONICAL_DTYPE
+
+    def set_output_format(self, dtype):
+        self.output_format = np.dtype(dtype)
+
+    def open(self, path):
+        """Map a WAV or raw PCM file; blocks are read as views of the mapping"""
+        if os.path.splitext(path)[1].lower() in (".raw", ".pcm"):
+            dtype = np.dtype(self.raw_format[2])
+            offset = 0
+            channels = self.raw_channels
+            frames = os.path.getsize(path) // (channels * dtype.itemsize)
+            rate = self.raw_rate
+        else:
+            offset, frames, channels, rate, dtype = read_wav_info(path)
+
+        self.samples = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(frames, channels))
+        self.path = path
+        self.channel = channels
+        self.rate = rate
+        self.position = 0
+        self.finished = False
+
+    def custom(self):
+        dpg.add_input_text(tag=self.path_uuid, default_value=self.path, width=200)
+        with dpg.group(horizontal=True):
+            dpg.add_button(label="Load", callback=lambda: self._load_clicked())
+            dpg.add_checkbox(label="Loop", default_value=self.loop, callback=lambda _, value: setattr(self, "loop", value))
+        dpg.add_text("", tag=self.status_uuid)
+
+    def _load_clicked(self):
+        try:
+            self.open(dpg.get_value(self.path_uuid))
+            dpg.set_value(self.status_uuid, f"{self.channel} ch, {self.rate} Hz, {len(self.samples)} frames")
+        except (OSError, ValueError) as e:
+            dpg.set_value(self.status_uuid, f"✗ {e}")
+
+    def process(self, data):
+        if self.samples is None or self.finished:
+            return
+
+        frames = self.frame_size * audio_manager.batch
+        end = min(self.position + frames, len(self.samples))
+        if end == self.position:
+            if self.loop and len(self.samples) > 0:
+                self.position = 0
+                end = min(frames, len(self.samples))
+            else:
+                self.finished = True
+                return
+
+        # The only copy: deinterleaving the mapped view into the block buffer, converting on the way
+        frames = self.samples[self.position:end]
+        block = AudioBlock(convert(frames.T, self.output_format), self.rate, self.position, self.position / self.rate)
+        self.position = end
+
+        for ch in range(min(self.channel, len(self._output_attributes))):
+            self._output_attributes[ch].set_data(block.channel(ch))
+
+
+class FileSink(Node):
+    @staticmethod
+    def factory(name, data):
+        return FileSink(name, data)
+
+    def __init__(self, name, data):
+        super().__init__(name, data, NodeType.OUTPUT)
+
+        settings = data if isinstance(data, dict) else {}
+        output_device_settings = audio_manager.get_output_settings()
+
+        self.path = settings.get("path", "output.wav")
+        self.channel = settings.get("channels", output_device_settings["channels"])
+        self.format = formats[settings.get("format", output_device_settings["format"])]
+
+        self.path_uuid = uuid6.uuid7().hex
+        self.writer = None
+        # Unlinked inputs as None, so each block lands in its own channel's column
+        self.gather = InputGather()
+
+        # Float32 from the graph, or the file format as-is when it comes straight from a matching source
+        self.input_formats = (CANONICAL_DTYPE, np.dtype(self.format[2]))
+
+        self.apply_input_attr()
+
+    def apply_input_attr(self):
+        for ch in range(self.channel):
+            self.add_input_attribute(InputNodeAttribute(f"Channel {ch}"), dynamic=True)
+
+    def custom(self):
+        dpg.add_input_text(tag=self.path_uuid, default_value=self.path, width=200,
+                           callback=lambda _, value: setattr(self, "path", value))
+        dpg.add_button(label="Finish File", callback=lambda: self.close())
+
+    def process(self, data):
+        blocks = self.gather.take(self._input_attributes[:self.channel])
+        if blocks is None:
+            return
+
+        if self.writer is None:
+            # Live, a disk stall may cost at most one block period; offline nothing is dropped
+            timeout = audio_manager.block_period() if audio_manager.realtime else None
+            self.writer = WavWriter(self.path, self.gather.last.rate, self.channel, self.format[2], timeout=timeout)
+
+        # Fresh interleaved array per block in the file format: it is handed to the writer thread.
+        # Interleaving and conversion are one pass, a plain copy when the formats match.
+        frames = max(block.frames for block in blocks if block is not None)
+        source = common_source(blocks) if None not in blocks else None
+        if source is not None and source.channels == self.channel:
+            out = np.empty((frames, self.channel), dtype=self.format[2])
+            convert(source.data, out.dtype, out.T)
+        else:
+            out = np.zeros((frames, self.channel), dtype=self.format[2])
+            for ch, block in enumerate(blocks):
+                if block is not None:
+                    convert(block.data[0], out.dtype, out[:block.frames, ch])
+
+        self.writer.write(out)
+
+    def queue_status(self):
+        """Blocks waiting for the writer thread and blocks dropped because it fell behind"""
+        if self.writer is None:
+            return None
+
+        return {
+            "fill": self.writer.queue.qsize() / self.writer.queue.maxsize,
+            "dropped": self.writer.dropped,
+        }
+
+    def close(self):
+        """Finish the current file; the next block starts a new one"""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __del__(self):
+        self.close()
@@ -0,0 +1,151 @@
+import numpy as np
+
+from nodes.base import InputNodeAttribute, OutputNodeAttribute, Node, NodeType, dpg
+from engine.block import AudioBlock, InputGather
+from nodes.audioio import audio_manager
+
+
+class LinearNode(Node):
+    """Node whose outputs are a fixed linear mix of its inputs
+
+    mix_matrix() gives the (outputs, inputs) gains. Run on its own, a block is
+    one np.dot; the engine fuses connected linear nodes into a single matrix
+    instead, and rebuilds it when a node's mix_version changes.
+    """
+
+    def __init__(self, name, data, inputs, outputs):
+        super().__init__(name, data, NodeType.INPUT)
+
+        self.settings = data if isinstance(data, dict) else {}
+        self.mix_version = 0
+        self.matrix = None
+        self.matrix_version = None
+
+        self.gather = InputGather()
+
+        for ch in range(inputs):
+            self.add_input_attribute(InputNodeAttribute(f"In {ch}"), dynamic=True)
+        for ch in range(outputs):
+            self.add_output_attribute(OutputNodeAttribute(f"Out {ch}"), dynamic=True)
+
+    def build_matrix(self):
+        """Return the (outputs, inputs) float32 gain matrix for the current settings"""
+        raise NotImplementedError
+
+    def mix_matrix(self):
+        if self.matrix_version != self.mix_version:
+            self.matrix = self.build_matrix()
+            self.matrix_version = self.mix_version
+        return self.matrix
+
+    def set_param(self, name, value):
+        setattr(self, name, value)
+        self.mix_version += 1
+
+    def process(self, data):
+        blocks = self.gather.take(self._input_attributes)
+        if blocks is None:
+            return
+
+        first = self.gather.last
+        out = AudioBlock(np.dot(self.mix_matrix(), self.gather.stack(blocks)), first.rate, first.frame_index,
+                         first.timestamp)
+        for ch in range(out.channels):
+            self._output_attributes[ch].set_data(out.channel(ch))
+
+
+class Gain(LinearNode):
+    @staticmethod
+    def factory(name, data):
+        return Gain(name, data)
+
+    def __init__(self, name, data):
+        settings = data if isinstance(data, dict) else {}
+        self.channel = settings.get("channels", audio_manager.get_output_settings()["channels"])
+        super().__init__(name, data, self.channel, self.channel)
+
+        self.gain = self.settings.get("gain", 0.0)  # dB
+        self.mute = self.settings.get("mute", False)
+
+    def custom(self):
+        dpg.add_slider_float(label="dB", default_value=self.gain, min_value=-60.0, max_value=12.0, width=120,
+                             callback=lambda _, value: self.set_param("gain", value))
+        dpg.add_checkbox(label="Mute", default_value=self.mute, callback=lambda _, value: self.set_param("mute", value))
+
+    def build_matrix(self):
+        gain = 0.0 if self.mute else 10 ** (self.gain / 20)
+        return np.eye(self.channel, dtype=np.float32) * np.float32(gain)
+
+
+class Pan(LinearNode):
+    @staticmethod
+    def factory(name, data):
+        return Pan(name, data)
+
+    def __init__(self, name, data):
+        super().__init__(name, data, 1, 2)
+
+        self.pan = self.settings.get("pan", 0.0)  # -1 left .. 1 right
+
+    def custom(self):
+        dpg.add_slider_float(label="Pan", default_value=self.pan, min_value=-1.0, max_value=1.0, width=120,
+                             callback=lambda _, value: self.set_param("pan", value))
+
+    def build_matrix(self):
+        # Constant power: -3 dB per side in the centre
+        angle = (min(max(self.pan, -1.0), 1.0) + 1.0) * np.pi / 4
+        return np.array([[np.cos(angle)], [np.sin(angle)]], dtype=np.float32)
+
+
+class Sum(LinearNode):
+    @staticmethod
+    def factory(name, data):
+        return Sum(name, data)
+
+    def __init__(self, name, data):
+        settings = data if isinstance(data, dict) else {}
+        self.inputs = settings.get("inputs", 2)
+        super().__init__(name, data, self.inputs, 1)
+
+        self.gain = self.settings.get("gain", 0.0)  # dB
+
+    def custom(self):
+        dpg.add_input_float(label="dB", default_value=self.gain, width=100, step=0,
+                            callback=lambda _, value: self.set_param("gain", value))
+
+    def build_matrix(self):
+        return np.full((1, self.inputs), 10 ** (self.gain / 20), dtype=np.float32)
+
+
+class Router(LinearNode):
+    @staticmethod
+    def factory(name, data):
+        return Router(name, data)
+
+    def __init__(self, name, data):
+        settings = data if isinstance(data, dict) else {}
+        self.inputs = settings.get("inputs", audio_manager.get_input_settings()["channels"])
+        self.outputs = settings.get("outputs", audio_manager.get_output_settings()["channels"])
+        super().__init__(name, data, self.inputs, self.outputs)
+
+        # Input feeding each output, -1 for silence; output i takes input i by default
+        routes = list(self.settings.get("routes", range(self.outputs)))
+        self.routes = [r if isinstance(r, int) and 0 <= r < self.inputs else -1
+                       for r in routes[:self.outputs] + [-1] * (self.outputs - len(routes))]
+
+    def custom(self):
+        items = ["Off"] + [f"In {ch}" for ch in range(self.inputs)]
+        for out in range(self.outputs):
+            dpg.add_combo(items, label=f"Out {out}", default_value=items[self.routes[out] + 1], width=80,
+                          callback=lambda _, value, out=out: self.set_route(out, items.index(value) - 1))
+
+    def set_route(self, out, source):
+        self.routes[out] = source
+        self.mix_version += 1
+
+    def build_matrix(self):
+        matrix = np.zeros((self.outputs, self.inputs), dtype=np.float32)
+        for out, source in enumerate(self.routes):
+            if source >= 0:
+                matrix[out, source] = 1.0
+        return matrix
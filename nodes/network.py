@@ -0,0 +1,324 @@
+import os
+import socket
+import struct
+import threading
+import time
+import numpy as np
+import uuid6
+
+from nodes.base import InputNodeAttribute, OutputNodeAttribute, Node, NodeType, dpg
+from engine.block import AudioBlock, InputGather, convert
+from engine.broker import ui_broker
+from engine.ringbuffer import JitterBuffer
+from nodes.audioio import MAX_BATCH_FRAMES, audio_manager
+
+# Packet header: magic, version, sample format code, channels, frames, rate, sequence number,
+# frame index of the first sample, sender wall clock time. Planar (channels, frames) samples follow.
+HEADER = struct.Struct("<2sBBHHIIqd")
+MAGIC = b"ND"
+VERSION = 1
+
+# Sample formats on the wire, indexed by the header's format code
+wire_formats = ["Float32", "Int16"]
+WIRE_DTYPES = [np.dtype("<f4"), np.dtype("<i2")]
+
+transports = ["UDP", "Unix"]
+
+# Largest UDP payload; blocks that don't fit go out as several packets
+MAX_PACKET = 65507
+
+
+def open_socket(transport, address, bind=False):
+    """Datagram socket for "host:port" (UDP) or a socket path (Unix), and the address to send to"""
+    if transport == "Unix":
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        target = address
+        if bind:
+            if os.path.exists(address):
+                os.unlink(address)
+            sock.bind(address)
+    else:
+        host, port = address.rsplit(":", 1)
+        target = (host, int(port))
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if bind:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(target)
+
+    if bind:
+        # Room for a burst of packets while the receiving thread is descheduled
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    return sock, target
+
+
+class NetworkSender(Node):
+    @staticmethod
+    def factory(name, data):
+        return NetworkSender(name, data)
+
+    def __init__(self, name, data):
+        super().__init__(name, data, NodeType.OUTPUT)
+
+        settings = data if isinstance(data, dict) else {}
+        self.transport = settings.get("transport", "UDP")
+        self.address = settings.get("address", "127.0.0.1:9000")
+        self.format = settings.get("format", 0)
+        self.channel = settings.get("channels", audio_manager.get_input_settings()["channels"])
+
+        self.address_uuid = uuid6.uuid7().hex
+
+        # Socket opened on the first block; the packet buffer is reused for every send
+        self.sock = None
+        self.target = None
+        self.packet = bytearray(MAX_PACKET)
+        self.seq = 0
+        self.gather = InputGather()
+
+        self.sent = 0
+        self.dropped = 0
+        self.last_error = None
+
+        for ch in range(self.channel):
+            self.add_input_attribute(InputNodeAttribute(f"Channel {ch}"), dynamic=True)
+
+    def custom(self):
+        with dpg.group(horizontal=True):
+            dpg.add_combo(transports, default_value=self.transport, width=60,
+                          callback=lambda _, value: self.set_destination(value, self.address))
+            dpg.add_combo(wire_formats, default_value=wire_formats[self.format], width=80,
+                          callback=lambda _, value: setattr(self, "format", wire_formats.index(value)))
+        dpg.add_input_text(tag=self.address_uuid, default_value=self.address, width=200, on_enter=True,
+                           callback=lambda _, value: self.set_destination(self.transport, value))
+
+    def set_destination(self, transport, address):
+        self.close()
+        self.transport = transport
+        self.address = address
+
+    def activate(self):
+        if self.sock is None:
+            self.sock, self.target = open_socket(self.transport, self.address)
+            self.sock.setblocking(False)
+
+    def process(self, data):
+        blocks = self.gather.take(self._input_attributes[:self.channel])
+        if blocks is None:
+            return
+        first = self.gather.last
+
+        try:
+            self.activate()
+        except OSError as e:
+            self._error(e)
+            return
+
+        audio_array = self.gather.stack(blocks)
+        dtype = WIRE_DTYPES[self.format]
+        channels, frames = audio_array.shape
+        per_packet = min(MAX_BATCH_FRAMES, (MAX_PACKET - HEADER.size) // (channels * dtype.itemsize))
+
+        for start in range(0, frames, per_packet):
+            n = min(per_packet, frames - start)
+            HEADER.pack_into(self.packet, 0, MAGIC, VERSION, self.format, channels, n, first.rate, self.seq,
+                             first.frame_index + start, time.time())
+
+            # Converted straight into the packet buffer
+            payload = np.ndarray((channels, n), dtype=dtype, buffer=self.packet, offset=HEADER.size)
+            convert(audio_array[:, start:start + n], dtype, payload)
+
+            try:
+                self.sock.sendto(memoryview(self.packet)[:HEADER.size + payload.nbytes], self.target)
+                self.sent += 1
+            except OSError as e:
+                # Socket buffer full or no receiver listening yet: the packet is lost, the stream goes on
+                self.dropped += 1
+                self._error(e)
+            self.seq = (self.seq + 1) & 0xFFFFFFFF
+
+    def _error(self, e):
+        message = str(e)
+        if message != self.last_error:
+            print(f"NetworkSender error: {e}")
+        self.last_error = message
+
+    def queue_status(self):
+        return {"sent": self.sent, "dropped": self.dropped}
+
+    def close(self):
+        if getattr(self, "sock", None) is not None:
+            self.sock.close()
+            self.sock = None
+
+    def __del__(self):
+        self.close()
+
+
+class NetworkReceiver(Node):
+    @staticmethod
+    def factory(name, data):
+        return NetworkReceiver(name, data)
+
+    def __init__(self, name, data):
+        super().__init__(name, data, NodeType.INPUT)
+
+        settings = data if isinstance(data, dict) else {}
+        self.transport = settings.get("transport", "UDP")
+        self.address = settings.get("address", "127.0.0.1:9000")
+        self.channel = settings.get("channels", audio_manager.get_input_settings()["channels"])
+
+        self.address_uuid = uuid6.uuid7().hex
+        self.status_uuid = uuid6.uuid7().hex
+        ui_broker.set_rate(self.status_uuid, 4)
+
+        self.jitter = JitterBuffer(settings.get("slots", 32), self.channel, settings.get("max_frames", MAX_BATCH_FRAMES),
+                                   settings.get("min_depth", 2))
+
+        # Socket and receiving thread start on the first block
+        self.sock = None
+        self.thread = None
+        self.thread_running = False
+        self.packet = bytearray(MAX_PACKET)
+        self.invalid = 0
+        self.last_raw_seq = None
+        self.seq_wraps = 0
+
+        # Frames popped but not played yet; packets rarely match the frames of a tick
+        self.pending = np.zeros((self.channel, 0), dtype=np.float32)
+        self.pending_index = 0
+        self.pending_rate = 0
+        self.packet_frames = audio_manager.get_input_settings()["chunk_size"]
+
+        for ch in range(self.channel):
+            self.add_output_attribute(OutputNodeAttribute(f"Channel {ch}"), dynamic=True)
+
+    def custom(self):
+        dpg.add_combo(transports, default_value=self.transport, width=60,
+                      callback=lambda _, value: self.set_source(value, self.address))
+        dpg.add_input_text(tag=self.address_uuid, default_value=self.address, width=200, on_enter=True,
+                           callback=lambda _, value: self.set_source(self.transport, value))
+        dpg.add_text("", tag=self.status_uuid)
+
+    def set_source(self, transport, address):
+        self.close()
+        self.transport = transport
+        self.address = address
+
+    def activate(self):
+        if self.sock is not None:
+            return
+
+        self.sock, _ = open_socket(self.transport, self.address, bind=True)
+        # Short timeout so close() can stop the thread
+        self.sock.settimeout(0.1)
+        self.thread_running = True
+        self.thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self.thread.start()
+
+    def _receive_loop(self):
+        """Background thread: receive into the one packet buffer and file packets into the jitter buffer"""
+        view = memoryview(self.packet)
+        while self.thread_running:
+            try:
+                n = self.sock.recv_into(view)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            if n < HEADER.size:
+                self.invalid += 1
+                continue
+
+            magic, version, code, channels, frames, rate, seq, frame_index, sent = HEADER.unpack_from(self.packet)
+            if magic != MAGIC or version != VERSION or code >= len(WIRE_DTYPES) \
+                    or n < HEADER.size + channels * frames * WIRE_DTYPES[code].itemsize:
+                self.invalid += 1
+                continue
+
+            # Sequence numbers are 32 bit on the wire
+            if self.last_raw_seq is not None and seq + (1 << 31) < self.last_raw_seq:
+                self.seq_wraps += 1
+            self.last_raw_seq = seq
+
+            payload = np.ndarray((channels, frames), dtype=WIRE_DTYPES[code], buffer=self.packet, offset=HEADER.size)
+            self.jitter.put(seq + (self.seq_wraps << 32), frame_index, rate, payload)
+
+    def process(self, data):
+        if not self._output_attributes:
+            return
+
+        try:
+            self.activate()
+        except (OSError, ValueError) as e:
+            print(f"NetworkReceiver error: {e}")
+            self.close()
+            return
+
+        # A tick carries batch device blocks; pop packets until they are covered
+        frames = audio_manager.get_input_settings()["chunk_size"] * audio_manager.batch
+        parts = [self.pending] if self.pending.shape[1] else []
+        have = self.pending.shape[1]
+        while have < frames:
+            burst = -(-(frames - have) // max(1, self.packet_frames))
+            packet = self.jitter.pop(burst)
+            if packet is None:
+                break
+
+            samples, frame_index, rate = packet
+            if not parts or rate != self.pending_rate:
+                # Nothing pending, or the sender changed rate and what is pending can't join these samples
+                parts, have = [], 0
+                self.pending_index, self.pending_rate = frame_index, rate
+            parts.append(samples)
+            have += samples.shape[1]
+            self.packet_frames = samples.shape[1]
+
+        if not have:
+            return
+
+        # A full tick, or all there is when the buffer ran dry; the rest waits for the next tick
+        samples = np.concatenate(parts, axis=1) if len(parts) > 1 else parts[0]
+        self.pending = samples[:, frames:]
+        block = AudioBlock(samples[:, :frames], self.pending_rate, self.pending_index, time.perf_counter())
+        self.pending_index += block.frames
+        for ch in range(min(self.channel, len(self._output_attributes))):
+            self._output_attributes[ch].set_data(block.channel(ch))
+
+        if ui_broker.due(self.status_uuid):
+            ui_broker.publish(self.status_uuid, self._show_status)
+
+    def _show_status(self):
+        if dpg.does_item_exist(self.status_uuid):
+            dpg.set_value(self.status_uuid, f"Buffer {self.jitter.depth()}/{self.jitter.target} | "
+                                            f"lost {self.jitter.lost} | late {self.jitter.late}")
+
+    def queue_status(self):
+        """Jitter buffer depth and target, measured jitter and loss counters"""
+        jitter = self.jitter
+        return {
+            "depth": jitter.depth(),
+            "target": jitter.target,
+            "jitter_ms": jitter.jitter * 1000,
+            "received": jitter.received,
+            "lost": jitter.lost,
+            "late": jitter.late,
+            "underruns": jitter.underruns,
+            "skipped": jitter.skipped,
+            "invalid": self.invalid,
+        }
+
+    def close(self):
+        if getattr(self, "thread_running", False):
+            self.thread_running = False
+            if self.thread is not None:
+                self.thread.join(timeout=1.0)
+                self.thread = None
+
+        if getattr(self, "sock", None) is not None:
+            self.sock.close()
+            self.sock = None
+            if self.transport == "Unix" and os.path.exists(self.address):
+                os.unlink(self.address)
+
+    def __del__(self):
+        self.close()
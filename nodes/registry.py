@@ -0,0 +1,27 @@
+from nodes import audioio, analyzer, effects, fileio, mixer, network, resampler
+
+# Node type id -> (label, category, factory). Shared by the editor and the headless engine.
+NODE_TYPES = {
+    "AIN": ("Audio Source", "I/O", audioio.AudioSource.factory),
+    "AOUT": ("Audio Sink", "I/O", audioio.AudioSink.factory),
+    "FIN": ("File Source", "I/O", fileio.FileSource.factory),
+    "FOUT": ("File Sink", "I/O", fileio.FileSink.factory),
+    "NOUT": ("Network Send", "I/O", network.NetworkSender.factory),
+    "NIN": ("Network Receive", "I/O", network.NetworkReceiver.factory),
+    "STV": ("Spectrum", "Viewer", analyzer.SpectrumView.factory),
+    "SPG": ("Spectrogram", "Viewer", analyzer.Spectrogram.factory),
+    "LVL": ("Loudness Meter", "Viewer", analyzer.LoudnessMeter.factory),
+    "SRC": ("Resampler", "Effects", resampler.Resampler.factory),
+    "BIQ": ("Biquad Filter", "Effects", effects.BiquadFilter.factory),
+    "FIR": ("FIR Filter", "Effects", effects.FIRFilter.factory),
+    "CONV": ("Convolver", "Effects", effects.Convolver.factory),
+    "GAIN": ("Gain", "Mixer", mixer.Gain.factory),
+    "PAN": ("Pan", "Mixer", mixer.Pan.factory),
+    "SUM": ("Sum", "Mixer", mixer.Sum.factory),
+    "ROUTE": ("Router", "Mixer", mixer.Router.factory),
+}
+
+
+def factories():
+    """Return a node type id -> factory mapping"""
+    return {type_id: entry[2] for type_id, entry in NODE_TYPES.items()}
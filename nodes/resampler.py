@@ -0,0 +1,67 @@
+import uuid6
+
+from nodes.base import InputNodeAttribute, OutputNodeAttribute, Node, NodeType, dpg
+from engine.block import AudioBlock, InputGather
+from dsp.resample import PolyphaseResampler
+from nodes.audioio import audio_manager
+
+common_rates = [8000, 16000, 22050, 32000, 44100, 48000, 88200, 96000]
+
+
+class Resampler(Node):
+    @staticmethod
+    def factory(name, data):
+        return Resampler(name, data)
+
+    def __init__(self, name, data):
+        super().__init__(name, data, NodeType.INPUT)
+
+        settings = data if isinstance(data, dict) else {}
+        output_device_settings = audio_manager.get_output_settings()
+
+        self.target_rate = settings.get("rate", output_device_settings["rate"])
+        self.channel = settings.get("channels", output_device_settings["channels"])
+
+        self.rate_uuid = uuid6.uuid7().hex
+
+        self.resampler = None
+        # Unlinked inputs as silence, so each output stays on its input's channel
+        self.gather = InputGather()
+        self.frame_index = 0
+
+        for ch in range(self.channel):
+            self.add_input_attribute(InputNodeAttribute(f"Channel {ch}"), dynamic=True)
+            self.add_output_attribute(OutputNodeAttribute(f"Channel {ch}"), dynamic=True)
+
+    def custom(self):
+        dpg.add_combo([str(rate) for rate in common_rates], tag=self.rate_uuid, label="Hz",
+                      default_value=str(self.target_rate), width=80,
+                      callback=lambda _, value: self.set_rate(int(value)))
+
+    def set_rate(self, rate):
+        self.target_rate = rate
+        self.resampler = None
+
+    def process(self, data):
+        blocks = self.gather.take(self._input_attributes[:self.channel])
+        if blocks is None:
+            return
+
+        first = self.gather.last
+        rate = first.rate
+        if rate == self.target_rate:
+            for ch, block in enumerate(blocks):
+                if block is not None:
+                    self._output_attributes[ch].set_data(block)
+            return
+
+        audio_array = self.gather.stack(blocks, dtype=None)
+
+        if self.resampler is None or self.resampler.in_rate != rate or self.resampler.channels != len(audio_array):
+            self.resampler = PolyphaseResampler(rate, self.target_rate, len(audio_array))
+
+        out = AudioBlock(self.resampler.process(audio_array), self.target_rate, self.frame_index, first.timestamp)
+        self.frame_index += out.frames
+
+        for ch in range(out.channels):
+            self._output_attributes[ch].set_data(out.channel(ch))
@@ -0,0 +1,49 @@
+import unittest
+
+import numpy as np
+
+from dsp.convolution import PartitionedConvolver
+
+
+class PartitionedConvolverTest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.ir = (rng.standard_normal(1000) * np.exp(-np.arange(1000) / 200)).astype(np.float32)
+        self.x = rng.standard_normal((2, 6000)).astype(np.float32)
+        self.expected = np.stack([np.convolve(channel, self.ir)[:self.x.shape[1]] for channel in self.x])
+
+    def convolve(self, sizes, block_size=256):
+        convolver = PartitionedConvolver(self.ir, block_size, channels=2)
+        out, position = [], 0
+        for size in sizes:
+            out.append(convolver.process(self.x[:, position:position + size]))
+            position += size
+        return np.concatenate(out, axis=1)
+
+    def assert_matches(self, out):
+        np.testing.assert_allclose(out, self.expected[:, :out.shape[1]], atol=2e-4)
+
+    def test_whole_partitions(self):
+        self.assert_matches(self.convolve([256] * 10 + [1024] * 3))
+
+    def test_mixed_block_sizes(self):
+        # Aligned blocks, then batched and odd lengths, as from throughput batching or a resampler upstream
+        sizes = [256, 256, 512, 300, 256, 1, 767, 441, 256, 1024, 77]
+        out = self.convolve(sizes)
+        self.assertEqual(out.shape[1], sum(sizes))
+        self.assert_matches(out)
+
+    def test_random_block_sizes(self):
+        sizes = np.random.default_rng(1).integers(1, 700, 40)
+        sizes = sizes[np.cumsum(sizes) <= self.x.shape[1]]
+        self.assert_matches(self.convolve([int(size) for size in sizes]))
+
+    def test_reset_starts_a_new_stream(self):
+        convolver = PartitionedConvolver(self.ir, 256, channels=2)
+        convolver.process(self.x[:, :1000])
+        convolver.reset()
+        np.testing.assert_allclose(convolver.process(self.x[:, :700]), self.expected[:, :700], atol=2e-4)
+
+
+if __name__ == "__main__":
+    unittest.main()
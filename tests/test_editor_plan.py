@@ -0,0 +1,110 @@
+import contextlib
+import gc
+import io
+import unittest
+
+from engine.graph import EditorPlan
+
+
+class EditorOutput:
+    """Output attribute of the editor: hands each block to the inputs linked with add_child"""
+
+    def __init__(self):
+        self.children = []
+
+    def add_child(self, parent, child):
+        self.children.append(child)
+
+    def set_data(self, data):
+        for child in self.children:
+            child.data = data
+
+
+class EditorInput:
+    def __init__(self):
+        self.data = None
+
+    def get_data(self):
+        return self.data
+
+
+class EditorNode:
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+        self._input_attributes = [EditorInput()]
+        self._output_attributes = []
+        self.add_output_attribute(EditorOutput())
+
+    def add_output_attribute(self, attr, dynamic=False):
+        self._output_attributes.append(attr)
+
+    def process(self, data):
+        self.calls.append(self.name)
+        self._output_attributes[0].set_data(self.name)
+
+
+class EditorPlanTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.plan = EditorPlan(recheck_ticks=1)
+        self.create = self.plan.tracked(lambda name, data: EditorNode(name, self.calls))
+
+    def link(self, source, target, output=0):
+        source._output_attributes[output].add_child(None, target._input_attributes[0])
+
+    def tick(self):
+        self.calls.clear()
+        self.plan.run()
+        return list(self.calls)
+
+    def test_runs_linked_nodes_in_order(self):
+        c, b, a = self.create("c", None), self.create("b", None), self.create("a", None)
+        self.create("unlinked", None)
+        self.link(b, c)
+        self.link(a, b)
+        self.assertEqual(self.tick(), ["a", "b", "c"])
+        self.assertEqual(c._input_attributes[0].get_data(), "b")
+
+        # Relinking an input replaces its source
+        self.link(c, b)
+        self.link(a, c)
+        self.assertEqual(self.tick(), ["a", "c", "b"])
+
+    def test_outputs_added_later_are_tracked(self):
+        a, b = self.create("a", None), self.create("b", None)
+        a.add_output_attribute(EditorOutput(), dynamic=True)
+        self.link(a, b, output=1)
+        self.assertEqual(self.tick(), ["a", "b"])
+        self.assertEqual(self.plan.links, [(0, 1, 1, 0)])
+
+    def test_deleted_nodes_drop_out(self):
+        a, b, c = self.create("a", None), self.create("b", None), self.create("c", None)
+        self.link(a, b)
+        self.link(b, c)
+        self.assertEqual(self.tick(), ["a", "b", "c"])
+
+        del c
+        gc.collect()
+        self.plan.invalidate()
+        self.assertEqual(self.tick(), ["a", "b"])
+
+    def test_cycle_is_reported_once(self):
+        a, b = self.create("a", None), self.create("b", None)
+        self.link(a, b)
+        self.link(b, a)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            for _ in range(5):
+                self.plan.invalidate()
+                self.assertEqual(self.tick(), [])
+        self.assertEqual(output.getvalue().count("cycle"), 1)
+
+        # Breaking the cycle by relinking runs the graph again
+        c = self.create("c", None)
+        self.link(c, a)
+        self.assertEqual(self.tick(), ["c", "a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import unittest
+
+# Node modules fall back to their headless base classes without a GUI
+os.environ.setdefault("NODEDSP_HEADLESS", "1")
+
+import numpy as np
+
+try:
+    from nodes.analyzer import LoudnessMeter
+except ImportError as e:
+    raise unittest.SkipTest(f"node modules unavailable: {e}")
+
+RATE = 48000
+
+# EBU Tech 3341 tolerance for integrated, momentary and short-term loudness; the histogram's
+# relative gate (see LoudnessMeter.integrated) stays within it for these signals
+TOLERANCE = 0.1
+
+
+def measure(parts, frequency=997.0, block=4800):
+    """Meter a stereo sine in both channels, as (dBFS, seconds) sections played in turn"""
+    meter = LoudnessMeter("lvl", {"channels": 2})
+    position = 0
+    for level, seconds in parts:
+        frames = int(seconds * RATE)
+        x = 10 ** (level / 20) * np.sin(2 * np.pi * frequency * (position + np.arange(frames)) / RATE)
+        x = np.stack([x, x]).astype(np.float32)
+        for i in range(0, frames, block):
+            meter.measure(x[:, i:i + block], RATE)
+        position += frames
+    return meter
+
+
+class LoudnessMeterTest(unittest.TestCase):
+    def test_reference_sine(self):
+        # BS.1770: a 997 Hz sine at -20 dBFS in both channels of a stereo pair reads -20 LUFS
+        readings = measure([(-20.0, 10)]).readings()
+
+        self.assertAlmostEqual(readings["integrated"], -20.0, delta=TOLERANCE)
+        self.assertAlmostEqual(readings["momentary"], -20.0, delta=TOLERANCE)
+        self.assertAlmostEqual(readings["short_term"], -20.0, delta=TOLERANCE)
+        for peak, rms in zip(readings["peak_db"], readings["rms_db"]):
+            self.assertAlmostEqual(peak, -20.0, places=2)
+            self.assertAlmostEqual(rms, -20.0 - 10 * np.log10(2), places=2)
+
+    def test_block_size_does_not_matter(self):
+        readings = [measure([(-20.0, 5)], block=block).readings() for block in (4800, 1024, 441)]
+        for other in readings[1:]:
+            self.assertAlmostEqual(other["integrated"], readings[0]["integrated"], places=6)
+
+    def test_relative_gate(self):
+        # EBU Tech 3341 case 2: the -36 dBFS sections fall below the relative gate
+        meter = measure([(-36.0, 20), (-23.0, 60), (-36.0, 20)], frequency=1000.0)
+        self.assertAlmostEqual(meter.integrated(), -23.0, delta=TOLERANCE)
+
+    def test_absolute_gate(self):
+        self.assertIsNone(measure([(-80.0, 2)]).integrated())
+        self.assertAlmostEqual(measure([(-80.0, 10), (-23.0, 20)]).integrated(), -23.0, delta=TOLERANCE)
+
+
+if __name__ == "__main__":
+    unittest.main()
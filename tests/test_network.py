@@ -0,0 +1,135 @@
+import os
+import socket
+import time
+import unittest
+
+# Node modules fall back to their headless base classes without a GUI
+os.environ.setdefault("NODEDSP_HEADLESS", "1")
+
+import numpy as np
+
+try:
+    from engine.block import AudioBlock
+    from engine.graph import Port
+    from nodes import network
+    from nodes.audioio import audio_manager
+except ImportError as e:
+    raise unittest.SkipTest(f"node modules unavailable: {e}")
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class NetworkLoopbackTest(unittest.TestCase):
+    """NOUT -> NIN over UDP on 127.0.0.1; packets hold one constant value each to tell them apart"""
+
+    def setUp(self):
+        self.address = f"127.0.0.1:{free_port()}"
+        self.frames = audio_manager.get_input_settings()["chunk_size"]
+        self.rate = audio_manager.get_input_settings()["rate"]
+        self.receiver = network.NetworkReceiver("nin", {"address": self.address, "channels": 1})
+        self.receiver.activate()
+        self.output = self.receiver._output_attributes[0]
+        self.sock, self.target = network.open_socket("UDP", self.address)
+
+    def tearDown(self):
+        self.sock.close()
+        self.receiver.close()
+
+    def send(self, seq, value):
+        """One raw packet of self.frames samples of value, numbered seq"""
+        payload = np.full((1, self.frames), value, dtype="<f4")
+        header = network.HEADER.pack(network.MAGIC, network.VERSION, 0, 1, self.frames, self.rate,
+                                     seq & 0xFFFFFFFF, seq * self.frames, time.time())
+        self.sock.sendto(header + payload.tobytes(), self.target)
+
+    def wait_received(self, count):
+        deadline = time.monotonic() + 5.0
+        while self.receiver.jitter.received < count and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(self.receiver.jitter.received, count)
+
+    def play(self, ticks):
+        """Run the receiver for a number of ticks, returns the first sample of each block played"""
+        played = []
+        for _ in range(ticks):
+            self.output.set_data(None)
+            self.receiver.process(None)
+            block = self.output.get_data()
+            if block is not None:
+                self.assertEqual(block.frames, self.frames)
+                played.append(float(block.data[0, 0]))
+        return played
+
+    def stream(self, groups, send=None):
+        """Send each group of (seq, value) packets and play one tick, paced at the packet period like a
+        live sender; then play out what is left. Returns the values played."""
+        send = send or self.send
+        period = self.frames / self.rate
+        played, count = [], 0
+        next_time = time.perf_counter()
+        for group in groups:
+            for seq, value in group:
+                send(seq, value)
+            count += len(group)
+            self.wait_received(count)
+            played += self.play(1)
+            next_time += period
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+        return played + self.play(8)
+
+    def test_sender_to_receiver_in_order(self):
+        sender = network.NetworkSender("nout", {"address": self.address, "channels": 1})
+        port = sender._input_attributes[0] = Port("Channel 0")
+
+        def send(seq, value):
+            port.set_data(AudioBlock(np.full((1, self.frames), value, dtype=np.float32), self.rate,
+                                     seq * self.frames, 0.0))
+            sender.process(None)
+
+        played = self.stream([[(seq, seq + 1)] for seq in range(10)], send)
+        sender.close()
+
+        self.assertEqual(played, [float(seq + 1) for seq in range(10)])
+        self.assertEqual(sender.dropped, 0)
+
+    def test_reordered_packets_play_in_order(self):
+        # Each pair arrives swapped, over two ticks so the packet rate stays one per tick
+        groups = [group for seq in range(0, 10, 2) for group in ([(seq + 1, seq + 2), (seq, seq + 1)], [])]
+        self.assertEqual(self.stream(groups), [float(seq + 1) for seq in range(10)])
+        self.assertEqual(self.receiver.jitter.late, 0)
+        self.assertEqual(self.receiver.jitter.lost, 0)
+
+    def test_lost_packets_are_concealed_with_decay(self):
+        # Packets 3 and 4 never arrive: packet 2 repeats at half, then a quarter of its level
+        groups = [[(seq, 1.0 if seq == 2 else seq + 10)] for seq in (0, 1, 2, 5, 6, 7)]
+        self.assertEqual(self.stream(groups), [10.0, 11.0, 1.0, 0.5, 0.25, 15.0, 16.0, 17.0])
+        self.assertEqual(self.receiver.jitter.lost, 2)
+
+    def test_sequence_wraps_at_32_bits(self):
+        first = (1 << 32) - 3
+        groups = [[(seq, seq - first + 1)] for seq in range(first, first + 6)]
+        self.assertEqual(self.stream(groups), [1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+        self.assertEqual(self.receiver.seq_wraps, 1)
+        self.assertEqual(self.receiver.jitter.late, 0)
+
+    def test_backlog_is_trimmed_from_the_oldest_end(self):
+        # A burst far past the playout target, as after a stall: the oldest packets go, the newest play
+        for seq in range(20):
+            self.send(seq, seq + 1)
+        self.wait_received(20)
+
+        played = self.play(20)
+        jitter = self.receiver.jitter
+        self.assertGreater(jitter.skipped, 0)
+        self.assertEqual(len(played), 20 - jitter.skipped)
+        self.assertEqual(played, [float(seq + 1) for seq in range(jitter.skipped, 20)])
+        # What is left is what playout keeps queued at most: the target, one packet of slack and the burst
+        self.assertLessEqual(len(played), jitter.target + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+import os
+import tempfile
+import time
+import unittest
+
+# Node modules fall back to their headless base classes without a GUI
+os.environ.setdefault("NODEDSP_HEADLESS", "1")
+
+import numpy as np
+
+try:
+    from engine.bench import node_data
+    from engine.block import AudioBlock
+    from engine.graph import Engine, Port
+    from nodes import audioio, registry
+    from nodes.fileio import WavWriter, read_wav_info
+except ImportError as e:
+    raise unittest.SkipTest(f"node modules unavailable: {e}")
+
+
+def write_noise(path, rate, seconds=1.0, channels=2):
+    """Low level noise, so every node downstream has signal to work on"""
+    noise = np.random.default_rng(1).standard_normal((int(seconds * rate), channels)) * 0.1
+    writer = WavWriter(path, rate, channels, np.float32)
+    writer.write(noise.astype(np.float32))
+    writer.close()
+
+
+class NodeTypesTest(unittest.TestCase):
+    """Every registered node type, built from its factory and run inside a graph"""
+
+    def setUp(self):
+        self.manager = audioio.audio_manager
+        self.manager.set_backend("Null")
+        self.directory = tempfile.TemporaryDirectory()
+        self.rate = self.manager.get_input_settings()["rate"]
+        self.source = os.path.join(self.directory.name, "noise.wav")
+        write_noise(self.source, self.rate)
+
+    def tearDown(self):
+        self.directory.cleanup()
+        self.manager.set_backend("PyAudio")
+
+    def node_settings(self, type_id):
+        data = node_data([type_id], self.directory.name).get(type_id)
+        if type_id == "FIN":
+            data = {"path": self.source}
+        elif type_id == "FOUT":
+            data = {"path": os.path.join(self.directory.name, "out.wav")}
+        return data
+
+    def run_type(self, type_id, fuse, blocks=8, data=None, linked=None):
+        factories = registry.factories()
+        settings = dict(self.node_settings(type_id) or {}, **(data or {}))
+        node = factories[type_id](type_id, settings)
+        inputs = len(node._input_attributes)
+        if hasattr(node, "close"):
+            node.close()
+
+        # A file source of noise feeds every input of the node (or those linked), channel by channel
+        nodes = [{"id": "src", "type": "FIN", "data": {"path": self.source}},
+                 {"id": "node", "type": type_id, "data": settings}]
+        links = [{"output_node": "src", "output_attr": i % 2, "input_node": "node", "input_attr": i}
+                 for i in (range(inputs) if linked is None else linked)]
+
+        engine = Engine(factories, fuse=fuse)
+        self.assertTrue(engine.load({"nodes": nodes, "links": links}))
+        try:
+            engine.activate()
+            for _ in range(blocks):
+                engine.run_block()
+        finally:
+            engine.close()
+        return engine
+
+    def test_every_type_builds_and_processes(self):
+        for type_id in registry.NODE_TYPES:
+            for fuse in (False, True):
+                with self.subTest(type=type_id, fuse=fuse):
+                    self.run_type(type_id, fuse)
+
+    def test_mixer_nodes_produce_output(self):
+        for type_id in ("GAIN", "PAN", "SUM", "ROUTE"):
+            with self.subTest(type=type_id):
+                node = self.run_type(type_id, fuse=False).nodes["node"]
+                block = node._output_attributes[0].get_data()
+                self.assertIsNotNone(block)
+                self.assertGreater(float(np.abs(block.data).max()), 0.0)
+
+    def test_effects_keep_channel_positions(self):
+        # Only the second input linked: its signal must come out of the second output, not the first
+        cases = [("BIQ", None), ("FIR", None), ("CONV", None), ("SRC", None), ("SRC", {"rate": 44100})]
+        for type_id, data in cases:
+            with self.subTest(type=type_id, data=data):
+                node = self.run_type(type_id, fuse=False, data=data, linked=[1]).nodes["node"]
+                first, second = (attr.get_data() for attr in node._output_attributes[:2])
+                self.assertIsNotNone(second)
+                self.assertGreater(float(np.abs(second.data).max()), 0.0)
+                self.assertTrue(first is None or not np.any(first.data))
+
+    def test_file_sink_writes_each_channel_to_its_column(self):
+        path = os.path.join(self.directory.name, "out.wav")
+        self.manager.realtime = False
+        try:
+            self.run_type("FOUT", fuse=False, blocks=4, data={"path": path, "channels": 2}, linked=[1])
+        finally:
+            self.manager.realtime = True
+
+        offset, frames, channels, rate, dtype = read_wav_info(path)
+        written = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(frames, channels))
+        offset, frames, channels, rate, dtype = read_wav_info(self.source)
+        source = np.memmap(self.source, dtype=dtype, mode="r", offset=offset, shape=(frames, channels))
+
+        self.assertGreater(len(written), 0)
+        self.assertFalse(np.any(written[:, 0]))
+        np.testing.assert_array_equal(written[:, 1], source[:len(written), 1])
+
+    def test_resampling_sink_reuses_its_buffers(self):
+        # A 44.1 kHz file into a 48 kHz device: resampled blocks vary by a frame from one to the next
+        path = os.path.join(self.directory.name, "noise44.wav")
+        write_noise(path, 44100)
+        links = [{"output_node": "src", "output_attr": ch, "input_node": "out", "input_attr": ch} for ch in range(2)]
+        engine = Engine(registry.factories())
+        engine.load({"nodes": [{"id": "src", "type": "FIN", "data": {"path": path}}, {"id": "out", "type": "AOUT"}],
+                     "links": links})
+        sink = engine.nodes["out"]
+        self.assertNotEqual(sink.rate, 44100)
+
+        buffers, lengths = set(), set()
+        mix = sink._mix_to_output
+
+        def recorded(*args):
+            output = mix(*args)
+            lengths.add(len(output))
+            buffers.add(id(sink.output_buffer))
+            return output
+
+        sink._mix_to_output = recorded
+        try:
+            for _ in range(40):
+                engine.run_block()
+        finally:
+            engine.close()
+
+        self.assertGreater(len(lengths), 1)
+        self.assertEqual(len(buffers), 1)
+
+    def test_spectrogram_hop_and_fft_size(self):
+        self.assertEqual(registry.analyzer.Spectrogram("spg", {"fft_size": 1024, "hop": 4096}).hop, 1024)
+
+        node = registry.analyzer.Spectrogram("spg", {"fft_size": 1024, "hop": 256})
+        # Wired the way the engine wires a linked input
+        port = node._input_attributes[0] = Port("Input")
+
+        def columns(blocks, frames=512):
+            start = node.column
+            for i in range(blocks):
+                port.set_data(AudioBlock(np.ones((1, frames), dtype=np.float32), self.rate, i * frames, 0.0))
+                node.process(None)
+            # The STFT runs on the node's own thread
+            deadline = time.monotonic() + 5.0
+            while node.input_ring.available() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            return node.column - start
+
+        try:
+            # One column per hop once the first frame is full
+            self.assertEqual(columns(20), 20 * 512 // 256 - 1024 // 256 + 1)
+            node.set_stft(2048, 1024)
+            self.assertEqual(columns(20), 20 * 512 // 1024 - 2048 // 1024 + 1)
+            self.assertEqual((node.fft_size, node.hop), (2048, 1024))
+        finally:
+            node.stop_thread()
+
+
+if __name__ == "__main__":
+    unittest.main()
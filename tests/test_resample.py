@@ -0,0 +1,83 @@
+import unittest
+
+import numpy as np
+
+from dsp.resample import PolyphaseResampler, resample_offline
+
+
+def sine(frequency, rate, frames, start=0):
+    return np.sin(2 * np.pi * frequency * (start + np.arange(frames)) / rate)
+
+
+class PolyphaseResamplerTest(unittest.TestCase):
+    def resample(self, in_rate, out_rate, x, block=512):
+        resampler = PolyphaseResampler(in_rate, out_rate, len(x))
+        outs = [resampler.process(x[:, i:i + block]) for i in range(0, x.shape[1], block)]
+        return resampler, outs
+
+    def test_output_length(self):
+        for in_rate, out_rate in ((44100, 48000), (48000, 44100), (48000, 96000), (96000, 48000)):
+            with self.subTest(in_rate=in_rate, out_rate=out_rate):
+                frames = 512 * 200
+                _, outs = self.resample(in_rate, out_rate, np.zeros((2, frames), dtype=np.float32))
+
+                # Each block is within a frame of the ratio, and the stream as a whole is exact
+                expected = 512 * out_rate / in_rate
+                for out in outs:
+                    self.assertEqual(out.shape[0], 2)
+                    self.assertLess(abs(out.shape[1] - expected), 1.0)
+                self.assertEqual(sum(out.shape[1] for out in outs), -(-frames * out_rate // in_rate))
+
+    def test_sine_error(self):
+        for in_rate, out_rate in ((44100, 48000), (48000, 44100)):
+            with self.subTest(in_rate=in_rate, out_rate=out_rate):
+                x = sine(997, in_rate, in_rate).astype(np.float32)[None]
+                resampler, outs = self.resample(in_rate, out_rate, x)
+                y = np.concatenate(outs, axis=1)[0]
+
+                # Against the ideal sine at the output rate, shifted by the filter's group delay
+                reference = sine(997, out_rate, len(y), -resampler.delay)
+                settled = slice(int(resampler.delay) + 64, len(y) - 64)
+                error = y[settled] - reference[settled]
+                error_db = 10 * np.log10(np.mean(error ** 2) / 0.5)
+                self.assertLess(error_db, -70.0)
+
+    def test_block_sizes_do_not_change_the_output(self):
+        x = np.random.default_rng(0).standard_normal((1, 44100)).astype(np.float32)
+        _, whole = self.resample(44100, 48000, x, block=44100)
+        _, blocks = self.resample(44100, 48000, x, block=441)
+        np.testing.assert_allclose(np.concatenate(blocks, axis=1), whole[0], atol=1e-5)
+
+    def test_integer_samples_are_scaled(self):
+        x = (sine(997, 48000, 4800) * 16384).astype(np.int16)[None]
+        _, floats = self.resample(48000, 44100, x.astype(np.float32) / 32768)
+        _, ints = self.resample(48000, 44100, x)
+        np.testing.assert_allclose(np.concatenate(ints, axis=1), np.concatenate(floats, axis=1), atol=1e-6)
+
+
+class OfflineResampleTest(unittest.TestCase):
+    def test_impulses_keep_their_position(self):
+        # No group delay at the start, and an impulse on the last sample still rings out in full
+        for in_rate, out_rate in ((44100, 48000), (48000, 44100), (96000, 48000)):
+            with self.subTest(in_rate=in_rate, out_rate=out_rate):
+                x = np.zeros((1, 1000), dtype=np.float32)
+                x[0, 100] = x[0, -1] = 1.0
+                y = resample_offline(x, in_rate, out_rate)[0]
+
+                self.assertLessEqual(abs(int(np.argmax(y[:500])) - 100 * out_rate / in_rate), 0.5)
+                tail = y[500:]
+                self.assertLessEqual(abs(500 + int(np.argmax(tail)) - 999 * out_rate / in_rate), 0.5)
+                self.assertLess(np.sum(tail[-4:] ** 2), 1e-3 * np.sum(tail ** 2))
+
+    def test_sine_without_delay(self):
+        x = sine(997, 44100, 4410).astype(np.float32)[None]
+        y = resample_offline(x, 44100, 48000)[0]
+        reference = sine(997, 48000, len(y))
+        settled = slice(64, 4800 - 64)
+        error = y[settled] - reference[settled]
+        # The half sample at the upsampled rate left of the delay costs about -67 dB at 997 Hz
+        self.assertLess(10 * np.log10(np.mean(error ** 2) / 0.5), -60.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
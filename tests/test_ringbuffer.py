@@ -0,0 +1,108 @@
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from engine.ringbuffer import RingBuffer
+
+
+def ramp(start, frames, channels=2):
+    """(frames, channels) frames numbered from start, channel c offset by c / 10"""
+    return (np.arange(start, start + frames, dtype=np.float32)[:, None] + np.arange(channels) / 10).astype(np.float32)
+
+
+class RingBufferTest(unittest.TestCase):
+    def test_wraps_around_in_order(self):
+        ring = RingBuffer(10, 2)
+        out = np.zeros((4, 2), dtype=np.float32)
+        position = 0
+        # Writes and reads of 3 and 4 frames cross the end of a 10 frame buffer at every offset
+        for i in range(25):
+            self.assertEqual(ring.write(ramp(position + ring.available(), 3)), 3)
+            n = ring.read(out[:3 if i % 2 else 2])
+            np.testing.assert_array_equal(out[:n], ramp(position, n))
+            position += n
+            if ring.available() > 6:
+                n = ring.read(out)
+                np.testing.assert_array_equal(out[:n], ramp(position, n))
+                position += n
+
+        self.assertEqual(ring.overflows, 0)
+        self.assertEqual(ring.underflows, 0)
+
+    def test_full(self):
+        ring = RingBuffer(8, 2)
+        self.assertEqual(ring.write(ramp(0, 6)), 6)
+        self.assertEqual(ring.free(), 2)
+
+        # Only what fits is taken; unread frames are never overwritten
+        self.assertEqual(ring.write(ramp(6, 5)), 2)
+        self.assertEqual(ring.overflows, 1)
+        self.assertEqual(ring.free(), 0)
+        self.assertEqual(ring.fill(), 1.0)
+        self.assertEqual(ring.write(ramp(8, 1)), 0)
+        self.assertEqual(ring.overflows, 2)
+
+        out = np.zeros((8, 2), dtype=np.float32)
+        self.assertEqual(ring.read(out), 8)
+        np.testing.assert_array_equal(out, ramp(0, 8))
+
+    def test_empty(self):
+        ring = RingBuffer(8, 2)
+        out = np.full((4, 2), -1.0, dtype=np.float32)
+        self.assertEqual(ring.read(out), 0)
+        self.assertEqual(ring.underflows, 1)
+        self.assertTrue(np.all(out == -1.0))
+
+        ring.write(ramp(0, 3))
+        self.assertEqual(ring.read(out), 3)
+        self.assertEqual(ring.underflows, 2)
+        np.testing.assert_array_equal(out[:3], ramp(0, 3))
+        self.assertEqual(ring.available(), 0)
+
+    def test_skip_and_clear(self):
+        ring = RingBuffer(8, 2)
+        ring.write(ramp(0, 6))
+        self.assertEqual(ring.skip(4), 4)
+        out = np.zeros((2, 2), dtype=np.float32)
+        ring.read(out)
+        np.testing.assert_array_equal(out, ramp(4, 2))
+
+        ring.write(ramp(6, 5))
+        self.assertEqual(ring.skip(10), 5)
+        ring.write(ramp(11, 3))
+        ring.clear()
+        self.assertEqual(ring.available(), 0)
+        self.assertEqual(ring.free(), 8)
+
+    def test_producer_and_consumer_threads(self):
+        ring = RingBuffer(64, 2)
+        total = 20000
+        received = []
+
+        def produce():
+            position = 0
+            while position < total:
+                n = ring.write(ramp(position, min(13, total - position)))
+                position += n
+                if n == 0:
+                    time.sleep(0.0001)
+
+        producer = threading.Thread(target=produce)
+        producer.start()
+        out = np.zeros((17, 2), dtype=np.float32)
+        count = 0
+        while count < total:
+            n = ring.read(out)
+            received.append(out[:n].copy())
+            count += n
+            if n == 0:
+                time.sleep(0.0001)
+        producer.join()
+
+        np.testing.assert_array_equal(np.concatenate(received), ramp(0, total))
+
+
+if __name__ == "__main__":
+    unittest.main()
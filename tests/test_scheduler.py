@@ -0,0 +1,136 @@
+import os
+import unittest
+
+# Node modules fall back to their headless base classes without a GUI
+os.environ.setdefault("NODEDSP_HEADLESS", "1")
+
+from engine.scheduler import LATENCY, THROUGHPUT, BlockScheduler
+
+
+class FakeDevice:
+    """Blocking device on a fake clock: each read waits until its block has been captured"""
+
+    def __init__(self, period, cost):
+        self.period = period
+        self.cost = cost
+        self.now = 0.0
+        self.captured = 0.0
+        self.waited = 0.0
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def wait_time(self):
+        return self.waited
+
+    def tick(self):
+        self.captured += self.period
+        if self.captured > self.now:
+            self.waited += self.captured - self.now
+            self.now = self.captured
+        self.now += self.cost
+
+
+class BlockingDeviceTest(unittest.TestCase):
+    def test_device_wait_is_not_processing_time(self):
+        device = FakeDevice(0.01, 0.001)
+        scheduler = BlockScheduler(device.tick, 0.01, clock=device.clock, sleep=device.sleep,
+                                   device_wait=device.wait_time)
+        scheduler.run(100)
+
+        self.assertEqual(scheduler.overruns, 0)
+        self.assertAlmostEqual(scheduler.process_time, 0.001)
+        self.assertGreater(scheduler.min_headroom, 85.0)
+        # Paced by the device alone: a hundred blocks take a hundred periods
+        self.assertAlmostEqual(device.now, 100 * 0.01 + 0.001, places=6)
+
+    def test_throughput_keeps_batch_when_device_waits(self):
+        device = FakeDevice(0.01, 0.001)
+        scheduler = BlockScheduler(device.tick, 0.01, clock=device.clock, sleep=device.sleep, mode=THROUGHPUT,
+                                   max_batch=8, adapt_ticks=8, device_wait=device.wait_time)
+        scheduler.run(100)
+
+        self.assertEqual(scheduler.batch, 1)
+        self.assertEqual(scheduler.overruns, 0)
+
+    def test_throughput_batches_when_processing_is_slow(self):
+        device = FakeDevice(0.01, 0.008)
+        batches = []
+        scheduler = BlockScheduler(device.tick, 0.01, clock=device.clock, sleep=device.sleep, mode=THROUGHPUT,
+                                   max_batch=8, on_batch=batches.append, adapt_ticks=8,
+                                   device_wait=device.wait_time)
+        scheduler.run(20)
+
+        self.assertEqual(batches, [2])
+
+    def test_audio_time_follows_batch_changes(self):
+        # Offline, the mode (and with it the batch) switches inside a tick, as a reloaded graph file does
+        scheduler = None
+
+        def tick():
+            if scheduler.ticks == 10:
+                scheduler.set_mode(THROUGHPUT)
+
+        scheduler = BlockScheduler(tick, 0.01, realtime=False, max_batch=4)
+        scheduler.run(20)
+
+        self.assertEqual(scheduler.batch, 4)
+        self.assertAlmostEqual(scheduler.stats()["audio_time"], 10 * 0.01 + 10 * 0.04)
+
+
+class LoopbackTest(unittest.TestCase):
+    """AIN -> GAIN -> AOUT on the real-time loopback device with blocking streams"""
+
+    def setUp(self):
+        try:
+            from nodes import audioio, registry
+        except ImportError as e:
+            raise unittest.SkipTest(f"node modules unavailable: {e}")
+        from engine.graph import Engine
+
+        self.manager = audioio.audio_manager
+        self.settings = (dict(self.manager.input_settings), dict(self.manager.output_settings))
+        self.manager.input_settings.update(chunk_size=512, mode=audioio.stream_modes.index("Blocking"))
+        self.manager.output_settings.update(mode=audioio.stream_modes.index("Blocking"))
+        self.manager.set_backend("Loopback")
+
+        links = [{"output_node": src, "output_attr": ch, "input_node": dst, "input_attr": ch}
+                 for src, dst in (("in", "gain"), ("gain", "out")) for ch in range(2)]
+        self.engine = Engine(registry.factories())
+        self.engine.load({"nodes": [{"id": "in", "type": "AIN"}, {"id": "gain", "type": "GAIN"},
+                                    {"id": "out", "type": "AOUT"}], "links": links})
+        self.engine.activate()
+
+    def tearDown(self):
+        self.engine.close()
+        self.manager.set_batch(1)
+        self.manager.input_settings, self.manager.output_settings = self.settings
+        self.manager.set_backend("PyAudio")
+
+    def run_scheduler(self, mode, ticks=100):
+        scheduler = BlockScheduler(self.engine.run_block, self.manager.block_period(), mode=mode,
+                                   max_batch=self.manager.max_batch(), on_batch=self.manager.set_batch,
+                                   adapt_ticks=8, device_wait=self.manager.streams.wait_time)
+        scheduler.run(ticks)
+        return scheduler
+
+    def test_latency_mode_meets_deadlines(self):
+        scheduler = self.run_scheduler(LATENCY)
+
+        # A stray late tick on a loaded machine is not the scheduler's fault; one per block is
+        self.assertLess(scheduler.overruns, 5)
+        self.assertGreater(scheduler.headroom, 50.0)
+
+    def test_throughput_adapts_against_blocking_stream(self):
+        scheduler = self.run_scheduler(THROUGHPUT)
+
+        self.assertEqual(scheduler.batch, 1)
+        self.assertLess(scheduler.overruns, 5)
+        self.assertGreater(scheduler.headroom, 50.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+import unittest
+
+# Node modules fall back to their headless base classes without a GUI
+os.environ.setdefault("NODEDSP_HEADLESS", "1")
+
+import numpy as np
+
+try:
+    from nodes import audioio
+except ImportError as e:
+    raise unittest.SkipTest(f"node modules unavailable: {e}")
+
+FLOAT32 = audioio.formats[0]
+
+
+class TimerStream:
+    """Callback stream whose device is a timer thread: one callback per block period
+
+    Capture hands the callback frames numbered 1, 2, 3... per channel; playback
+    records whatever the callback returns.
+    """
+
+    def __init__(self, channels, rate, frames_per_buffer, stream_callback, input=False, output=False, **kwargs):
+        self.channels = channels
+        self.frames = frames_per_buffer
+        self.period = frames_per_buffer / rate
+        self.callback = stream_callback
+        self.input = input
+        self.position = 1
+        self.played = []
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        next_time = time.perf_counter()
+        while self.running:
+            in_data = None
+            if self.input:
+                frames = np.arange(self.position, self.position + self.frames, dtype=np.float32)
+                in_data = np.repeat(frames, self.channels).tobytes()
+                self.position += self.frames
+
+            out_data, _ = self.callback(in_data, self.frames, {}, 0)
+            if out_data is not None:
+                self.played.append(np.frombuffer(out_data, dtype=np.float32).reshape(-1, self.channels).copy())
+
+            next_time += self.period
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+
+
+class TimerAudio:
+    def __init__(self):
+        self.streams = []
+
+    def open(self, **kwargs):
+        kwargs.pop("format")
+        self.streams.append(TimerStream(**kwargs))
+        return self.streams[-1]
+
+
+class CallbackStreamTest(unittest.TestCase):
+    """SharedInput and SharedOutput in callback mode against a timer-driven device"""
+
+    rate = 48000
+    frame_size = 256
+    channels = 2
+    seconds = 0.5
+
+    def test_capture_in_order(self):
+        pa = TimerAudio()
+        shared = audioio.SharedInput(pa, 0, FLOAT32, self.channels, self.rate, self.frame_size, True,
+                                     4 * self.frame_size)
+        seen, blocks = 0, []
+        deadline = time.perf_counter() + self.seconds
+        # The graph thread polls faster than blocks arrive and takes one whenever the ring has it
+        while time.perf_counter() < deadline:
+            seq, block = shared.read(seen)
+            if block is not None and seq != seen:
+                blocks.append(block.data.copy())
+                seen = seq
+            else:
+                time.sleep(0.001)
+        shared.close()
+
+        samples = np.concatenate(blocks, axis=1)
+        self.assertGreater(samples.shape[1], self.rate * self.seconds / 2)
+        for channel in samples:
+            np.testing.assert_array_equal(channel, np.arange(1, samples.shape[1] + 1, dtype=np.float32))
+
+        status = shared.status()
+        self.assertEqual(status["overflows"], 0)
+        self.assertEqual(status["underflows"], 0)
+        self.assertEqual(status["dropped_frames"], 0)
+
+    def test_playback_in_order(self):
+        pa = TimerAudio()
+        target = 4 * self.frame_size
+        shared = audioio.SharedOutput(pa, 0, FLOAT32, self.channels, self.rate, self.frame_size, True, target)
+        shared.refs = 1
+        stream = pa.streams[0]
+
+        position = 1
+        deadline = time.perf_counter() + self.seconds
+        # The graph thread keeps the ring at its latency target, as the block scheduler would
+        while time.perf_counter() < deadline:
+            if shared.ring.available() < target:
+                frames = np.arange(position, position + self.frame_size, dtype=np.float32)
+                shared.write(None, np.repeat(frames[:, None], self.channels, axis=1))
+                position += self.frame_size
+            else:
+                time.sleep(0.001)
+        # Stop the device before the writer, or the drained ring reads as an underrun
+        stream.close()
+
+        played = np.concatenate(stream.played)
+        start = int(np.argmax(played[:, 0] > 0))
+        self.assertFalse(np.any(played[:start]))
+        samples = played[start:]
+        self.assertGreater(len(samples), self.rate * self.seconds / 2)
+        for channel in samples.T:
+            np.testing.assert_array_equal(channel, np.arange(1, len(samples) + 1, dtype=np.float32))
+
+        status = shared.status()
+        self.assertEqual(status["overflows"], 0)
+        self.assertEqual(status["underflows"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()